@@ -2,8 +2,10 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import jobs, preview, downloads, approval, master_data, model_metadata
-from .services.metrics import MetricsService
+from .routers import jobs, preview, downloads, approval, master_data, metrics as metrics_router, model_metadata
+from .routers.jobs import job_service
+from .services import events
+from .services.metrics import MetricsService, start_publisher, stop_publisher
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
@@ -22,10 +24,14 @@ metrics = MetricsService.get_instance()
 @app.on_event("startup")
 async def startup_event() -> None:
     metrics.set_gauge("api.startup", 1)
+    job_service.follow_events(consumer="api")
+    start_publisher("api")
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     metrics.set_gauge("api.startup", 0)
+    events.reset_bus()
+    stop_publisher()
 
 app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
 app.include_router(preview.router, prefix="/preview", tags=["preview"])
@@ -33,6 +39,7 @@ app.include_router(downloads.router, prefix="/download", tags=["download"])
 app.include_router(approval.router, prefix="/approval", tags=["approval"])
 app.include_router(master_data.router, prefix="/master-data", tags=["master-data"])
 app.include_router(model_metadata.router, prefix="/models", tags=["models"])
+app.include_router(metrics_router.router, prefix="/metrics", tags=["metrics"])
 
 
 @app.get("/health", tags=["health"])
@@ -1,12 +1,32 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 
-from ..schemas import ApprovalRequest, ApprovalResponse
-from ..services.jobs import JobService
+from ..schemas import ApprovalRequest, ApprovalResponse, BatchApprovalRequest, BatchApprovalResponse, JobDetail
+from .jobs import job_service as service
 
 router = APIRouter()
-service = JobService()
+
+
+def _response(job: JobDetail, notes: str | None) -> ApprovalResponse:
+    return ApprovalResponse(
+        job_id=job.job_id,
+        approved=True,
+        approved_at=job.approved_at.isoformat() if job.approved_at else "",
+        notes=notes,
+    )
+
+
+@router.post("/batch", response_model=BatchApprovalResponse)
+async def approve_jobs(payload: BatchApprovalRequest, background_tasks: BackgroundTasks) -> BatchApprovalResponse:
+    """Approve every job in one state write; artifacts are materialized after the response."""
+
+    try:
+        jobs = service.approve_many(payload.job_ids, approver=payload.approver, notes=payload.notes)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Jobs not found: {', '.join(exc.args[0])}") from exc
+    background_tasks.add_task(service.materialize_approvals, jobs)
+    return BatchApprovalResponse(approved=[_response(job, payload.notes) for job in jobs])
 
 
 @router.post("/{job_id}", response_model=ApprovalResponse)
@@ -15,9 +35,4 @@ async def approve_job(job_id: str, payload: ApprovalRequest) -> ApprovalResponse
         job = service.approve(job_id, approver=payload.approver, notes=payload.notes)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail="Job not found") from exc
-    return ApprovalResponse(
-        job_id=job.job_id,
-        approved=True,
-        approved_at=job.approved_at or "",
-        notes=payload.notes,
-    )
+    return _response(job, payload.notes)
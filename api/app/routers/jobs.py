@@ -4,7 +4,7 @@ import logging
 
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
 
-from ..schemas import JobCreate, JobDetail, JobList
+from ..schemas import JobCreate, JobDetail, JobList, PipelineStage, ReprocessRequest, ReprocessResponse
 from ..services.jobs import INCOMING_DIR, JobService
 
 LOGGER = logging.getLogger(__name__)
@@ -40,3 +40,24 @@ async def get_job(job_id: str) -> JobDetail:
         return job_service.get(job_id)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail="Job not found") from exc
+
+
+@router.post("/reprocess", response_model=ReprocessResponse)
+async def reprocess_jobs(payload: ReprocessRequest) -> ReprocessResponse:
+    job_ids = payload.job_ids if payload.job_ids is not None else job_service.reprocessable_jobs()
+    missing = [job_id for job_id in job_ids if not job_service.exists(job_id)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Jobs not found: {', '.join(missing)}")
+    from_stage = payload.from_stage.value if payload.from_stage else None
+    for job_id in job_ids:
+        job_service.enqueue_reprocess(job_id, from_stage=from_stage)
+    return ReprocessResponse(queued=list(job_ids))
+
+
+@router.post("/{job_id}/reprocess", response_model=ReprocessResponse)
+async def reprocess_job(job_id: str, from_stage: PipelineStage | None = None) -> ReprocessResponse:
+    try:
+        job_service.enqueue_reprocess(job_id, from_stage=from_stage.value if from_stage else None)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Job not found") from exc
+    return ReprocessResponse(queued=[job_id])
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from ..schemas import MetricsResponse, MetricSummary
+from ..services.metrics import MetricsPublisher, MetricsService, aggregate, current_publisher
+
+router = APIRouter()
+
+
+@router.get("/", response_model=MetricsResponse)
+async def read_metrics() -> MetricsResponse:
+    """Metrics of the API, the worker and its pool, merged."""
+
+    publisher = current_publisher() or MetricsPublisher("api", MetricsService.get_instance())
+    view = aggregate(publisher)
+    summaries = {
+        name: MetricSummary(count=count, sum=total, max=peak) for name, (count, total, peak) in view["summaries"].items()
+    }
+    return MetricsResponse(
+        counters=view["counters"], gauges=view["gauges"], summaries=summaries, processes=view["processes"]
+    )
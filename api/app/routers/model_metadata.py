@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 
-from ml.registry import ModelRegistry
+from ml.registry import MAX_PAGE_SIZE, ModelRegistry
 
 from ..schemas import ModelHistoryResponse
 
@@ -11,5 +11,12 @@ registry = ModelRegistry()
 
 
 @router.get("/history", response_model=ModelHistoryResponse)
-async def history() -> ModelHistoryResponse:
-    return registry.history()
+async def history(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    before: str | None = None,
+    status: str | None = None,
+) -> ModelHistoryResponse:
+    try:
+        return registry.history(limit=limit, before=before, status=status)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {before}") from exc
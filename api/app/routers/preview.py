@@ -1,8 +1,6 @@
 from __future__ import annotations
 
-import json
-
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 
 from ..schemas import PreviewResponse
 from ..services.jobs import PROCESSED_DIR
@@ -11,9 +9,10 @@ router = APIRouter()
 
 
 @router.get("/{job_id}", response_model=PreviewResponse)
-async def get_preview(job_id: str) -> PreviewResponse:
+async def get_preview(job_id: str) -> Response:
     preview_path = PROCESSED_DIR / job_id / "preview.json"
     if not preview_path.exists():
         raise HTTPException(status_code=404, detail="Preview not available")
-    data = json.loads(preview_path.read_text(encoding="utf-8"))
-    return PreviewResponse(**data)
+    # The worker wrote this file from a PreviewResponse; serve it as is
+    # instead of re-validating and re-encoding every row.
+    return Response(content=preview_path.read_bytes(), media_type="application/json")
@@ -1,10 +1,24 @@
-from .job import JobCreate, JobDetail, JobList, JobStatus, JobSummary
+from .job import (
+    JobCreate,
+    JobDetail,
+    JobList,
+    JobStatus,
+    JobSummary,
+    PipelineStage,
+    ReprocessRequest,
+    ReprocessResponse,
+)
 from .preview import (
     ApprovalRequest,
     ApprovalResponse,
+    BatchApprovalRequest,
+    BatchApprovalResponse,
     CsvDownload,
     MasterRecord,
     MasterDataResponse,
+    MetricsProcess,
+    MetricsResponse,
+    MetricSummary,
     ModelHistoryResponse,
     ModelMetadata,
     PreviewResponse,
@@ -18,14 +32,22 @@ __all__ = [
     "JobList",
     "JobStatus",
     "JobSummary",
+    "PipelineStage",
+    "ReprocessRequest",
+    "ReprocessResponse",
     "PreviewResponse",
     "PreviewRow",
     "ValidationBadge",
     "CsvDownload",
     "ApprovalRequest",
     "ApprovalResponse",
+    "BatchApprovalRequest",
+    "BatchApprovalResponse",
     "MasterRecord",
     "MasterDataResponse",
+    "MetricsProcess",
+    "MetricsResponse",
+    "MetricSummary",
     "ModelHistoryResponse",
     "ModelMetadata",
 ]
@@ -16,6 +16,14 @@ class JobStatus(str, Enum):
     APPROVED = "approved"
 
 
+class PipelineStage(str, Enum):
+    OCR = "ocr"
+    SEGMENT = "segment"
+    EXTRACT = "extract"
+    NORMALIZE = "normalize"
+    VALIDATE = "validate"
+
+
 class JobCreate(BaseModel):
     filename: str
     uploader: Optional[str] = Field(default=None, description="Name or identifier of the uploader")
@@ -43,3 +51,18 @@ class JobDetail(JobSummary):
 
 class JobList(BaseModel):
     jobs: list[JobSummary]
+
+
+class ReprocessRequest(BaseModel):
+    job_ids: Optional[list[str]] = Field(
+        default=None,
+        description="Jobs to reprocess; every completed or approved job when omitted.",
+    )
+    from_stage: Optional[PipelineStage] = Field(
+        default=None,
+        description="Force a re-run from this pipeline stage even if later checkpoints are current.",
+    )
+
+
+class ReprocessResponse(BaseModel):
+    queued: list[str]
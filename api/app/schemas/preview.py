@@ -41,6 +41,16 @@ class ApprovalResponse(BaseModel):
     notes: str | None = None
 
 
+class BatchApprovalRequest(BaseModel):
+    job_ids: list[str] = Field(..., min_items=1, description="Jobs to approve; all must exist.")
+    approver: str
+    notes: str | None = None
+
+
+class BatchApprovalResponse(BaseModel):
+    approved: list[ApprovalResponse]
+
+
 class MasterRecord(BaseModel):
     sigla: str
     descricao: str
@@ -62,3 +72,29 @@ class ModelMetadata(BaseModel):
 
 class ModelHistoryResponse(BaseModel):
     items: list[ModelMetadata]
+    next_cursor: str | None = Field(
+        default=None,
+        description="Pass as `before` to fetch the next (older) page; absent on the last page.",
+    )
+    total: int | None = Field(default=None, description="Number of records matching the filter.")
+
+
+class MetricSummary(BaseModel):
+    count: int
+    sum: float
+    max: float
+
+
+class MetricsProcess(BaseModel):
+    role: str
+    pid: int
+    published_at: float
+
+
+class MetricsResponse(BaseModel):
+    counters: dict[str, int]
+    gauges: dict[str, float]
+    summaries: dict[str, MetricSummary]
+    processes: list[MetricsProcess] = Field(
+        default_factory=list, description="Processes whose metrics are included, with their last publish time."
+    )
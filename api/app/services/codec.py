@@ -0,0 +1,58 @@
+"""Compact JSON codec for internal artifacts (previews, job state).
+
+Uses ``orjson`` when it is installed and falls back to the standard library
+otherwise; both produce the same JSON documents, just at different speeds.
+Output is never indented: these files are read by the services, not by
+people, and the HTTP API contract is unaffected.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None  # type: ignore[assignment]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        # ``__dict__`` holds the field values in declaration order, which is
+        # what ``.json()`` emits, without the recursive ``.dict()`` copy.
+        return value.__dict__
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read(path: Path) -> Any:
+    return loads(path.read_bytes())
+
+
+def write(path: Path, value: Any) -> None:
+    """Serialise ``value`` to ``path`` atomically."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    temp_path.write_bytes(dumps(value))
+    os.replace(temp_path, path)
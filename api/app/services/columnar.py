@@ -0,0 +1,293 @@
+"""Self-describing columnar files for processed datasets.
+
+Layout, all integers little-endian::
+
+    MAGIC
+    row group 0: one chunk per column
+    row group 1: ...
+    footer (JSON)
+    footer length (u32), MAGIC
+
+A column chunk is either *plain* (``u32`` end offsets followed by the UTF-8
+blob of every value) or *dictionary* encoded (the distinct values stored as
+a plain chunk, then one code per row using the narrowest unsigned width
+that fits). The footer lists every chunk's encoding, offset and length, so a
+reader seeks straight to the columns it needs and never touches the rest.
+Row groups let the writer stream records without holding a whole dataset.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Mapping, Sequence
+
+MAGIC = b"CNECOL1\n"
+FORMAT_VERSION = 1
+FILENAME = "output.cols"
+ROW_GROUP_SIZE = 65536
+DICTIONARY_COLUMNS = frozenset(
+    {"DTMNFR", "ORGAO", "TIPO", "SIGLA", "SIMBOLO", "NOME_LISTA", "PARTIDO_PROPONENTE", "INDEPENDENTE"}
+)
+_TAIL = struct.Struct("<I8s")
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _code_type(cardinality: int) -> str:
+    if cardinality <= 0xFF:
+        return "B"
+    if cardinality <= 0xFFFF:
+        return "H"
+    return "I"
+
+
+def _encode_plain(values: Sequence[str]) -> bytes:
+    encoded = [value.encode("utf-8") for value in values]
+    ends = array("I")
+    position = 0
+    for item in encoded:
+        position += len(item)
+        ends.append(position)
+    return _little_endian(ends) + b"".join(encoded)
+
+
+def _decode_plain(data: bytes, count: int) -> List[str]:
+    ends = _from_little_endian("I", data[: count * 4])
+    blob = data[count * 4 :]
+    values: List[str] = []
+    start = 0
+    for end in ends:
+        values.append(blob[start:end].decode("utf-8"))
+        start = end
+    return values
+
+
+class ColumnarWriter:
+    """Streams records into a columnar file, one row group at a time."""
+
+    def __init__(
+        self,
+        path: Path,
+        columns: Sequence[str],
+        dictionary_columns: Iterable[str] = DICTIONARY_COLUMNS,
+        row_group_size: int = ROW_GROUP_SIZE,
+    ) -> None:
+        self.path = path
+        self.columns = list(columns)
+        self.dictionary_columns = frozenset(dictionary_columns)
+        self.row_group_size = max(1, row_group_size)
+        self.rows = 0
+        self._buffers: List[List[str]] = [[] for _ in self.columns]
+        self._groups: List[Dict[str, Any]] = []
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        self._handle: IO[bytes] = self._temp_path.open("wb")
+        self._handle.write(MAGIC)
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._handle.close()
+            self._temp_path.unlink(missing_ok=True)
+
+    def append(self, record: Mapping[str, Any]) -> None:
+        self.append_row([record.get(column, "") for column in self.columns])
+
+    def append_row(self, values: Sequence[Any]) -> None:
+        """Append one row given positionally, in :attr:`columns` order."""
+
+        for buffer, value in zip(self._buffers, values):
+            buffer.append(value or "")
+        if self._buffers and len(self._buffers[0]) >= self.row_group_size:
+            self._flush()
+
+    def extend_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        """Append many positional rows, transposing them a row group at a time."""
+
+        pending = list(rows)
+        while pending and self._buffers:
+            room = self.row_group_size - len(self._buffers[0])
+            part, pending = pending[:room], pending[room:]
+            for buffer, values in zip(self._buffers, zip(*part)):
+                buffer.extend([value or "" for value in values])
+            if len(self._buffers[0]) >= self.row_group_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        count = len(self._buffers[0]) if self._buffers else 0
+        if not count:
+            return
+        chunks: Dict[str, Dict[str, Any]] = {}
+        for position, column in enumerate(self.columns):
+            values = self._buffers[position]
+            offset = self._handle.tell()
+            if column in self.dictionary_columns:
+                codes: Dict[str, int] = {}
+                for value in values:
+                    codes.setdefault(value, len(codes))
+                code_type = _code_type(len(codes))
+                dictionary = _encode_plain(list(codes))
+                self._handle.write(dictionary)
+                self._handle.write(_little_endian(array(code_type, [codes[value] for value in values])))
+                meta = {
+                    "encoding": "dictionary",
+                    "cardinality": len(codes),
+                    "codes": code_type,
+                    "dictionary_length": len(dictionary),
+                }
+            else:
+                self._handle.write(_encode_plain(values))
+                meta = {"encoding": "plain"}
+            meta.update(offset=offset, length=self._handle.tell() - offset)
+            chunks[column] = meta
+            self._buffers[position] = []
+        self._groups.append({"rows": count, "columns": chunks})
+        self.rows += count
+
+    def close(self) -> Path:
+        if self._handle.closed:
+            return self.path
+        self._flush()
+        footer = json.dumps(
+            {"version": FORMAT_VERSION, "rows": self.rows, "columns": self.columns, "row_groups": self._groups},
+            separators=(",", ":"),
+        ).encode("utf-8")
+        self._handle.write(footer)
+        self._handle.write(_TAIL.pack(len(footer), MAGIC))
+        self._handle.close()
+        os.replace(self._temp_path, self.path)
+        return self.path
+
+
+def write_columnar(path: Path, records: Iterable[Mapping[str, Any]], columns: Sequence[str]) -> Path:
+    with ColumnarWriter(path, columns) as writer:
+        for record in records:
+            writer.append(record)
+    return path
+
+
+class ColumnarReader:
+    """Reads selected columns of a file written by :class:`ColumnarWriter`."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as handle:
+            if handle.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a columnar dataset")
+            handle.seek(-_TAIL.size, os.SEEK_END)
+            footer_length, magic = _TAIL.unpack(handle.read(_TAIL.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is truncated")
+            handle.seek(-_TAIL.size - footer_length, os.SEEK_END)
+            footer = json.loads(handle.read(footer_length))
+        if footer.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version in {path}")
+        self.columns: List[str] = footer["columns"]
+        self.rows: int = footer["rows"]
+        self._groups: List[Dict[str, Any]] = footer["row_groups"]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _decode(self, handle: IO[bytes], count: int, meta: Mapping[str, Any]) -> List[str]:
+        handle.seek(meta["offset"])
+        data = handle.read(meta["length"])
+        if meta["encoding"] == "plain":
+            return _decode_plain(data, count)
+        split = meta["dictionary_length"]
+        dictionary = _decode_plain(data[:split], meta["cardinality"])
+        return [dictionary[code] for code in _from_little_endian(meta["codes"], data[split:])]
+
+    def _wanted(self, columns: Sequence[str] | None) -> List[str]:
+        wanted = list(columns) if columns is not None else self.columns
+        missing = [column for column in wanted if column not in self.columns]
+        if missing:
+            raise KeyError(f"Unknown columns: {', '.join(missing)}")
+        return wanted
+
+    def _iter_groups(
+        self, wanted: List[str], start: int = 0, stop: int | None = None
+    ) -> Iterator[tuple[int, Dict[str, List[str]]]]:
+        """Decode the row groups overlapping rows ``start:stop``, with their first row number."""
+
+        stop = self.rows if stop is None else stop
+        offset = 0
+        with self.path.open("rb") as handle:
+            for group in self._groups:
+                count = group["rows"]
+                if offset + count > start and offset < stop:
+                    yield offset, {
+                        column: self._decode(handle, count, group["columns"][column]) for column in wanted
+                    }
+                offset += count
+                if offset >= stop:
+                    break
+
+    def read(self, columns: Sequence[str] | None = None) -> Dict[str, List[str]]:
+        """Return ``{column: values}`` for ``columns`` (default: all)."""
+
+        wanted = self._wanted(columns)
+        result: Dict[str, List[str]] = {column: [] for column in wanted}
+        for _, group in self._iter_groups(wanted):
+            for column in wanted:
+                result[column].extend(group[column])
+        return result
+
+    def iter_rows(
+        self, columns: Sequence[str] | None = None, start: int = 0, stop: int | None = None
+    ) -> Iterator[Dict[str, str]]:
+        """Yield rows ``start:stop`` as dicts of ``columns``.
+
+        Rows are decoded one row group at a time and groups outside the
+        range are skipped without being read.
+        """
+
+        wanted = self._wanted(columns)
+        stop = self.rows if stop is None else min(stop, self.rows)
+        for offset, group in self._iter_groups(wanted, start, stop):
+            low = max(start - offset, 0)
+            high = stop - offset
+            for values in zip(*(group[column][low:high] for column in wanted)):
+                yield dict(zip(wanted, values))
+
+
+def iter_dataset(directory: Path, columns: Sequence[str] | None = None) -> Iterator[Dict[str, str]]:
+    """Rows of the dataset in ``directory``, restricted to ``columns``.
+
+    Reads the columnar file when there is one and falls back to
+    ``output.csv`` for datasets processed before it existed.
+    """
+
+    path = directory / FILENAME
+    if path.exists():
+        yield from ColumnarReader(path).iter_rows(columns)
+        return
+    csv_path = directory / "output.csv"
+    if not csv_path.exists():
+        return
+    with csv_path.open(encoding="utf-8", newline="") as handle:
+        for row in csv.DictReader(handle, delimiter=";"):
+            yield row if columns is None else {column: row.get(column, "") for column in columns}
@@ -0,0 +1,524 @@
+"""Asynchronous event bus with a durable journal shared between processes.
+
+:meth:`EventBus.emit` never runs listeners on the calling thread. Every
+subscription owns a bounded queue and a dispatcher thread that delivers
+events one at a time or, with ``batch=True``, as lists of up to
+``batch_size`` events. When a queue is full the subscription's
+:class:`DropPolicy` decides: drop the oldest queued event, drop the new
+one, or make the emitter wait up to ``block_timeout`` seconds
+(backpressure) before dropping it. Deliveries, drops, failures and the
+delay between emission and delivery are recorded per listener in
+:class:`~api.app.services.metrics.MetricsService`.
+
+Events emitted with ``durable=True`` are also appended, in batches, to a
+JSON-lines journal; if the journal writer falls ``QUEUE_SIZE`` events
+behind, further durable events are dropped rather than stall the
+emitter. A process that calls :meth:`EventBus.follow_journal`
+tails it and delivers the events other processes wrote, which is how the
+worker's job updates reach the API. A named reader stores its position in
+a cursor file and resumes from there after a restart. The journal is
+rotated to ``<name>.1`` once it exceeds ``JOURNAL_MAX_BYTES``; readers
+finish the rotated file before moving on.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List
+
+from . import codec
+from .metrics import MetricsService
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts append without locking
+    fcntl = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+JOURNAL_FILE = Path("data/state/events.jsonl")
+JOURNAL_MAX_BYTES = 16 * 2**20
+QUEUE_SIZE = 1024
+BATCH_SIZE = 64
+POLL_INTERVAL = 0.5
+"""Seconds between journal reads when there was nothing new."""
+
+
+class DropPolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+
+@dataclass(frozen=True)
+class Event:
+    name: str
+    payload: Dict[str, Any]
+    emitted_at: float
+    origin: str
+
+    def to_line(self) -> bytes:
+        record = {"name": self.name, "payload": self.payload, "emitted_at": self.emitted_at, "origin": self.origin}
+        return codec.dumps(record) + b"\n"
+
+    @classmethod
+    def from_line(cls, line: bytes) -> "Event":
+        record = codec.loads(line)
+        return cls(record["name"], record["payload"], record["emitted_at"], record["origin"])
+
+
+class Subscription:
+    """One listener: a bounded queue drained by a dedicated dispatcher thread."""
+
+    def __init__(
+        self,
+        event_name: str,
+        callback: Callable[[Any], None],
+        name: str,
+        batch: bool = False,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        policy: DropPolicy = DropPolicy.DROP_OLDEST,
+        block_timeout: float = 1.0,
+        metrics: MetricsService | None = None,
+    ) -> None:
+        self.event_name = event_name
+        self.callback = callback
+        self.name = name
+        self.batch = batch
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.policy = DropPolicy(policy)
+        self.block_timeout = block_timeout
+        self._metrics = metrics or MetricsService.get_instance()
+        self._prefix = f"events.{event_name}.{name}"
+        self._queue: Deque[Event] = deque()
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"events-{name}", daemon=True)
+        self._thread.start()
+
+    def offer(self, event: Event) -> bool:
+        """Queue ``event``; returns ``False`` if it was dropped."""
+
+        with self._condition:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.queue_size and self.policy is DropPolicy.BLOCK:
+                deadline = time.monotonic() + self.block_timeout
+                while len(self._queue) >= self.queue_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            if len(self._queue) >= self.queue_size:
+                if self.policy is DropPolicy.DROP_OLDEST:
+                    self._queue.popleft()
+                else:
+                    self._metrics.increment(f"{self._prefix}.dropped")
+                    return False
+                self._metrics.increment(f"{self._prefix}.dropped")
+            self._queue.append(event)
+            self._condition.notify_all()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                count = min(len(self._queue), self.batch_size if self.batch else 1)
+                events = [self._queue.popleft() for _ in range(count)]
+                self._busy = True
+                # Wake emitters waiting for room.
+                self._condition.notify_all()
+            try:
+                self._deliver(events)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _deliver(self, events: List[Event]) -> None:
+        try:
+            if self.batch:
+                self.callback([event.payload for event in events])
+            else:
+                self.callback(events[0].payload)
+        except Exception:
+            self._metrics.increment(f"{self._prefix}.failed", len(events))
+            LOGGER.exception("Listener %s for %s failed", self.name, self.event_name)
+            return
+        delivered_at = time.time()
+        self._metrics.increment(f"{self._prefix}.delivered", len(events))
+        for event in events:
+            self._metrics.observe(f"{self._prefix}.latency_s", max(0.0, delivered_at - event.emitted_at))
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._queue) + self._busy
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop accepting events and deliver the queued ones."""
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+
+class EventJournal:
+    """Append-only JSON-lines file of durable events."""
+
+    def __init__(self, path: Path, max_bytes: int = JOURNAL_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @property
+    def rotated_path(self) -> Path:
+        return self.path.with_name(f"{self.path.name}.1")
+
+    def append(self, events: List[Event]) -> None:
+        if not events:
+            return
+        data = b"".join(event.to_line() for event in events)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with (self.path.parent / f"{self.path.name}.lock").open("a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+                    os.replace(self.path, self.rotated_path)
+                with self.path.open("ab") as handle:
+                    handle.write(data)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class _JournalWriter(Subscription):
+    """Appends durable events to the journal in batches, off the emitting thread.
+
+    Emitters never wait for the disk: when ``QUEUE_SIZE`` events are
+    already waiting, new ones are dropped and counted in
+    ``events.journal.dropped``.
+    """
+
+    def __init__(self, journal: EventJournal, metrics: MetricsService) -> None:
+        self.journal = journal
+        super().__init__(
+            "journal",
+            journal.append,
+            "writer",
+            batch=True,
+            queue_size=QUEUE_SIZE,
+            policy=DropPolicy.DROP_NEWEST,
+            metrics=metrics,
+        )
+        self._prefix = "events.journal"
+
+    def _deliver(self, events: List[Event]) -> None:
+        try:
+            self.journal.append(events)
+        except OSError:
+            self._metrics.increment("events.journal.failed", len(events))
+            LOGGER.exception("Cannot append %d events to %s", len(events), self.journal.path)
+            return
+        self._metrics.increment("events.journal.written", len(events))
+
+
+class JournalReader:
+    """Reads journal events appended after it started (or after its saved cursor)."""
+
+    def __init__(self, journal: EventJournal, cursor: Path | None = None) -> None:
+        self.journal = journal
+        self.cursor = cursor
+        self._handle = None
+        self._inode: int | None = None
+        self._saved: tuple[int, int] | None = None
+        self._started = False
+
+    def _open(self) -> bool:
+        path = self.journal.path
+        saved = self._saved = self._load_cursor()
+        if saved is not None and saved[0] != self._stat_inode(path) and saved[0] == self._stat_inode(
+            self.journal.rotated_path
+        ):
+            # Rotated while this reader was stopped: finish the old file first.
+            path = self.journal.rotated_path
+        first, self._started = not self._started, True
+        if not path.exists():
+            return False
+        handle = path.open("rb")
+        inode = os.fstat(handle.fileno()).st_ino
+        if saved is not None and saved[0] == inode:
+            handle.seek(saved[1])
+        elif first and saved is None:
+            # A reader without a cursor starts with the events emitted after it.
+            handle.seek(0, os.SEEK_END)
+        self._handle, self._inode = handle, inode
+        return True
+
+    @staticmethod
+    def _stat_inode(path: Path) -> int | None:
+        try:
+            return path.stat().st_ino
+        except FileNotFoundError:
+            return None
+
+    def _load_cursor(self) -> tuple[int, int] | None:
+        if self.cursor is None or not self.cursor.exists():
+            return None
+        try:
+            inode, offset = codec.read(self.cursor)
+        except (ValueError, TypeError):
+            return None
+        return int(inode), int(offset)
+
+    def _save_cursor(self) -> None:
+        if self.cursor is None or self._handle is None or self._inode is None:
+            return
+        position = (self._inode, self._handle.tell())
+        if position != self._saved:
+            codec.write(self.cursor, list(position))
+            self._saved = position
+
+    def read(self) -> List[Event]:
+        """Complete events appended since the previous call."""
+
+        if self._handle is None and not self._open():
+            return []
+        events: List[Event] = []
+        while True:
+            assert self._handle is not None
+            start = self._handle.tell()
+            for line in self._handle:
+                if not line.endswith(b"\n"):
+                    # A writer is halfway through this line.
+                    self._handle.seek(start)
+                    break
+                start += len(line)
+                try:
+                    events.append(Event.from_line(line))
+                except (ValueError, KeyError):
+                    LOGGER.warning("Skipping malformed event journal line in %s", self.journal.path)
+            if self._stat_inode(self.journal.path) in (self._inode, None):
+                break
+            # The journal was rotated and this file is drained: move to the new one.
+            self._handle.close()
+            self._handle = self.journal.path.open("rb")
+            self._inode = os.fstat(self._handle.fileno()).st_ino
+        self._save_cursor()
+        return events
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class EventBus:
+    def __init__(self, journal: EventJournal | None = None, metrics: MetricsService | None = None) -> None:
+        self.journal = journal or EventJournal(JOURNAL_FILE)
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._metrics = metrics or MetricsService.get_instance()
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._writer: Subscription | None = None
+        self._reader: JournalReader | None = None
+        self._follower: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def subscribe(
+        self,
+        event_name: str,
+        callback: Callable[[Any], None],
+        *,
+        name: str | None = None,
+        batch: bool = False,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        policy: DropPolicy = DropPolicy.DROP_OLDEST,
+        block_timeout: float = 1.0,
+    ) -> Subscription:
+        """Deliver ``event_name`` payloads to ``callback`` on its own thread.
+
+        With ``batch=True`` the callback receives a list of payloads.
+        ``name`` labels the listener in metrics and defaults to the
+        callback's qualified name.
+        """
+
+        subscription = Subscription(
+            event_name,
+            callback,
+            name or getattr(callback, "__qualname__", "listener"),
+            batch=batch,
+            queue_size=queue_size,
+            batch_size=batch_size,
+            policy=policy,
+            block_timeout=block_timeout,
+            metrics=self._metrics,
+        )
+        with self._lock:
+            self._subscriptions.setdefault(event_name, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            listeners = self._subscriptions.get(subscription.event_name, [])
+            if subscription in listeners:
+                listeners.remove(subscription)
+        subscription.close()
+
+    def clear(self, event_name: str | None = None) -> None:
+        with self._lock:
+            if event_name is None:
+                removed = [sub for subs in self._subscriptions.values() for sub in subs]
+                self._subscriptions.clear()
+            else:
+                removed = self._subscriptions.pop(event_name, [])
+        for subscription in removed:
+            subscription.close()
+
+    def emit(self, event_name: str, payload: Dict[str, Any], durable: bool = False) -> None:
+        """Queue ``payload`` for every listener of ``event_name``; never runs a listener here.
+
+        ``durable`` events are also journaled for listeners in other processes.
+        """
+
+        event = Event(event_name, payload, time.time(), self.origin)
+        self._metrics.increment(f"events.{event_name}.emitted")
+        if durable:
+            self._journal_writer().offer(event)
+        self._dispatch(event)
+
+    def _dispatch(self, event: Event) -> None:
+        with self._lock:
+            listeners = list(self._subscriptions.get(event.name, ()))
+        for subscription in listeners:
+            subscription.offer(event)
+
+    def _journal_writer(self) -> Subscription:
+        with self._lock:
+            if self._writer is None:
+                self._writer = _JournalWriter(self.journal, self._metrics)
+            return self._writer
+
+    def follow_journal(self, consumer: str | None = None, interval: float = POLL_INTERVAL) -> None:
+        """Deliver durable events emitted by other processes to this bus's listeners.
+
+        A ``consumer`` name keeps a cursor next to the journal, so events
+        written while this process was down are delivered when it starts.
+        """
+
+        if self._follower is not None:
+            return
+        cursor = self.journal.path.with_name(f"{self.journal.path.name}.{consumer}.cursor") if consumer else None
+        self._reader = JournalReader(self.journal, cursor)
+        self._reader.read()  # position the reader before returning
+        self._stop.clear()
+        self._follower = threading.Thread(target=self._follow, args=(interval,), name="events-journal", daemon=True)
+        self._follower.start()
+
+    def poll_journal(self) -> int:
+        """Read the journal once; returns the number of foreign events dispatched."""
+
+        if self._reader is None:
+            return 0
+        count = 0
+        for event in self._reader.read():
+            if event.origin != self.origin:
+                self._dispatch(event)
+                count += 1
+        return count
+
+    def _follow(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                found = self.poll_journal()
+            except Exception:  # pragma: no cover - defensive logging
+                LOGGER.exception("Reading the event journal failed")
+                found = 0
+            if not found:
+                self._stop.wait(interval)
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Wait until every queued event was delivered (and journaled)."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            subscriptions = [sub for subs in self._subscriptions.values() for sub in subs]
+            if self._writer is not None:
+                subscriptions.append(self._writer)
+        for subscription in subscriptions:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not subscription.wait_idle(remaining):
+                return False
+        return True
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Stop following the journal and drain every queue."""
+
+        self._stop.set()
+        if self._follower is not None:
+            self._follower.join(timeout)
+            self._follower = None
+        self.clear()
+        if self._writer is not None:
+            self._writer.close(timeout)
+            self._writer = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+_BUS: EventBus | None = None
+_BUS_LOCK = threading.Lock()
+
+
+def get_bus() -> EventBus:
+    """The process-wide bus, journaling to ``JOURNAL_FILE``."""
+
+    global _BUS
+    if _BUS is None:
+        with _BUS_LOCK:
+            if _BUS is None:
+                _BUS = EventBus()
+    return _BUS
+
+
+def reset_bus() -> None:
+    """Close the process-wide bus; the next :func:`get_bus` starts a new one."""
+
+    global _BUS
+    with _BUS_LOCK:
+        bus, _BUS = _BUS, None
+    if bus is not None:
+        bus.close()
+
+
+# Journal durable events still queued when the process exits.
+atexit.register(reset_bus)
@@ -1,17 +1,16 @@
 from __future__ import annotations
 
-import csv
 import json
 import logging
 import shutil
 import threading
 import uuid
-from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Sequence
 
 from ..schemas import JobCreate, JobDetail, JobList, JobStatus, JobSummary
+from . import codec, columnar, events
 from .metrics import MetricsService
 from .master_data import DATA_DIR as MASTER_DATA_DIR
 from ml.registry import ModelRecord, ModelRegistry
@@ -24,26 +23,24 @@ PROCESSED_DIR = Path("data/processed")
 APPROVED_DIR = Path("data/approved")
 
 EventCallback = Callable[[dict[str, Any]], None]
-_EVENT_LISTENERS: Dict[str, list[EventCallback]] = defaultdict(list)
 
 
-def subscribe(event_name: str, callback: EventCallback) -> None:
-    _EVENT_LISTENERS[event_name].append(callback)
+def subscribe(event_name: str, callback: EventCallback, **options: Any) -> events.Subscription:
+    """Run ``callback`` for every ``event_name`` event on a dispatcher thread.
+
+    ``options`` are passed to :meth:`~api.app.services.events.EventBus.subscribe`.
+    """
+
+    return events.get_bus().subscribe(event_name, callback, **options)
 
 
 def clear_event_listeners(event_name: str | None = None) -> None:
-    if event_name:
-        _EVENT_LISTENERS.pop(event_name, None)
-    else:
-        _EVENT_LISTENERS.clear()
+    events.get_bus().clear(event_name)
 
 
-def emit(event_name: str, payload: dict[str, Any]) -> None:
-    for callback in list(_EVENT_LISTENERS.get(event_name, [])):
-        try:
-            callback(payload)
-        except Exception:  # pragma: no cover - defensive logging
-            LOGGER.exception("Event listener for %s failed", event_name)
+def emit(event_name: str, payload: dict[str, Any], durable: bool = False) -> None:
+    events.get_bus().emit(event_name, payload, durable=durable)
+
 
 for directory in (STATE_FILE.parent, INCOMING_DIR, PROCESSED_DIR, APPROVED_DIR):
     directory.mkdir(parents=True, exist_ok=True)
@@ -55,10 +52,27 @@ class JobService:
         self._metrics = MetricsService.get_instance()
         self._state: dict[str, dict[str, Any]] = {}
         if STATE_FILE.exists():
-            self._state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+            self._state = codec.read(STATE_FILE)
 
     def _persist(self) -> None:
-        STATE_FILE.write_text(json.dumps(self._state, indent=2, default=str), encoding="utf-8")
+        codec.write(STATE_FILE, self._state)
+
+    def follow_events(self, consumer: str | None = None) -> None:
+        """Apply ``job.status`` events from other processes to this instance's state.
+
+        Each process keeps its own copy of the job state, so without this
+        the API would not see the worker's progress until a restart.
+        """
+
+        subscribe("job.status", self._apply_status, name="job-state", batch=True)
+        events.get_bus().follow_journal(consumer)
+
+    def _apply_status(self, records: list[dict[str, Any]]) -> None:
+        with self._lock:
+            for record in records:
+                current = self._state.get(record["job_id"])
+                if current is None or record["updated_at"] > current["updated_at"]:
+                    self._state[record["job_id"]] = record
 
     def create(self, payload: JobCreate) -> JobDetail:
         job_id = uuid.uuid4().hex
@@ -111,6 +125,9 @@ class JobService:
             record["status"] = status.value
             record["updated_at"] = datetime.utcnow().isoformat()
             self._persist()
+            snapshot = dict(record)
+        # Durable, so the API's copy of the state follows the worker's updates.
+        emit("job.status", snapshot, durable=True)
         LOGGER.info("Job %s status -> %s", job_id, status.value, extra={"job_id": job_id, "status": status.value})
         return JobDetail(**record)
 
@@ -121,21 +138,72 @@ class JobService:
         self.update_status(job_id, JobStatus.FAILED, error=error)
 
     def approve(self, job_id: str, approver: str, notes: str | None = None) -> JobDetail:
-        detail = self.get(job_id)
-        updated = self.update_status(
-            job_id,
-            JobStatus.APPROVED,
-            approved_at=datetime.utcnow().isoformat(),
-            metadata={**detail.metadata, "approved_by": approver, "notes": notes},
-        )
-        self._metrics.increment("jobs.approved")
         try:
-            self._materialize_approval(updated)
-        except FileNotFoundError:
-            LOGGER.warning("Approved job %s is missing processed artifacts", job_id)
-        return updated
+            (approved,) = self.approve_many([job_id], approver=approver, notes=notes)
+        except KeyError as exc:
+            raise KeyError(job_id) from exc
+        self.materialize_approvals([approved])
+        return approved
+
+    def approve_many(self, job_ids: Sequence[str], approver: str, notes: str | None = None) -> list[JobDetail]:
+        """Mark ``job_ids`` approved with a single state write.
+
+        Every ID is checked first: if any is unknown, :class:`KeyError`
+        lists the missing IDs and no job changes. Duplicates are approved
+        once, and ``job.status`` is emitted once per job. Artifacts are not touched; pass the result to
+        :meth:`materialize_approvals`.
+        """
+
+        unique_ids = list(dict.fromkeys(job_ids))
+        with self._lock:
+            missing = [job_id for job_id in unique_ids if job_id not in self._state]
+            if missing:
+                raise KeyError(missing)
+            now = datetime.utcnow().isoformat()
+            for job_id in unique_ids:
+                record = self._state[job_id]
+                record["metadata"] = {**record.get("metadata", {}), "approved_by": approver, "notes": notes}
+                record["approved_at"] = now
+                record["status"] = JobStatus.APPROVED.value
+                record["updated_at"] = now
+            self._persist()
+            snapshots = [dict(self._state[job_id]) for job_id in unique_ids]
+        approved = [JobDetail(**snapshot) for snapshot in snapshots]
+        status = JobStatus.APPROVED.value
+        for job_id, snapshot in zip(unique_ids, snapshots):
+            emit("job.status", snapshot, durable=True)
+            LOGGER.info("Job %s status -> %s", job_id, status, extra={"job_id": job_id, "status": status})
+        self._metrics.increment("jobs.approved", len(approved))
+        return approved
+
+    def materialize_approvals(self, jobs: Sequence[JobDetail]) -> None:
+        """Copy the artifacts of approved ``jobs`` and register their dataset candidates.
+
+        The master-data version is computed once and every candidate is
+        registered in one registry transaction. Jobs without processed
+        output are skipped with a warning.
+        """
+
+        copied = []
+        for job in jobs:
+            try:
+                copied.append((job, self._copy_approval(job)))
+            except FileNotFoundError:
+                LOGGER.warning("Approved job %s is missing processed artifacts", job.job_id)
+        if not copied:
+            return
+        master_data_version = self._master_data_version()
+        records = ModelRegistry().register_many(
+            [(f"dataset-{job.job_id}", self._candidate_metrics(job.job_id)) for job, _ in copied],
+            status="candidate",
+        )
+        for (job, (approved_dir, csv_dest, preview_dest, incoming_dest)), record in zip(copied, records):
+            meta = self._build_meta(job, record, csv_dest, preview_dest, incoming_dest, master_data_version)
+            meta_path = approved_dir / "meta.json"
+            meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+            emit("result.approved", {"meta": meta, "path": str(approved_dir)})
 
-    def _materialize_approval(self, job: JobDetail) -> None:
+    def _copy_approval(self, job: JobDetail) -> tuple[Path, Path, Path | None, Path]:
         job_id = job.job_id
         processed_dir = PROCESSED_DIR / job_id
         csv_src = processed_dir / "output.csv"
@@ -151,6 +219,9 @@ class JobService:
         approved_dir.mkdir(parents=True, exist_ok=True)
         csv_dest = approved_dir / "output.csv"
         shutil.copy2(csv_src, csv_dest)
+        columns_src = processed_dir / columnar.FILENAME
+        if columns_src.exists():
+            shutil.copy2(columns_src, approved_dir / columnar.FILENAME)
         preview_src = processed_dir / "preview.json"
         preview_dest: Path | None = None
         if preview_src.exists():
@@ -167,24 +238,20 @@ class JobService:
                     shutil.copytree(source, destination, dirs_exist_ok=True)
                 else:
                     shutil.copy2(source, destination)
-
-        record = self._register_candidate(job_id, csv_src)
-        meta = self._build_meta(job, record, csv_dest, preview_dest, incoming_dest)
-        meta_path = approved_dir / "meta.json"
-        meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
-        emit("result.approved", {"meta": meta, "path": str(approved_dir)})
-
-    def _register_candidate(self, job_id: str, csv_path: Path) -> ModelRecord:
-        with csv_path.open(encoding="utf-8") as handle:
-            reader = csv.DictReader(handle, delimiter=";")
-            rows = list(reader)
-        metrics: dict[str, Any] = {"rows": len(rows), "job_id": job_id}
-        if rows:
-            first_row = rows[0]
+        return approved_dir, csv_dest, preview_dest, incoming_dest
+
+    def _candidate_metrics(self, job_id: str) -> dict[str, Any]:
+        rows = 0
+        first_row: dict[str, str] | None = None
+        for row in columnar.iter_dataset(PROCESSED_DIR / job_id, ["ORGAO", "TIPO"]):
+            if first_row is None:
+                first_row = row
+            rows += 1
+        metrics: dict[str, Any] = {"rows": rows, "job_id": job_id}
+        if first_row is not None:
             metrics["sample_orgao"] = first_row.get("ORGAO")
             metrics["sample_tipo"] = first_row.get("TIPO")
-        registry = ModelRegistry()
-        return registry.register(model_name=f"dataset-{job_id}", metrics=metrics, status="candidate")
+        return metrics
 
     def _build_meta(
         self,
@@ -193,6 +260,7 @@ class JobService:
         csv_dest: Path,
         preview_dest: Path | None,
         incoming_dest: Path,
+        master_data_version: str,
     ) -> dict[str, Any]:
         job_payload = json.loads(job.json())
         artifacts: dict[str, Any] = {
@@ -208,7 +276,7 @@ class JobService:
                 "version": record.version,
                 "status": record.status,
             },
-            "master_data": self._master_data_version(),
+            "master_data": master_data_version,
         }
         return {"job": job_payload, "artifacts": artifacts, "versions": versions}
 
@@ -233,7 +301,7 @@ class JobService:
         payload = {
             "job_id": job.job_id,
             "filename": job.filename,
-            "received_at": job.created_at,
+            "received_at": job.created_at.isoformat(),
         }
         with QUEUE_FILE.open("a", encoding="utf-8") as handle:
             handle.write(json.dumps(payload) + "\n")
@@ -241,6 +309,24 @@ class JobService:
         self._metrics.increment("jobs.queued")
         LOGGER.info("Job %s enqueued", job.job_id, extra={"job_id": job.job_id})
 
+    def exists(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._state
+
+    def enqueue_reprocess(self, job_id: str, from_stage: str | None = None) -> None:
+        if not self.exists(job_id):
+            raise KeyError(job_id)
+        payload = {"job_id": job_id, "action": "reprocess", "from_stage": from_stage}
+        with QUEUE_FILE.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(payload) + "\n")
+        self._metrics.increment("jobs.reprocess_queued")
+        LOGGER.info("Job %s enqueued for reprocessing", job_id, extra={"job_id": job_id})
+
+    def reprocessable_jobs(self) -> list[str]:
+        eligible = {JobStatus.COMPLETED.value, JobStatus.APPROVED.value}
+        with self._lock:
+            return [job_id for job_id, data in self._state.items() if data.get("status") in eligible]
+
     def set_processing(self, job_id: str) -> None:
         self.update_status(job_id, JobStatus.PROCESSING)
         self._metrics.increment("jobs.processing")
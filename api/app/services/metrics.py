@@ -1,8 +1,67 @@
+"""Process metrics, shared between the API, the worker and its pool.
+
+Counters and summaries are sharded per thread: a thread only ever writes
+its own shard, so :meth:`MetricsService.increment` takes no lock, and
+reads merge the shards. Shards of finished threads are folded into one.
+
+Every long-lived process runs a :class:`MetricsPublisher` that writes its
+totals to ``METRICS_DIR/<role>-<token>.json`` every few seconds, and
+:func:`aggregate` merges those files into the view served by
+``GET /metrics``. Files not refreshed for ``RETIRE_AFTER`` seconds belong
+to processes that exited; their counters are folded into
+``retired.json`` so totals survive restarts. Process-pool children do
+not publish: their tasks hand :meth:`MetricsService.delta` back to the
+parent, which :meth:`~MetricsService.merge` s it.
+"""
+
 from __future__ import annotations
 
+import logging
+import os
 import threading
-from collections import defaultdict
-from typing import Dict
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from . import codec
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts publish without locking
+    fcntl = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+METRICS_DIR = Path("data/state/metrics")
+PUBLISH_INTERVAL = 5.0
+RETIRE_AFTER = 60.0
+"""Seconds without a refresh after which a process's file is folded into ``retired.json``."""
+
+Summary = Tuple[int, float, float]
+"""``(count, sum, max)`` of the observed samples."""
+
+
+def _merge_summary(left: Summary | None, right: Summary) -> Summary:
+    if left is None:
+        return right
+    return left[0] + right[0], left[1] + right[1], max(left[2], right[2])
+
+
+class _Shard:
+    __slots__ = ("counters", "summaries", "thread")
+
+    def __init__(self, thread: threading.Thread | None) -> None:
+        self.counters: Dict[str, int] = {}
+        self.summaries: Dict[str, Summary] = {}
+        self.thread = thread
+
+    def add(self, counters: Dict[str, int], summaries: Dict[str, Summary]) -> None:
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        for name, summary in summaries.items():
+            self.summaries[name] = _merge_summary(self.summaries.get(name), tuple(summary))  # type: ignore[arg-type]
 
 
 class MetricsService:
@@ -10,8 +69,12 @@ class MetricsService:
     _lock = threading.Lock()
 
     def __init__(self) -> None:
-        self._counters: Dict[str, int] = defaultdict(int)
         self._gauges: Dict[str, float] = {}
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        # Shards of finished threads and deltas merged from pool children.
+        self._folded = _Shard(None)
+        self._baseline: Dict[str, Any] = {"counters": {}, "summaries": {}}
         self._lock = threading.Lock()
 
     @classmethod
@@ -22,23 +85,285 @@ class MetricsService:
                     cls._instance = cls()
         return cls._instance
 
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
     def increment(self, name: str, value: int = 1) -> None:
-        with self._lock:
-            self._counters[name] += value
+        counters = self._shard().counters
+        counters[name] = counters.get(name, 0) + value
 
-    def get_counter(self, name: str) -> int:
-        with self._lock:
-            return self._counters[name]
+    def observe(self, name: str, value: float) -> None:
+        """Record one sample; the snapshot reports its count, sum and max."""
+
+        summaries = self._shard().summaries
+        summary = summaries.get(name)
+        # Replaced whole, so a concurrent read never sees a torn summary.
+        summaries[name] = (1, value, value) if summary is None else (
+            summary[0] + 1,
+            summary[1] + value,
+            max(summary[2], value),
+        )
 
     def set_gauge(self, name: str, value: float) -> None:
-        with self._lock:
-            self._gauges[name] = value
+        self._gauges[name] = value
 
     def get_gauge(self, name: str) -> float:
+        return self._gauges.get(name, 0.0)
+
+    def _merged(self) -> Tuple[Dict[str, int], Dict[str, Summary]]:
         with self._lock:
-            return self._gauges.get(name, 0.0)
+            live = []
+            for shard in self._shards:
+                if shard.thread is not None and not shard.thread.is_alive():
+                    # The thread is gone, so nothing writes this shard any more.
+                    self._folded.add(shard.counters, shard.summaries)
+                else:
+                    live.append(shard)
+            self._shards = live
+            counters = dict(self._folded.counters)
+            summaries = dict(self._folded.summaries)
+            for shard in live:
+                # dict() copies atomically, the owning thread may be writing.
+                for name, value in dict(shard.counters).items():
+                    counters[name] = counters.get(name, 0) + value
+                for name, summary in dict(shard.summaries).items():
+                    summaries[name] = _merge_summary(summaries.get(name), summary)
+        return counters, summaries
+
+    def get_counter(self, name: str) -> int:
+        return self._merged()[0].get(name, 0)
+
+    def get_summary(self, name: str) -> dict[str, float]:
+        count, total, peak = self._merged()[1].get(name, (0, 0.0, 0.0))
+        return {"count": count, "sum": total, "max": peak}
+
+    def collect(self) -> Dict[str, Any]:
+        """Merged ``counters``, ``gauges`` and ``summaries`` of this process."""
+
+        counters, summaries = self._merged()
+        return {"counters": counters, "gauges": dict(self._gauges), "summaries": summaries}
+
+    def delta(self) -> Dict[str, Any]:
+        """Counters and summaries recorded since the previous call.
+
+        Summary maxima are not reset; the delta carries the running max.
+        """
+
+        current = self.collect()
+        previous = self._baseline
+        self._baseline = current
+        counters = {
+            name: value - previous["counters"].get(name, 0)
+            for name, value in current["counters"].items()
+            if value != previous["counters"].get(name, 0)
+        }
+        summaries = {}
+        for name, (count, total, peak) in current["summaries"].items():
+            before = previous["summaries"].get(name, (0, 0.0, 0.0))
+            if count != before[0]:
+                summaries[name] = (count - before[0], total - before[1], peak)
+        return {"counters": counters, "summaries": summaries}
+
+    def merge(self, delta: Dict[str, Any]) -> None:
+        """Add a :meth:`delta` taken in another process."""
 
-    def snapshot(self) -> dict[str, float | int]:
         with self._lock:
-            data = {**self._counters, **self._gauges}
-        return data
+            self._folded.add(delta.get("counters", {}), delta.get("summaries", {}))
+
+    def snapshot(self) -> dict[str, float | int]:
+        return _flatten(self.collect())
+
+
+def _flatten(view: Dict[str, Any]) -> dict[str, float | int]:
+    data: dict[str, float | int] = {**view["counters"], **view["gauges"]}
+    for name, (count, total, peak) in view["summaries"].items():
+        data[f"{name}.count"] = count
+        data[f"{name}.sum"] = total
+        data[f"{name}.max"] = peak
+    return data
+
+
+@contextmanager
+def _locked(directory: Path) -> Iterator[None]:
+    directory.mkdir(parents=True, exist_ok=True)
+    with (directory / ".lock").open("a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class MetricsPublisher:
+    """Writes this process's metrics to ``METRICS_DIR`` every ``interval`` seconds."""
+
+    def __init__(
+        self,
+        role: str,
+        service: MetricsService | None = None,
+        directory: Path | None = None,
+        interval: float = PUBLISH_INTERVAL,
+    ) -> None:
+        self.role = role
+        self.token = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.interval = interval
+        self.service = service or MetricsService.get_instance()
+        self._directory = directory
+        self._written: Dict[str, Any] | None = None
+        # Totals already folded into retired.json, left out of later files.
+        self._offset: Dict[str, Any] = {"counters": {}, "summaries": {}}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or METRICS_DIR
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{self.role}-{self.token}.json"
+
+    def publish(self) -> None:
+        view = self.service.collect()
+        with _locked(self.directory):
+            if self._written is not None and not self.path.exists():
+                # Retired while this process was stalled; its totals so far
+                # are already counted in retired.json.
+                self._offset = self._written
+            offset = self._offset
+            counters = {
+                name: value - offset["counters"].get(name, 0) for name, value in view["counters"].items()
+            }
+            summaries = {}
+            for name, (count, total, peak) in view["summaries"].items():
+                before = offset["summaries"].get(name, (0, 0.0, 0.0))
+                summaries[name] = (count - before[0], total - before[1], peak)
+            codec.write(
+                self.path,
+                {
+                    "role": self.role,
+                    "pid": os.getpid(),
+                    "published_at": time.time(),
+                    "counters": counters,
+                    "gauges": view["gauges"],
+                    "summaries": summaries,
+                },
+            )
+            self._written = view
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-publisher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.publish()
+            except OSError:
+                LOGGER.warning("Cannot publish metrics to %s", self.path, exc_info=True)
+
+    def stop(self) -> None:
+        """Stop the thread and publish the final totals."""
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.publish()
+        except OSError:
+            LOGGER.warning("Cannot publish metrics to %s", self.path, exc_info=True)
+
+
+def aggregate(
+    publisher: MetricsPublisher | None = None,
+    directory: Path | None = None,
+    retire_after: float = RETIRE_AFTER,
+) -> Dict[str, Any]:
+    """Metrics of every process that published to ``directory``, merged.
+
+    With ``publisher``, its process contributes its live metrics instead
+    of its last published file. Counters and summaries are summed; a gauge
+    comes from the process that published it last.
+    """
+
+    directory = directory or (publisher.directory if publisher is not None else METRICS_DIR)
+    exclude = publisher.path.name if publisher is not None else None
+    now = time.time()
+    retired_path = directory / "retired.json"
+    total = _Shard(None)
+    gauges: Dict[str, Tuple[float, float]] = {}
+    processes: List[Dict[str, Any]] = []
+    with _locked(directory):
+        retired = _Shard(None)
+        if retired_path.exists():
+            data = codec.read(retired_path)
+            retired.add(data["counters"], data["summaries"])
+        changed = False
+        for path in sorted(directory.glob("*-*.json")):
+            try:
+                data = codec.read(path)
+            except (OSError, ValueError):
+                continue
+            if path.name == exclude:
+                continue
+            if now - data["published_at"] > retire_after:
+                retired.add(data["counters"], data["summaries"])
+                path.unlink()
+                changed = True
+                continue
+            total.add(data["counters"], data["summaries"])
+            for name, value in data["gauges"].items():
+                if name not in gauges or gauges[name][0] < data["published_at"]:
+                    gauges[name] = (data["published_at"], value)
+            processes.append({"role": data["role"], "pid": data["pid"], "published_at": data["published_at"]})
+        if changed:
+            codec.write(retired_path, {"counters": retired.counters, "summaries": retired.summaries})
+    total.add(retired.counters, retired.summaries)
+    merged_gauges = {name: value for name, (_, value) in gauges.items()}
+    if publisher is not None:
+        view = publisher.service.collect()
+        total.add(view["counters"], view["summaries"])
+        merged_gauges.update(view["gauges"])
+        processes.append({"role": publisher.role, "pid": os.getpid(), "published_at": now})
+    return {
+        "counters": total.counters,
+        "gauges": merged_gauges,
+        "summaries": total.summaries,
+        "processes": processes,
+    }
+
+
+_PUBLISHER: MetricsPublisher | None = None
+
+
+def start_publisher(role: str) -> MetricsPublisher:
+    """Start publishing this process's metrics under ``role``."""
+
+    global _PUBLISHER
+    if _PUBLISHER is None:
+        _PUBLISHER = MetricsPublisher(role)
+        _PUBLISHER.start()
+    return _PUBLISHER
+
+
+def stop_publisher() -> None:
+    global _PUBLISHER
+    publisher, _PUBLISHER = _PUBLISHER, None
+    if publisher is not None:
+        publisher.stop()
+
+
+def current_publisher() -> MetricsPublisher | None:
+    return _PUBLISHER
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Compare the indexed sigla matcher with the linear ``difflib`` scan.
+
+Usage: python benchmarks/bench_fuzzy.py [--registry 5000] [--queries 2000] [--seed 7]
+
+Also trains a sigla corrector on simulated OCR confusions of half the
+registry and compares it, ahead of the indexed matcher, with the matcher
+alone on unseen confusions of the other half.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import sys
+import time
+from difflib import get_close_matches
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from ml.corrector import fit_corrector  # noqa: E402
+from worker.src.sigla_index import SiglaIndex  # noqa: E402
+
+ALPHABET = string.ascii_uppercase + "0123456789"
+OCR_CONFUSIONS = {"O": "0", "S": "5", "I": "1", "B": "8", "G": "6", "Z": "2"}
+
+
+def _registry(size: int, rng: random.Random) -> list[str]:
+    siglas: set[str] = set()
+    while len(siglas) < size:
+        length = rng.choice((2, 3, 3, 4, 4, 5, 6, 8))
+        siglas.add("".join(rng.choice(ALPHABET) for _ in range(length)))
+    return sorted(siglas)
+
+
+def _typo(sigla: str, rng: random.Random) -> str:
+    chars = list(sigla)
+    operation = rng.choice(("replace", "insert", "delete", "swap", "keep"))
+    position = rng.randrange(len(chars))
+    if operation == "replace":
+        chars[position] = rng.choice(ALPHABET)
+    elif operation == "insert":
+        chars.insert(position, rng.choice(ALPHABET))
+    elif operation == "delete" and len(chars) > 1:
+        del chars[position]
+    elif operation == "swap" and len(chars) > 1:
+        other = (position + 1) % len(chars)
+        chars[position], chars[other] = chars[other], chars[position]
+    return "".join(chars)
+
+
+def _misread(sigla: str, rng: random.Random) -> str:
+    return "".join(OCR_CONFUSIONS[char] if char in OCR_CONFUSIONS and rng.random() < 0.5 else char for char in sigla)
+
+
+def _bench_corrector(keys: list[str], index: SiglaIndex, queries: int, rng: random.Random) -> None:
+    master = dict.fromkeys(keys, {})
+    confusable = [key for key in keys if any(char in OCR_CONFUSIONS for char in key)]
+    rng.shuffle(confusable)
+    half = len(confusable) // 2
+    corrector, _ = fit_corrector((_misread(key, rng), key) for key in confusable[:half])
+    corrector.memory.clear()  # only the learned edit costs, as for typos never approved before
+    cases: list[tuple[str, str]] = []
+    while len(cases) < queries:
+        key = rng.choice(confusable[half:])
+        raw = _misread(key, rng)
+        if raw != key and raw not in master:
+            cases.append((raw, key))
+
+    started = time.perf_counter()
+    matched = [index.best_match(raw, cutoff=0.7) for raw, _ in cases]
+    index_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    corrected = []
+    for raw, _ in cases:
+        candidate = corrector.correct(raw, master)
+        if candidate is None:
+            best = index.best_match(raw, cutoff=0.7)
+            candidate = best[0] if best else None
+        corrected.append(candidate)
+    corrector_seconds = time.perf_counter() - started
+
+    index_hits = sum(1 for best, (_, key) in zip(matched, cases) if best and best[0] == key)
+    corrector_hits = sum(1 for candidate, (_, key) in zip(corrected, cases) if candidate == key)
+    print(f"OCR confusions ({len(cases)} queries, corrector trained on {half} keys):")
+    print(f"  indexed matcher:  {index_seconds:.3f} s, {index_hits / len(cases):.1%} correct")
+    print(f"  corrector+index:  {corrector_seconds:.3f} s, {corrector_hits / len(cases):.1%} correct")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--registry", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keys = _registry(args.registry, rng)
+    queries = [_typo(rng.choice(keys), rng) for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    index = SiglaIndex(keys)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    linear = [get_close_matches(query, keys, n=1, cutoff=0.7) for query in queries]
+    linear_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexed = [index.best_match(query, cutoff=0.7) for query in queries]
+    indexed_seconds = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for expected, actual in zip(linear, indexed) if (expected[0] if expected else None) != (actual[0] if actual else None)
+    )
+    print(f"registry={len(keys)} queries={len(queries)}")
+    print(f"index build: {build_seconds * 1000:.1f} ms")
+    print(f"difflib linear scan: {linear_seconds:.3f} s ({len(queries) / linear_seconds:,.0f} lookups/s)")
+    print(f"indexed matcher:     {indexed_seconds:.3f} s ({len(queries) / indexed_seconds:,.0f} lookups/s)")
+    print(f"speed-up: {linear_seconds / indexed_seconds:.1f}x, mismatches: {mismatches}")
+    _bench_corrector(keys, index, args.queries, rng)
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Per-stage throughput and peak memory of the worker pipeline.
+
+Usage: python benchmarks/bench_pipeline.py [--lines 1000 10000 100000] [--format txt|zip] [--seed 7]
+                                            [--baseline benchmarks/baselines.json] [--update-baseline]
+                                            [--tolerance 0.3] [--repeat 3] [--no-memory] [--json results.json]
+
+Each scenario generates a seeded document with ``synthetic_docs`` (plus the
+matching master data, installed as the matcher snapshot) and runs OCR,
+layout, segmentation, extraction, normalization, validation and CSV
+writing the way the sequential worker path does. Throughput comes from the
+best of ``--repeat`` untraced runs; peak memory per stage from one more run
+under ``tracemalloc``, which is slower but does not skew the timings.
+
+With a baseline file, every stage is compared with the stored scenario:
+lines/s more than ``--tolerance`` below the baseline, or peak memory more
+than ``--tolerance`` above it, is a regression and the script exits with
+status 1. Stages whose baseline is under ``MIN_SECONDS`` are compared as if
+they took ``MIN_SECONDS``, since such short timings are mostly noise. Baselines are machine specific; refresh them with
+``--update-baseline`` on the machine that runs the comparison.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks import synthetic_docs  # noqa: E402
+from worker.src import csv_writer, extract, fuzzy, layout, normalize, ocr, segment, spill, validate  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).with_name("baselines.json")
+STAGES = ("ocr", "layout", "segment", "extract", "normalize", "validate", "csv")
+MEMORY_SLACK_MB = 1.0
+"""Absolute allowance on top of the relative tolerance, so tiny peaks do not flap."""
+MIN_SECONDS = 0.01
+"""Shorter baseline timings count as this long, so timer noise on tiny stages does not flap."""
+
+
+def _stages(document: Path, output_dir: Path) -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    backend = ocr.get_backend("text")
+
+    def _validate(state: Dict[str, Any]) -> Any:
+        context = {"raw_records": state["extract"]}
+        if len(state["normalize"]) > spill.SPILL_ROWS:
+            return list(validate.iter_validate(state["normalize"], context=context))
+        return validate.validate(state["normalize"], context=context)
+
+    return {
+        "ocr": lambda state: list(ocr.run_ocr(document, backend=backend, use_cache=False)),
+        "layout": lambda state: layout.detect_layout([line.text for line in state["ocr"]]),
+        "segment": lambda state: segment.segment_lines(state["layout"]),
+        "extract": lambda state: extract.extract_records(state["segment"]),
+        "normalize": lambda state: normalize.normalize(state["extract"]),
+        "validate": _validate,
+        "csv": lambda state: csv_writer.write_csv("bench", state["normalize"], output_dir),
+    }
+
+
+def _run(document: Path, master_dir: Path, output_dir: Path, trace: bool) -> Dict[str, Dict[str, float]]:
+    # A freshly built snapshot also starts with an empty resolution cache.
+    fuzzy.install_snapshot(fuzzy.build_snapshot(master_dir))
+    state: Dict[str, Any] = {}
+    results: Dict[str, Dict[str, float]] = {}
+    for stage, run in _stages(document, output_dir).items():
+        if trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        state[stage] = run(state)
+        seconds = time.perf_counter() - started
+        results[stage] = {"seconds": seconds}
+        if trace:
+            results[stage]["peak_mb"] = (tracemalloc.get_traced_memory()[1] - before) / 2**20
+    return results
+
+
+def run_scenario(lines: int, fmt: str, seed: int, memory: bool = True, repeat: int = 3) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="cne-bench-") as temp:
+        root = Path(temp)
+        master_dir = root / "master"
+        records = synthetic_docs.write_master(master_dir, seed=seed)
+        document = root / f"document.{fmt}"
+        stats = synthetic_docs.write_document(
+            document, lines, seed, siglas=[record["sigla"] for record in records]
+        )
+        previous = fuzzy.MasterSnapshot(fuzzy.MASTER_CACHE, fuzzy.master_version(), fuzzy.get_index())
+        try:
+            runs = [_run(document, master_dir, root / "processed", trace=False) for _ in range(max(1, repeat))]
+            if memory:
+                tracemalloc.start()
+                try:
+                    peaks = _run(document, master_dir, root / "processed", trace=True)
+                finally:
+                    tracemalloc.stop()
+        finally:
+            fuzzy.install_snapshot(previous)
+
+    stages: Dict[str, Dict[str, float]] = {}
+    for stage in STAGES:
+        seconds = min(run[stage]["seconds"] for run in runs)
+        stages[stage] = {
+            "seconds": round(seconds, 4),
+            "lines_per_s": round(stats.lines / seconds, 1) if seconds else 0.0,
+            "records_per_s": round(stats.records / seconds, 1) if seconds else 0.0,
+        }
+        if memory:
+            stages[stage]["peak_mb"] = round(peaks[stage]["peak_mb"], 2)
+    return {
+        "lines": stats.lines,
+        "records": stats.records,
+        "pages": stats.pages,
+        "stages": stages,
+    }
+
+
+def scenario_name(fmt: str, lines: int) -> str:
+    return f"{fmt}-{lines}"
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of ``result`` against one baseline scenario."""
+
+    problems: List[str] = []
+    for stage, expected in baseline.get("stages", {}).items():
+        actual = result["stages"].get(stage)
+        if actual is None:
+            continue
+        floor = min(expected["lines_per_s"], result["lines"] / MIN_SECONDS) * (1 - tolerance)
+        if actual["lines_per_s"] < floor:
+            problems.append(
+                f"{stage}: {actual['lines_per_s']:,.0f} lines/s, baseline {expected['lines_per_s']:,.0f}"
+            )
+        if "peak_mb" in actual and "peak_mb" in expected:
+            ceiling = expected["peak_mb"] * (1 + tolerance) + MEMORY_SLACK_MB
+            if actual["peak_mb"] > ceiling:
+                problems.append(f"{stage}: peak {actual['peak_mb']:.1f} MB, baseline {expected['peak_mb']:.1f} MB")
+    return problems
+
+
+def _report(name: str, result: Dict[str, Any]) -> None:
+    print(f"{name}: {result['lines']} lines, {result['records']} records, {result['pages']} page(s)")
+    print(f"  {'stage':<10}{'seconds':>10}{'lines/s':>14}{'records/s':>14}{'peak MB':>10}")
+    for stage, values in result["stages"].items():
+        peak = f"{values['peak_mb']:.1f}" if "peak_mb" in values else "-"
+        print(
+            f"  {stage:<10}{values['seconds']:>10.3f}{values['lines_per_s']:>14,.0f}"
+            f"{values['records_per_s']:>14,.0f}{peak:>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--format", choices=("txt", "zip"), default="txt")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3, help="untraced runs per scenario, best one kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    baselines: Dict[str, Any] = {}
+    if args.baseline.exists():
+        baselines = json.loads(args.baseline.read_text(encoding="utf-8"))
+
+    results: Dict[str, Any] = {}
+    regressions: List[str] = []
+    for lines in args.lines:
+        name = scenario_name(args.format, lines)
+        result = run_scenario(lines, args.format, args.seed, memory=not args.no_memory, repeat=args.repeat)
+        results[name] = result
+        _report(name, result)
+        if not args.update_baseline and name in baselines:
+            problems = compare(result, baselines[name], args.tolerance)
+            regressions.extend(f"{name} {problem}" for problem in problems)
+            print(f"  baseline: {'REGRESSED' if problems else 'ok'}")
+    print(f"max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.update_baseline:
+        baselines.update(results)
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"baselines written to {args.baseline}")
+    if regressions:
+        for problem in regressions:
+            print(f"regression: {problem}", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
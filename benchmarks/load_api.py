@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""Load-test the API with a live worker and report latency percentiles.
+
+Usage: python benchmarks/load_api.py [--url URL | --in-process] [--duration 30] [--rate 20] [--concurrency 8]
+                                     [--mix upload=1,preview=6,download=2,approve=1] [--lines 2000]
+                                     [--warmup-jobs 4] [--output results.json] [--history runs.jsonl]
+
+By default a throwaway data root is prepared (synthetic master data from
+``synthetic_docs``) and ``uvicorn`` plus ``python -m worker.src.worker`` are
+started in it as subprocesses; ``--in-process`` runs both on threads of
+this process instead, and ``--url`` targets a server that is already
+running (its worker is then up to you).
+
+A warm-up phase uploads ``--warmup-jobs`` documents and waits for their
+previews, so reads and approvals have processed jobs to hit. The measured
+phase then issues requests drawn from ``--mix``: open loop at ``--rate``
+requests/s with exponential inter-arrival times (latency is measured from
+each request's scheduled start, so a saturated server is not hidden by the
+client waiting on it), or closed loop with ``--concurrency`` back-to-back
+clients when ``--rate 0``. Per endpoint the report gives request count,
+throughput, error rate, status codes and p50/p95/p99 latency; ``--output``
+writes it as JSON and ``--history`` appends it as one JSON line per run.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Sequence
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks import synthetic_docs  # noqa: E402
+
+ENDPOINTS = ("upload", "preview", "download", "approve")
+DEFAULT_MIX = "upload=1,preview=6,download=2,approve=1"
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """``"upload=1,preview=6"`` -> normalized weights per endpoint."""
+
+    weights: Dict[str, float] = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (expected one of {', '.join(ENDPOINTS)})")
+        weight = float(value) if value else 1.0
+        if weight < 0:
+            raise ValueError(f"Negative weight for {name}")
+        weights[name] = weights.get(name, 0.0) + weight
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("The mix needs at least one endpoint with a positive weight")
+    return {name: weight / total for name, weight in weights.items() if weight}
+
+
+def percentile(ordered: Sequence[float], rank: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered), math.ceil(rank / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    seconds: float
+
+
+@dataclass
+class Recorder:
+    samples: List[Sample] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, sample: Sample) -> None:
+        with self.lock:
+            self.samples.append(sample)
+
+
+def summarize(samples: Sequence[Sample], duration: float) -> Dict[str, Any]:
+    """Per-endpoint and overall statistics; latencies in milliseconds."""
+
+    def _stats(group: Sequence[Sample]) -> Dict[str, Any]:
+        latencies = sorted(sample.seconds * 1000 for sample in group)
+        errors = sum(1 for sample in group if sample.status == 0 or sample.status >= 400)
+        stats: Dict[str, Any] = {
+            "requests": len(group),
+            "throughput_rps": round(len(group) / duration, 2) if duration else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / len(group), 4) if group else 0.0,
+            "statuses": {str(status): count for status, count in sorted(Counter(s.status for s in group).items())},
+            "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        }
+        for rank in PERCENTILES:
+            stats[f"p{rank}_ms"] = round(percentile(latencies, rank), 2)
+        return stats
+
+    endpoints = {
+        name: _stats([sample for sample in samples if sample.endpoint == name])
+        for name in ENDPOINTS
+        if any(sample.endpoint == name for sample in samples)
+    }
+    return {"endpoints": endpoints, "total": _stats(samples)}
+
+
+def multipart(fields: Mapping[str, str], filename: str, content: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts: List[bytes] = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    parts.append(
+        (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+    )
+    parts.append(content)
+    parts.append(f"\r\n--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Client:
+    """Keep-alive HTTP client with one connection per calling thread."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0) -> None:
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def request(
+        self, method: str, path: str, body: bytes | None = None, headers: Mapping[str, str] | None = None
+    ) -> tuple[int, bytes]:
+        reused = getattr(self._local, "connection", None) is not None
+        connection = self._connection()
+        try:
+            connection.request(method, self.prefix + path, body=body, headers=dict(headers or {}))
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException) as exc:
+            connection.close()
+            self._local.connection = None
+            # The server closes idle keep-alive connections; retry those once
+            # on a fresh connection instead of counting them as errors.
+            stale = isinstance(exc, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError))
+            if reused and stale:
+                return self.request(method, path, body, headers)
+            raise
+
+    def upload(self, filename: str, content: bytes) -> tuple[int, bytes]:
+        body, content_type = multipart({"uploader": "load-test"}, filename, content)
+        return self.request("POST", "/jobs/", body, {"Content-Type": content_type})
+
+    def approve(self, job_id: str) -> tuple[int, bytes]:
+        body = json.dumps({"approver": "load-test", "notes": "load test"}).encode("utf-8")
+        return self.request("POST", f"/approval/{job_id}", body, {"Content-Type": "application/json"})
+
+
+class Workload:
+    """Issues the mix of requests and records their outcome."""
+
+    def __init__(self, client: Client, documents: Sequence[tuple[str, bytes]], ready: Sequence[str]) -> None:
+        self.client = client
+        self.documents = list(documents)
+        self.ready = list(ready)
+        self.uploaded: List[str] = []
+        self.recorder = Recorder()
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _next_document(self) -> tuple[str, bytes]:
+        with self._lock:
+            self._counter += 1
+            return self.documents[self._counter % len(self.documents)]
+
+    def call(self, endpoint: str, rng: random.Random) -> int:
+        client = self.client
+        if endpoint == "upload":
+            name, content = self._next_document()
+            status, body = client.upload(name, content)
+            if status == 200:
+                with self._lock:
+                    self.uploaded.append(json.loads(body)["job_id"])
+            return status
+        job_id = rng.choice(self.ready)
+        if endpoint == "preview":
+            return client.request("GET", f"/preview/{job_id}")[0]
+        if endpoint == "download":
+            return client.request("GET", f"/download/{job_id}")[0]
+        return client.approve(job_id)[0]
+
+    def execute(self, endpoint: str, rng: random.Random, scheduled: float) -> None:
+        try:
+            status = self.call(endpoint, rng)
+        except (OSError, http.client.HTTPException, ValueError):
+            status = 0
+        self.recorder.add(Sample(endpoint, status, time.perf_counter() - scheduled))
+
+
+def run_open_loop(
+    workload: Workload, mix: Mapping[str, float], rate: float, duration: float, concurrency: int, seed: int
+) -> float:
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    started = time.perf_counter()
+    deadline = started + duration
+    scheduled = started
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            endpoint = rng.choices(names, weights)[0]
+            pool.submit(workload.execute, endpoint, random.Random(rng.random()), scheduled)
+    return time.perf_counter() - started
+
+
+def run_closed_loop(
+    workload: Workload, mix: Mapping[str, float], duration: float, concurrency: int, seed: int
+) -> float:
+    names, weights = list(mix), list(mix.values())
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def _client(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            workload.execute(rng.choices(names, weights)[0], rng, time.perf_counter())
+
+    threads = [threading.Thread(target=_client, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _wait_until(check: Callable[[], bool], timeout: float, what: str, interval: float = 0.25) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return
+        time.sleep(interval)
+    raise SystemExit(f"Timed out after {timeout:.0f}s waiting for {what}")
+
+
+def _healthy(client: Client) -> bool:
+    try:
+        return client.request("GET", "/health")[0] == 200
+    except (OSError, http.client.HTTPException):
+        return False
+
+
+@contextmanager
+def local_stack(root: Path, in_process: bool, seed: int) -> Iterator[str]:
+    """Serve the API and run a worker with ``root`` as their working directory."""
+
+    synthetic_docs.write_master(root / "data" / "master", seed=seed)
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    if in_process:
+        # Every data path in the services is relative to the working directory.
+        previous = os.getcwd()
+        os.chdir(root)
+        import uvicorn
+
+        from api.app.main import app
+        from worker.src.worker import run_forever
+
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        threading.Thread(target=run_forever, kwargs={"poll_interval": 0.2}, daemon=True).start()
+        try:
+            _wait_until(lambda: _healthy(Client(url)), 30, "the API to start")
+            yield url
+        finally:
+            server.should_exit = True
+            os.chdir(previous)
+        return
+
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")]))}
+    logs = (root / "api.log").open("wb"), (root / "worker.log").open("wb")
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=root, env=env, stdout=logs[0], stderr=subprocess.STDOUT,
+        ),
+        subprocess.Popen(
+            [sys.executable, "-m", "worker.src.worker"], cwd=root, env=env, stdout=logs[1], stderr=subprocess.STDOUT
+        ),
+    ]
+    try:
+        _wait_until(lambda: _healthy(Client(url)), 30, "the API to start")
+        yield url
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for log in logs:
+            log.close()
+
+
+def _documents(count: int, lines: int, seed: int, directory: Path) -> List[tuple[str, bytes]]:
+    # Distinct documents, so the worker's content-addressed OCR cache does
+    # not turn every upload after the first into a cache hit.
+    documents = []
+    siglas = [record["sigla"] for record in synthetic_docs.master_records(seed=seed)]
+    for index in range(max(1, count)):
+        path = directory / f"load-{index}.txt"
+        synthetic_docs.write_text(path, lines, seed + index, siglas=siglas)
+        documents.append((path.name, path.read_bytes()))
+    return documents
+
+
+def warm_up(client: Client, documents: Sequence[tuple[str, bytes]], jobs: int, timeout: float) -> List[str]:
+    job_ids = []
+    for index in range(jobs):
+        name, content = documents[index % len(documents)]
+        status, body = client.upload(name, content)
+        if status != 200:
+            raise SystemExit(f"Warm-up upload failed with HTTP {status}: {body[:200]!r}")
+        job_ids.append(json.loads(body)["job_id"])
+
+    def _previews_ready() -> bool:
+        return all(client.request("GET", f"/preview/{job_id}")[0] == 200 for job_id in job_ids)
+
+    _wait_until(_previews_ready, timeout, f"{jobs} warm-up job(s) to be processed", interval=0.5)
+    return job_ids
+
+
+def _report(results: Mapping[str, Any]) -> None:
+    config = results["config"]
+    print(
+        f"{config['mode']} mix={config['mix']} rate={config['rate']} concurrency={config['concurrency']} "
+        f"duration={results['duration_s']:.1f}s"
+    )
+    header = f"  {'endpoint':<10}{'reqs':>7}{'req/s':>9}{'err%':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    print(header)
+    rows = list(results["endpoints"].items()) + [("total", results["total"])]
+    for name, stats in rows:
+        print(
+            f"  {name:<10}{stats['requests']:>7}{stats['throughput_rps']:>9.1f}{stats['error_rate'] * 100:>7.1f}"
+            f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="load-test a running server instead of starting one")
+    target.add_argument("--in-process", action="store_true", help="run the API and worker on threads")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--rate", type=float, default=20.0, help="requests/s, open loop; 0 for closed loop")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--lines", type=int, default=2000, help="lines per uploaded document")
+    parser.add_argument("--documents", type=int, default=4, help="distinct documents rotated through uploads")
+    parser.add_argument("--warmup-jobs", type=int, default=4)
+    parser.add_argument("--warmup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--history", type=Path, help="append the results as one JSON line")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    needs_jobs = any(name in mix for name in ("preview", "download", "approve"))
+    with tempfile.TemporaryDirectory(prefix="cne-load-") as temp:
+        root = Path(temp)
+        documents = _documents(args.documents, args.lines, args.seed, root)
+        with (local_stack(root, args.in_process, args.seed) if not args.url else _existing(args.url)) as url:
+            client = Client(url)
+            ready = warm_up(client, documents, max(1, args.warmup_jobs) if needs_jobs else 0, args.warmup_timeout)
+            workload = Workload(client, documents, ready)
+            if args.rate > 0:
+                duration = run_open_loop(workload, mix, args.rate, args.duration, args.concurrency, args.seed)
+            else:
+                duration = run_closed_loop(workload, mix, args.duration, args.concurrency, args.seed)
+
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "mode": "url" if args.url else "in-process" if args.in_process else "subprocess",
+            "mix": args.mix,
+            "rate": args.rate,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "lines": args.lines,
+            "seed": args.seed,
+        },
+        "duration_s": round(duration, 3),
+        **summarize(workload.recorder.samples, duration),
+    }
+    _report(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.history:
+        with args.history.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(results) + "\n")
+
+
+@contextmanager
+def _existing(url: str) -> Iterator[str]:
+    if not _healthy(Client(url)):
+        raise SystemExit(f"No healthy API at {url}")
+    yield url
+
+
+if __name__ == "__main__":
+    main()
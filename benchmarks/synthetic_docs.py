@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""Generate seeded, DOU-style CNE documents of any size.
+
+Usage: python benchmarks/synthetic_docs.py OUTPUT [--lines 100000] [--seed 7] [--zip] [--master DIR]
+
+Documents use the ``label: value`` layout of the worker fixtures: a header
+with the publication date, then one block per candidate separated by blank
+lines. Orgaos, lists (single lists, coalitions with either symbol syntax,
+``§`` groups), titular/suplente runs, sigla typos and candidate names that
+continue on free-text lines are all drawn from one ``random.Random(seed)``,
+so the same arguments always produce the same bytes. Lines are generated
+lazily and written as they come, so a million-line document never sits in
+memory. ``--zip`` splits the document into page members at block
+boundaries, the way multi-page uploads arrive.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import string
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator, List, Sequence
+from zipfile import ZIP_DEFLATED, ZipFile
+
+PAGE_LINES = 5000
+ORGAOS = ("AM", "CM", "AF")
+RARE_ORGAOS = ("Conselho Nacional de Educação", "Assembleia Municipal", "am", "Cm")
+FIRST_NAMES = (
+    "Ana", "António", "Beatriz", "Carlos", "Catarina", "Diogo", "Eduarda", "Fernando", "Filipa", "Gonçalo",
+    "Helena", "Inês", "João", "José", "Luísa", "Manuel", "Maria", "Miguel", "Nuno", "Patrícia", "Pedro",
+    "Rita", "Rui", "Sofia", "Teresa", "Tiago",
+)
+SURNAMES = (
+    "Almeida", "Alves", "Barbosa", "Cardoso", "Carvalho", "Costa", "Dias", "Fernandes", "Ferreira", "Gomes",
+    "Lopes", "Marques", "Martins", "Mendes", "Moreira", "Nunes", "Oliveira", "Pereira", "Pinto", "Ribeiro",
+    "Rodrigues", "Santos", "Silva", "Sousa", "Teixeira", "Vieira",
+)
+PARTICLES = ("da", "de", "do", "dos", "das")
+LIST_WORDS = (
+    "Educação", "Cidadania", "Futuro", "Progresso", "Unidos", "Renovação", "Comunidade", "Desenvolvimento",
+    "Juntos", "Mudança", "Confiança", "Trabalho",
+)
+SOURCES = ("DOU", "DOU", "DOU", "Memo Nº 10", "Edital 3/2024")
+NOTES = ("Nomeacao publicada", "Nomeacao complementar", "Mantem coligacao", "OCR incerta", "Representacao simbolica")
+SIGLA_ALPHABET = string.ascii_uppercase
+
+
+@dataclass
+class DocumentStats:
+    lines: int = 0
+    records: int = 0
+    lists: int = 0
+    pages: int = 1
+
+
+def master_records(count: int = 200, seed: int = 7) -> List[dict]:
+    """Master-data records in the ``data/master/*.json`` format.
+
+    Always includes the seeded ``MEC`` and ``INEP`` entries, then ``count``
+    distinct generated siglas.
+    """
+
+    rng = random.Random(seed)
+    records = [
+        {"sigla": "MEC", "descricao": "Ministério da Educação", "codigo": "001", "metadata": {"uf": "BR"}},
+        {
+            "sigla": "INEP",
+            "descricao": "Instituto Nacional de Estudos e Pesquisas Educacionais",
+            "codigo": "002",
+            "metadata": {"uf": "BR"},
+        },
+    ]
+    seen = {record["sigla"] for record in records}
+    while len(records) < count + 2:
+        sigla = "".join(rng.choice(SIGLA_ALPHABET) for _ in range(rng.choice((2, 3, 3, 4, 4, 5, 6))))
+        if sigla in seen:
+            continue
+        seen.add(sigla)
+        words = rng.sample(LIST_WORDS, 2)
+        records.append(
+            {
+                "sigla": sigla,
+                "descricao": f"Partido {words[0]} e {words[1]}",
+                "codigo": f"{len(records) + 1:03d}",
+                "metadata": {"uf": rng.choice(("BR", "SP", "RJ", "MG", "BA"))},
+            }
+        )
+    return records
+
+
+def write_master(directory: Path, count: int = 200, seed: int = 7) -> List[dict]:
+    records = master_records(count, seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "default.json").write_text(json.dumps(records, indent=2, ensure_ascii=False), encoding="utf-8")
+    return records
+
+
+class DocumentGenerator:
+    """Seeded source of document lines.
+
+    ``typo_rate`` is the share of sigla lines carrying an edit (replace,
+    insert, delete or swap), ``multiline_rate`` the share of candidate names
+    split over a continuation line. Every list gets a few titulares and,
+    usually, suplentes, so the validation group rules see realistic groups.
+    """
+
+    def __init__(
+        self,
+        seed: int = 7,
+        siglas: Sequence[str] | None = None,
+        typo_rate: float = 0.15,
+        multiline_rate: float = 0.2,
+    ) -> None:
+        self.rng = random.Random(seed)
+        self.siglas = list(siglas) if siglas else [record["sigla"] for record in master_records(seed=seed)]
+        self.typo_rate = typo_rate
+        self.multiline_rate = multiline_rate
+        self.stats = DocumentStats()
+
+    def _typo(self, sigla: str) -> str:
+        rng = self.rng
+        chars = list(sigla)
+        position = rng.randrange(len(chars))
+        operation = rng.choice(("replace", "insert", "delete", "swap"))
+        if operation == "replace":
+            chars[position] = rng.choice(SIGLA_ALPHABET)
+        elif operation == "insert":
+            chars.insert(position, rng.choice(SIGLA_ALPHABET))
+        elif operation == "delete" and len(chars) > 2:
+            del chars[position]
+        elif operation == "swap" and len(chars) > 1:
+            other = (position + 1) % len(chars)
+            chars[position], chars[other] = chars[other], chars[position]
+        return "".join(chars)
+
+    def _sigla(self, sigla: str) -> str:
+        rng = self.rng
+        if rng.random() < self.typo_rate:
+            sigla = self._typo(sigla)
+        casing = rng.random()
+        if casing < 0.2:
+            return sigla.lower()
+        if casing < 0.3:
+            return sigla.capitalize()
+        return sigla
+
+    def _lista(self, sigla: str) -> str:
+        rng = self.rng
+        kind = rng.random()
+        if kind < 0.35:
+            return "Lista Unica"
+        words = rng.sample(LIST_WORDS, 2)
+        if kind < 0.6:
+            return f"Coligacao {words[0]} & {words[1]}"
+        if kind < 0.8:
+            return f"Coligacao {words[0]} {words[1]} - {sigla}"
+        if kind < 0.9:
+            return f"Movimento {words[0]} ({sigla})"
+        return f"Grupo {sigla} § {words[0]}"
+
+    def _name(self) -> List[str]:
+        rng = self.rng
+        parts = [rng.choice(FIRST_NAMES)]
+        if rng.random() < 0.4:
+            parts.append(rng.choice(FIRST_NAMES))
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.3:
+                parts.append(rng.choice(PARTICLES))
+            parts.append(rng.choice(SURNAMES))
+        if len(parts) > 2 and rng.random() < self.multiline_rate:
+            split = rng.randint(2, len(parts) - 1)
+            return [" ".join(parts[:split]), " ".join(parts[split:])]
+        return [" ".join(parts)]
+
+    def header(self) -> List[str]:
+        day = self.rng.randint(1, 28)
+        month = self.rng.randint(1, 12)
+        return ["CNE Diário Oficial", f"dtmnfr: 2024-{month:02d}-{day:02d}", ""]
+
+    def list_block(self) -> Iterator[List[str]]:
+        """Candidate blocks of one list, each ending with a blank line."""
+
+        rng = self.rng
+        orgao = rng.choice(ORGAOS) if rng.random() > 0.02 else rng.choice(RARE_ORGAOS)
+        sigla = rng.choice(self.siglas)
+        lista = self._lista(sigla)
+        titulares = rng.randint(1, 9)
+        suplentes = rng.randint(0, 4) if rng.random() > 0.1 else 0
+        self.stats.lists += 1
+        for position in range(titulares + suplentes):
+            name = self._name()
+            block = [
+                f"orgao: {orgao}",
+                f"lista: {lista}",
+                f"tipo: {'Titular' if position < titulares else 'Suplente'}",
+            ]
+            if rng.random() > 0.03:
+                block.append(f"sigla: {self._sigla(sigla)}")
+            block.append(f"descricao: {name[0]}")
+            block.extend(name[1:])
+            block.append(f"fonte: {rng.choice(SOURCES)}")
+            if rng.random() < 0.3:
+                block.append(f"observacao: {rng.choice(NOTES)}")
+            block.append("")
+            self.stats.records += 1
+            yield block
+
+    def iter_blocks(self, lines: int) -> Iterator[List[str]]:
+        """Yield the header then candidate blocks until ``lines`` is reached."""
+
+        header = self.header()
+        self.stats.lines += len(header)
+        yield header
+        while self.stats.lines < lines:
+            for block in self.list_block():
+                self.stats.lines += len(block)
+                yield block
+                if self.stats.lines >= lines:
+                    return
+
+    def iter_lines(self, lines: int) -> Iterator[str]:
+        for block in self.iter_blocks(lines):
+            yield from block
+
+
+def _write_block(handle: IO[str], block: Sequence[str]) -> None:
+    handle.write("\n".join(block))
+    handle.write("\n")
+
+
+def write_text(path: Path, lines: int, seed: int = 7, **options) -> DocumentStats:
+    generator = DocumentGenerator(seed=seed, **options)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as handle:
+        for block in generator.iter_blocks(lines):
+            _write_block(handle, block)
+    return generator.stats
+
+
+def write_zip(path: Path, lines: int, seed: int = 7, page_lines: int = PAGE_LINES, **options) -> DocumentStats:
+    """Write the document as ``page-NNNNN.txt`` members of about ``page_lines`` lines."""
+
+    generator = DocumentGenerator(seed=seed, **options)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pages = 0
+    with ZipFile(path, "w", compression=ZIP_DEFLATED) as archive:
+        member = None
+        written = 0
+        try:
+            for block in generator.iter_blocks(lines):
+                if member is None or written >= page_lines:
+                    if member is not None:
+                        member.close()
+                    member = archive.open(f"page-{pages:05d}.txt", "w")
+                    pages += 1
+                    written = 0
+                member.write(("\n".join(block) + "\n").encode("utf-8"))
+                written += len(block)
+        finally:
+            if member is not None:
+                member.close()
+    generator.stats.pages = pages
+    return generator.stats
+
+
+def write_document(path: Path, lines: int, seed: int = 7, **options) -> DocumentStats:
+    """Write a text or, for a ``.zip`` path, a paged ZIP document."""
+
+    if path.suffix.lower() == ".zip":
+        return write_zip(path, lines, seed, **options)
+    options.pop("page_lines", None)
+    return write_text(path, lines, seed, **options)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--zip", action="store_true", help="write a paged ZIP (implied by a .zip output)")
+    parser.add_argument("--page-lines", type=int, default=PAGE_LINES)
+    parser.add_argument("--typo-rate", type=float, default=0.15)
+    parser.add_argument("--multiline-rate", type=float, default=0.2)
+    parser.add_argument("--master", type=Path, help="also write the matching master data to this directory")
+    parser.add_argument("--master-size", type=int, default=200)
+    args = parser.parse_args()
+
+    siglas = [record["sigla"] for record in master_records(args.master_size, args.seed)]
+    if args.master:
+        write_master(args.master, args.master_size, args.seed)
+    options = dict(siglas=siglas, typo_rate=args.typo_rate, multiline_rate=args.multiline_rate)
+    if args.zip or args.output.suffix.lower() == ".zip":
+        stats = write_zip(args.output, args.lines, args.seed, page_lines=args.page_lines, **options)
+    else:
+        stats = write_text(args.output, args.lines, args.seed, **options)
+    print(
+        f"{args.output}: {stats.lines} lines, {stats.records} records, {stats.lists} lists, {stats.pages} page(s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Incremental training corpus built from approved datasets.
+
+The corpus directory holds columnar segments (the format of
+:mod:`api.app.services.columnar`) and ``manifest.json``, which records for
+every ingested job the size/mtime stamp and content digest of its dataset
+artifact, its row count and the segment holding its rows. A refresh only
+reads the datasets of jobs approved since the previous one and appends
+them as a new segment, so its cost tracks new approvals rather than the
+whole history. Segments are compacted into one once there are more than
+``MAX_SEGMENTS``. If an ingested job is no longer approved or its dataset
+changed (an approved job can be reprocessed), the corpus is rebuilt.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+from api.app.services import codec
+from api.app.services.columnar import FILENAME as COLUMNAR_FILENAME
+from api.app.services.columnar import ColumnarReader, ColumnarWriter, iter_dataset
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts refresh without locking
+    fcntl = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+MAX_SEGMENTS = 16
+
+
+def _artifact(dataset_dir: Path) -> Path | None:
+    for name in (COLUMNAR_FILENAME, "output.csv"):
+        path = dataset_dir / name
+        if path.exists():
+            return path
+    return None
+
+
+def _stamp(path: Path) -> List[Any]:
+    stat = path.stat()
+    return [path.name, stat.st_size, stat.st_mtime_ns]
+
+
+def _digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _empty_manifest() -> Dict[str, Any]:
+    return {"format": FORMAT_VERSION, "rows": 0, "next_segment": 1, "segments": [], "jobs": {}}
+
+
+class TrainingCorpus:
+    """Append-only corpus of the rows of approved jobs."""
+
+    def __init__(
+        self,
+        directory: Path,
+        jobs_file: Path,
+        processed_dir: Path,
+        max_segments: int = MAX_SEGMENTS,
+    ) -> None:
+        self.directory = directory
+        self.jobs_file = jobs_file
+        self.processed_dir = processed_dir
+        self.max_segments = max(1, max_segments)
+
+    @contextmanager
+    def _lock(self, exclusive: bool) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with (self.directory / f"{MANIFEST}.lock").open("a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def manifest(self) -> Dict[str, Any]:
+        path = self.directory / MANIFEST
+        if not path.exists():
+            return _empty_manifest()
+        manifest = codec.read(path)
+        return manifest if manifest.get("format") == FORMAT_VERSION else _empty_manifest()
+
+    def __len__(self) -> int:
+        return self.manifest()["rows"]
+
+    def approved_jobs(self) -> List[str]:
+        if not self.jobs_file.exists():
+            return []
+        state = codec.read(self.jobs_file)
+        return [job_id for job_id, record in state.items() if record.get("status") == "approved"]
+
+    def _current(self, manifest: Dict[str, Any], approved: set[str]) -> bool:
+        """Whether every ingested job is still approved with an unchanged dataset."""
+
+        for job_id, entry in manifest["jobs"].items():
+            if job_id not in approved:
+                return False
+            artifact = _artifact(self.processed_dir / job_id)
+            if artifact is None:
+                return False
+            stamp = _stamp(artifact)
+            if stamp == entry["stamp"]:
+                continue
+            if artifact.name != entry["stamp"][0] or _digest(artifact) != entry["digest"]:
+                return False
+            entry["stamp"] = stamp
+        return True
+
+    def _clear(self) -> Dict[str, Any]:
+        for path in self.directory.glob("segment-*.cols"):
+            path.unlink()
+        return _empty_manifest()
+
+    def _segment_path(self, manifest: Dict[str, Any]) -> Path:
+        name = f"segment-{manifest['next_segment']:05d}.cols"
+        manifest["next_segment"] += 1
+        return self.directory / name
+
+    def _append(self, manifest: Dict[str, Any], job_ids: Sequence[str]) -> None:
+        path = self._segment_path(manifest)
+        writer: ColumnarWriter | None = None
+        with ExitStack() as stack:
+            for job_id in job_ids:
+                artifact = _artifact(self.processed_dir / job_id)
+                assert artifact is not None
+                # Stamp before reading, so a concurrent rewrite shows up as a
+                # changed stamp on the next refresh.
+                entry = {"stamp": _stamp(artifact), "digest": _digest(artifact), "rows": 0, "segment": None}
+                for row in iter_dataset(self.processed_dir / job_id):
+                    if writer is None:
+                        writer = stack.enter_context(ColumnarWriter(path, list(row)))
+                    writer.append(row)
+                    entry["rows"] += 1
+                if entry["rows"]:
+                    entry["segment"] = path.name
+                manifest["jobs"][job_id] = entry
+                manifest["rows"] += entry["rows"]
+        if writer is not None:
+            manifest["segments"].append(path.name)
+
+    def _compact(self, manifest: Dict[str, Any]) -> None:
+        old = list(manifest["segments"])
+        path = self._segment_path(manifest)
+        with ColumnarWriter(path, ColumnarReader(self.directory / old[0]).columns) as writer:
+            for row in self._iter_segments(old, None):
+                writer.append(row)
+        for entry in manifest["jobs"].values():
+            if entry["segment"] is not None:
+                entry["segment"] = path.name
+        manifest["segments"] = [path.name]
+        codec.write(self.directory / MANIFEST, manifest)
+        for name in old:
+            (self.directory / name).unlink(missing_ok=True)
+
+    def refresh(self) -> List[str]:
+        """Ingest jobs approved since the last refresh; returns their IDs."""
+
+        with self._lock(exclusive=True):
+            manifest = self.manifest()
+            loaded = codec.dumps(manifest)
+            approved = self.approved_jobs()
+            if not self._current(manifest, set(approved)):
+                LOGGER.info("Approved datasets changed, rebuilding the training corpus in %s", self.directory)
+                manifest = self._clear()
+            added = [
+                job_id
+                for job_id in approved
+                if job_id not in manifest["jobs"] and _artifact(self.processed_dir / job_id) is not None
+            ]
+            if added:
+                self._append(manifest, added)
+            if codec.dumps(manifest) != loaded:
+                codec.write(self.directory / MANIFEST, manifest)
+            if len(manifest["segments"]) > self.max_segments:
+                self._compact(manifest)
+        return added
+
+    def _iter_segments(
+        self,
+        segments: Sequence[str],
+        columns: Sequence[str] | None,
+        start: int = 0,
+        stop: int | None = None,
+    ) -> Iterator[Dict[str, str]]:
+        offset = 0
+        for name in segments:
+            if stop is not None and offset >= stop:
+                return
+            reader = ColumnarReader(self.directory / name)
+            low = max(start - offset, 0)
+            high = None if stop is None else stop - offset
+            offset += reader.rows
+            if low >= reader.rows:
+                continue
+            if columns is None:
+                yield from reader.iter_rows(None, low, high)
+                continue
+            present = [column for column in columns if column in reader.columns]
+            for row in reader.iter_rows(present, low, high):
+                yield {column: row.get(column, "") for column in columns}
+
+    def iter_rows(
+        self, columns: Sequence[str] | None = None, start: int = 0, stop: int | None = None
+    ) -> Iterator[Dict[str, str]]:
+        """Stream corpus rows ``start:stop`` in ingestion order, restricted to ``columns``.
+
+        Segments and row groups outside the range are skipped unread. A
+        shared lock is held while iterating, so a concurrent refresh cannot
+        compact segments away underneath the reader.
+        """
+
+        with self._lock(exclusive=False):
+            yield from self._iter_segments(self.manifest()["segments"], columns, start, stop)
@@ -0,0 +1,151 @@
+"""Training of the sigla corrector from approved jobs.
+
+Every approved job has the raw rows extracted from the document (the
+``extract`` checkpoint) and its ``output.csv``, row for row, so each row
+pairs the sigla OCR read with the approved sigla. Reviewers approve or
+reject whole jobs and cannot edit rows, so the approved sigla is the
+pipeline's own resolution (``difflib`` or an earlier corrector) that the
+reviewer accepted, not an independent label. :func:`fit_corrector` turns
+those pairs into a :class:`~worker.src.sigla_corrector.SiglaCorrector`:
+
+* a raw sigla is remembered as a correction only when at least
+  ``MIN_SUPPORT`` rows resolved it to the same different sigla and those
+  rows are more than ``MAJORITY`` of the rows with that raw sigla, so a
+  one-off match is not frozen into the model;
+* every differing pair is aligned, and each character edit seen ``n``
+  times costs ``ALPHA / (ALPHA + n)`` (never below ``MIN_COST``) instead
+  of 1.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from api.app.services import master_data
+from api.app.services.columnar import iter_dataset
+from worker.src import fuzzy
+from worker.src.checkpoints import CheckpointStore
+from worker.src.sigla_corrector import Edit, SiglaCorrector
+from worker.src.sigla_index import SiglaIndex
+
+from .corpus import TrainingCorpus
+
+LOGGER = logging.getLogger(__name__)
+
+ALPHA = 2.0
+MIN_COST = 0.1
+MIN_SUPPORT = 2
+"""Rows that must agree on a correction before it is remembered."""
+MAJORITY = 0.5
+
+Pair = Tuple[str, str]
+
+
+def iter_sigla_pairs(corpus: TrainingCorpus) -> Iterator[Pair]:
+    """``(raw, approved)`` upper-cased siglas of every row of the approved jobs."""
+
+    for job_id in corpus.approved_jobs():
+        job_dir = corpus.processed_dir / job_id
+        store = CheckpointStore(job_dir)
+        if not store.has("extract"):
+            continue
+        raw_records = list(store.iter_stream("extract"))
+        approved = [row["SIGLA"] for row in iter_dataset(job_dir, ["SIGLA"])]
+        if len(approved) != len(raw_records):
+            LOGGER.warning("Job %s has %d raw and %d approved rows, skipping", job_id, len(raw_records), len(approved))
+            continue
+        for record, sigla in zip(raw_records, approved):
+            raw = (record.get("_raw_sigla") or record.get("SIGLA") or "").strip().upper()
+            sigla = sigla.strip().upper()
+            if raw and sigla:
+                yield raw, sigla
+
+
+def align(raw: str, approved: str) -> List[Edit]:
+    """Character edits of a minimal unit-cost alignment of ``raw`` onto ``approved``."""
+
+    rows, cols = len(raw) + 1, len(approved) + 1
+    table = [[0] * cols for _ in range(rows)]
+    for i in range(rows):
+        table[i][0] = i
+    for j in range(cols):
+        table[0][j] = j
+    for i in range(1, rows):
+        for j in range(1, cols):
+            table[i][j] = min(
+                table[i - 1][j - 1] + (raw[i - 1] != approved[j - 1]),
+                table[i - 1][j] + 1,
+                table[i][j - 1] + 1,
+            )
+    edits: List[Edit] = []
+    i, j = len(raw), len(approved)
+    while i or j:
+        if i and j and table[i][j] == table[i - 1][j - 1] + (raw[i - 1] != approved[j - 1]):
+            if raw[i - 1] != approved[j - 1]:
+                edits.append((raw[i - 1], approved[j - 1]))
+            i, j = i - 1, j - 1
+        elif i and table[i][j] == table[i - 1][j] + 1:
+            edits.append((raw[i - 1], ""))
+            i -= 1
+        else:
+            edits.append(("", approved[j - 1]))
+            j -= 1
+    edits.reverse()
+    return edits
+
+
+def fit_corrector(pairs: Iterable[Pair]) -> Tuple[SiglaCorrector, Dict[str, int]]:
+    """Learn a corrector from ``(raw, approved)`` pairs; also returns pair counts."""
+
+    corrections: Dict[str, Counter[str]] = defaultdict(Counter)
+    seen: Counter[str] = Counter()
+    total = 0
+    for raw, approved in pairs:
+        total += 1
+        seen[raw] += 1
+        if raw != approved:
+            corrections[raw][approved] += 1
+    edits: Counter[Edit] = Counter()
+    for raw, targets in corrections.items():
+        for approved, count in targets.items():
+            for edit in align(raw, approved):
+                edits[edit] += count
+    memory: Dict[str, str] = {}
+    for raw, targets in corrections.items():
+        approved, count = targets.most_common(1)[0]
+        if count >= MIN_SUPPORT and count > MAJORITY * seen[raw]:
+            memory[raw] = approved
+    costs = {edit: max(MIN_COST, ALPHA / (ALPHA + count)) for edit, count in edits.items()}
+    stats = {"pairs": total, "corrections": len(corrections), "edits": len(costs)}
+    return SiglaCorrector(memory, costs), stats
+
+
+def evaluate(corrector: SiglaCorrector, master: Mapping[str, dict], index: SiglaIndex) -> Dict[str, float]:
+    """Share of the remembered corrections recovered from edit costs alone, and by ``difflib``.
+
+    The corrector is scored without its memory, so this measures how well
+    the learned costs generalise to typos it has not memorised.
+    """
+
+    cases = [(raw, approved) for raw, approved in corrector.memory.items() if approved in master]
+    if not cases:
+        return {"edit_accuracy": 0.0, "difflib_accuracy": 0.0}
+    costs_only = SiglaCorrector({}, corrector.costs, corrector.threshold)
+    learned = sum(costs_only.correct(raw, master) == approved for raw, approved in cases)
+    baseline = 0
+    for raw, approved in cases:
+        best = index.best_match(raw, cutoff=fuzzy.MATCH_CUTOFF)
+        baseline += best is not None and best[0] == approved
+    return {"edit_accuracy": round(learned / len(cases), 4), "difflib_accuracy": round(baseline / len(cases), 4)}
+
+
+def train_corrector(corpus: TrainingCorpus) -> Tuple[SiglaCorrector, Dict[str, float]]:
+    """Fit a corrector on the approved jobs of ``corpus`` and score it against the master data."""
+
+    corrector, stats = fit_corrector(iter_sigla_pairs(corpus))
+    snapshot = fuzzy.build_snapshot(master_data.DATA_DIR)
+    metrics: Dict[str, float] = {**stats, "memory": len(corrector.memory)}
+    metrics.update(evaluate(corrector, snapshot.records, snapshot.index))
+    return corrector, metrics
@@ -1,21 +1,22 @@
 from __future__ import annotations
 
-from statistics import mean
-from typing import List
+from typing import Iterable
 
 from .registry import ModelRegistry
-from .training import build_training_corpus
+from .training import iter_training_corpus
 
 
-def _score_dataset(rows: List[dict[str, str]]) -> float:
-    lengths = [len(row.get("NOME_CANDIDATO", "")) for row in rows]
-    return mean(lengths) if lengths else 0.0
+def _score_dataset(rows: Iterable[dict[str, str]]) -> float:
+    count = total = 0
+    for row in rows:
+        count += 1
+        total += len(row.get("NOME_CANDIDATO", ""))
+    return total / count if count else 0.0
 
 
 def evaluate_and_promote(candidate_version: str) -> None:
     registry = ModelRegistry()
-    rows = build_training_corpus()
-    score = _score_dataset(rows)
+    score = _score_dataset(iter_training_corpus(columns=["NOME_CANDIDATO"]))
     registry.promote(candidate_version)
     registry.update_metrics(candidate_version, {"dataset_score": score})
 
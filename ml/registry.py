@@ -1,25 +1,59 @@
+"""Model registry backed by a SQLite database.
+
+Every operation runs in its own short transaction, so the API, the worker
+and training scripts can share the registry safely. Versions are
+allocated inside a write transaction (``BEGIN IMMEDIATE``), so concurrent
+registrations never produce duplicates. Records are indexed by version and
+status, and history is read a page at a time. Each write bumps a revision
+counter that readers can use to detect changes cheaply.
+
+Registries created before the database existed kept their history in
+``model_registry.json``; it is imported the first time the database is
+opened.
+"""
+
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass, asdict
+import logging
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Iterator, List, Sequence, Tuple
 
 from api.app.schemas import ModelHistoryResponse, ModelMetadata
 
-REGISTRY_FILE = Path("data/state/model_registry.json")
-REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+LOGGER = logging.getLogger(__name__)
 
+REGISTRY_FILE = Path("data/state/model_registry.json")
+"""Legacy JSON history, imported into :data:`REGISTRY_DB` once."""
 
-def _load_history() -> List[dict]:
-    if not REGISTRY_FILE.exists():
-        return []
-    return json.loads(REGISTRY_FILE.read_text(encoding="utf-8"))
+REGISTRY_DB = Path("data/state/model_registry.sqlite3")
+REGISTRY_DB.parent.mkdir(parents=True, exist_ok=True)
 
+BUSY_TIMEOUT = 30.0
+MAX_PAGE_SIZE = 500
 
-def _save_history(history: Iterable[dict]) -> None:
-    REGISTRY_FILE.write_text(json.dumps(list(history), indent=2), encoding="utf-8")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    seq INTEGER PRIMARY KEY,
+    version TEXT NOT NULL UNIQUE,
+    model_name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    metrics TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS models_status ON models (status, seq);
+CREATE INDEX IF NOT EXISTS models_name ON models (model_name, seq);
+CREATE TABLE IF NOT EXISTS registry_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+_COLUMNS = "model_name, version, created_at, status, metrics"
+# Promotion replaces the production record of one family only: every
+# ``dataset-<job_id>`` candidate is one family, any other model name its own.
+_FAMILY = "(CASE WHEN model_name LIKE 'dataset-%' THEN 'dataset' ELSE model_name END)"
+_INITIALIZED: set[Path] = set()
 
 
 @dataclass
@@ -31,42 +65,246 @@ class ModelRecord:
     metrics: dict
 
 
+def _version(seq: int) -> str:
+    return f"{seq:03d}"
+
+
+def _record(row: sqlite3.Row) -> ModelRecord:
+    return ModelRecord(
+        model_name=row["model_name"],
+        version=row["version"],
+        created_at=row["created_at"],
+        status=row["status"],
+        metrics=json.loads(row["metrics"]),
+    )
+
+
+def _bump_revision(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        "INSERT INTO registry_meta (key, value) VALUES ('revision', '1') "
+        "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+
+
+def _import_legacy(connection: sqlite3.Connection, legacy: Path) -> None:
+    if not legacy.exists():
+        return
+    history = json.loads(legacy.read_text(encoding="utf-8"))
+    taken: set[str] = set()
+    next_seq = 1
+    for entry in history:
+        version = str(entry["version"])
+        seq = int(version) if version.isdigit() else 0
+        if version in taken or seq < next_seq:
+            # Concurrent writers of the JSON file could hand out a version
+            # twice; later duplicates get fresh versions.
+            LOGGER.warning("Duplicate model version %s in %s, renumbering", version, legacy)
+            seq = next_seq
+            version = _version(seq)
+        next_seq = seq + 1
+        taken.add(version)
+        connection.execute(
+            f"INSERT INTO models (seq, {_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                seq,
+                entry["model_name"],
+                version,
+                entry["created_at"],
+                entry["status"],
+                json.dumps(entry.get("metrics") or {}),
+            ),
+        )
+    _bump_revision(connection)
+    LOGGER.info("Imported %d model records from %s", len(history), legacy)
+
+
 class ModelRegistry:
-    def __init__(self) -> None:
-        self._history = _load_history()
+    """Registry of model and dataset versions.
+
+    Instances hold no state besides the database path, so a long-lived
+    instance always serves the current history.
+    """
+
+    def __init__(self, path: Path | None = None, legacy_file: Path | None = None) -> None:
+        self._path = path
+        self._legacy_file = legacy_file
+
+    @property
+    def path(self) -> Path:
+        return self._path or REGISTRY_DB
+
+    @contextmanager
+    def _connect(self, write: bool = False) -> Iterator[sqlite3.Connection]:
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = path not in _INITIALIZED or not path.exists()
+        connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            if fresh:
+                self._initialize(connection)
+                _INITIALIZED.add(path)
+            if write:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    yield connection
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+            else:
+                yield connection
+        finally:
+            connection.close()
+
+    def _initialize(self, connection: sqlite3.Connection) -> None:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    connection.execute(statement)
+            imported = connection.execute("SELECT 1 FROM registry_meta WHERE key = 'legacy_imported'").fetchone()
+            if imported is None:
+                _import_legacy(connection, self._legacy_file or REGISTRY_FILE)
+                connection.execute("INSERT INTO registry_meta (key, value) VALUES ('legacy_imported', '1')")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
 
     def register(self, model_name: str, metrics: dict, status: str = "candidate") -> ModelRecord:
-        version = f"{len(self._history) + 1:03d}"
-        record = ModelRecord(
-            model_name=model_name,
-            version=version,
-            created_at=datetime.utcnow().isoformat(),
-            status=status,
-            metrics=metrics,
-        )
-        self._history.append(asdict(record))
-        _save_history(self._history)
-        return record
+        return self.register_many([(model_name, metrics)], status=status)[0]
+
+    def register_many(self, entries: Sequence[Tuple[str, dict]], status: str = "candidate") -> List[ModelRecord]:
+        """Register ``(model_name, metrics)`` entries in one transaction, with consecutive versions."""
+
+        if not entries:
+            return []
+        created_at = datetime.utcnow().isoformat()
+        with self._connect(write=True) as connection:
+            first = connection.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM models").fetchone()[0]
+            records = [
+                ModelRecord(
+                    model_name=model_name,
+                    version=_version(first + offset),
+                    created_at=created_at,
+                    status=status,
+                    metrics=metrics,
+                )
+                for offset, (model_name, metrics) in enumerate(entries)
+            ]
+            connection.executemany(
+                f"INSERT INTO models (seq, {_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (first + offset, record.model_name, record.version, created_at, status, json.dumps(record.metrics))
+                    for offset, record in enumerate(records)
+                ],
+            )
+            _bump_revision(connection)
+        return records
 
     def promote(self, version: str) -> None:
-        for record in self._history:
-            record["status"] = "archived" if record["version"] != version else "production"
-        _save_history(self._history)
+        """Make ``version`` the production record of its family and archive the rest of the family."""
+
+        with self._connect(write=True) as connection:
+            connection.execute(
+                "UPDATE models SET status = 'archived' WHERE version != ? AND status != 'archived' "
+                f"AND {_FAMILY} = (SELECT {_FAMILY} FROM models WHERE version = ?)",
+                (version, version),
+            )
+            connection.execute("UPDATE models SET status = 'production' WHERE version = ?", (version,))
+            _bump_revision(connection)
 
     def rollback(self, version: str) -> None:
-        for record in self._history:
-            if record["version"] == version:
-                record["status"] = "production"
-            elif record["status"] == "production":
-                record["status"] = "archived"
-        _save_history(self._history)
+        with self._connect(write=True) as connection:
+            connection.execute(
+                "UPDATE models SET status = 'archived' WHERE status = 'production' AND version != ? "
+                f"AND {_FAMILY} = (SELECT {_FAMILY} FROM models WHERE version = ?)",
+                (version, version),
+            )
+            connection.execute("UPDATE models SET status = 'production' WHERE version = ?", (version,))
+            _bump_revision(connection)
 
     def update_metrics(self, version: str, metrics: dict) -> None:
-        for record in self._history:
-            if record["version"] == version:
-                record.setdefault("metrics", {}).update(metrics)
-        _save_history(self._history)
-
-    def history(self) -> ModelHistoryResponse:
-        items = [ModelMetadata(**record) for record in self._history]
-        return ModelHistoryResponse(items=items)
+        with self._connect(write=True) as connection:
+            row = connection.execute("SELECT metrics FROM models WHERE version = ?", (version,)).fetchone()
+            if row is None:
+                return
+            merged = {**json.loads(row["metrics"]), **metrics}
+            connection.execute("UPDATE models SET metrics = ? WHERE version = ?", (json.dumps(merged), version))
+            _bump_revision(connection)
+
+    def get(self, version: str) -> ModelRecord:
+        with self._connect() as connection:
+            row = connection.execute(f"SELECT {_COLUMNS} FROM models WHERE version = ?", (version,)).fetchone()
+        if row is None:
+            raise KeyError(version)
+        return _record(row)
+
+    def production(self, model_name: str) -> ModelRecord | None:
+        """The production record of ``model_name``, if one was promoted."""
+
+        with self._connect() as connection:
+            row = connection.execute(
+                f"SELECT {_COLUMNS} FROM models WHERE model_name = ? AND status = 'production' "
+                "ORDER BY seq DESC LIMIT 1",
+                (model_name,),
+            ).fetchone()
+        return _record(row) if row is not None else None
+
+    def with_status(self, status: str, limit: int | None = None) -> List[ModelRecord]:
+        """Records with ``status``, newest first."""
+
+        return self.page(limit=limit, status=status)[0]
+
+    def page(
+        self, limit: int | None = None, before: str | None = None, status: str | None = None
+    ) -> tuple[List[ModelRecord], str | None]:
+        """Up to ``limit`` records older than version ``before``, newest first.
+
+        Returns the records and the cursor for the next page (``None`` on
+        the last page).
+        """
+
+        clauses: List[str] = []
+        params: List[Any] = []
+        with self._connect() as connection:
+            if before is not None:
+                row = connection.execute("SELECT seq FROM models WHERE version = ?", (before,)).fetchone()
+                if row is None:
+                    raise KeyError(before)
+                clauses.append("seq < ?")
+                params.append(row["seq"])
+            if status is not None:
+                clauses.append("status = ?")
+                params.append(status)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            query = f"SELECT {_COLUMNS} FROM models {where} ORDER BY seq DESC"
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(limit + 1)
+            rows = connection.execute(query, params).fetchall()
+        more = limit is not None and len(rows) > limit
+        records = [_record(row) for row in (rows[:limit] if more else rows)]
+        return records, records[-1].version if more else None
+
+    def count(self, status: str | None = None) -> int:
+        with self._connect() as connection:
+            if status is None:
+                return connection.execute("SELECT COUNT(*) FROM models").fetchone()[0]
+            return connection.execute("SELECT COUNT(*) FROM models WHERE status = ?", (status,)).fetchone()[0]
+
+    def revision(self) -> int:
+        """Counter bumped by every write; unchanged means the registry is unchanged."""
+
+        with self._connect() as connection:
+            row = connection.execute("SELECT value FROM registry_meta WHERE key = 'revision'").fetchone()
+        return int(row["value"]) if row else 0
+
+    def history(
+        self, limit: int | None = None, before: str | None = None, status: str | None = None
+    ) -> ModelHistoryResponse:
+        records, cursor = self.page(limit=limit, before=before, status=status)
+        items = [ModelMetadata.construct(**record.__dict__) for record in records]
+        return ModelHistoryResponse(items=items, next_cursor=cursor, total=self.count(status))
@@ -0,0 +1,346 @@
+"""HTTP service publishing content-addressed registry snapshots.
+
+Usage: python -m ml.registry_server [--host 0.0.0.0] [--port 9000] [--blobs data/state/registry_blobs]
+
+Every artifact the service publishes is a blob named by the SHA-256 of
+its content and stored under ``--blobs``. Blobs never change once written:
+each model record (metadata and metrics), each trained model file and
+each file of an approved dataset is stored once per distinct content. The snapshot of the whole
+registry is also a blob. It is a compact JSON index listing, for every
+model version, its name, status, record digest and artifact digests.
+
+Endpoints:
+
+``GET /index``
+    The current snapshot. ``ETag`` is its digest and ``Cache-Control:
+    no-cache``, so a poll with ``If-None-Match`` costs a ``304`` until the
+    registry changes. The snapshot is rebuilt only when the registry
+    revision moves (or a dataset that was still being approved gets its
+    ``meta.json``), and unchanged files are not hashed again.
+``GET /blobs/<digest>``
+    A record, artifact or older snapshot. It is served as immutable and
+    cacheable forever, with ``Range`` and ``If-None-Match`` support.
+
+Nothing else under ``data/state`` is exposed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from api.app.services import jobs
+
+from .registry import ModelRecord, ModelRegistry
+
+LOGGER = logging.getLogger(__name__)
+
+BLOB_DIR = Path("data/state/registry_blobs")
+POLL_INTERVAL = 1.0
+"""Minimum seconds between two checks of the registry revision."""
+
+INDEX_FIELDS = ("version", "model_name", "status", "record", "artifacts")
+IMMUTABLE = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 1 << 16
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+Stamp = Tuple[int, int]
+
+
+class BlobStore:
+    """Write-once blobs addressed by their SHA-256."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    def path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+
+    def put_bytes(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not path.exists():
+            self._store(path, lambda handle: handle.write(data))
+        return digest
+
+    def put_file(self, source: Path, digest: str) -> None:
+        """Store ``source`` under its precomputed ``digest``."""
+
+        path = self.path(digest)
+        if path.exists():
+            return
+        with source.open("rb") as handle:
+            self._store(path, lambda out: shutil.copyfileobj(handle, out, CHUNK_SIZE))
+
+    def _store(self, path: Path, write: Any) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                write(handle)
+            os.replace(temp, path)
+        except BaseException:
+            Path(temp).unlink(missing_ok=True)
+            raise
+
+
+def _canonical(payload: Any) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RegistryPublisher:
+    """Keeps the current snapshot of the registry in a :class:`BlobStore`."""
+
+    def __init__(
+        self,
+        store: BlobStore,
+        registry: ModelRegistry | None = None,
+        approved_dir: Path | None = None,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.store = store
+        self.registry = registry or ModelRegistry()
+        self.approved_dir = approved_dir or jobs.APPROVED_DIR
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._digests: Dict[Path, Tuple[Stamp, str]] = {}
+        self._revision: int | None = None
+        self._pending: List[Path] = []
+        self._checked = 0.0
+        self.digest = ""
+        self.index = b""
+
+    def current(self) -> Tuple[str, bytes]:
+        """Digest and bytes of the current snapshot, rebuilding it if stale."""
+
+        with self._lock:
+            now = time.monotonic()
+            if self._revision is None or now - self._checked >= self.poll_interval:
+                self._checked = now
+                revision = self.registry.revision()
+                if revision != self._revision or any((path / "meta.json").exists() for path in self._pending):
+                    self._publish(revision)
+            return self.digest, self.index
+
+    def _dataset_dir(self, record: ModelRecord) -> Path | None:
+        job_id = record.metrics.get("job_id")
+        if not job_id or not record.model_name.startswith("dataset-"):
+            return None
+        matches = sorted(path for path in self.approved_dir.glob(f"*/{job_id}") if path.is_dir())
+        return matches[-1] if matches else None
+
+    def _artifact(self, path: Path) -> Dict[str, Any]:
+        stat = path.stat()
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        cached = self._digests.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, _file_digest(path))
+            self._digests[path] = cached
+        self.store.put_file(path, cached[1])
+        return {"digest": cached[1], "size": stamp[0]}
+
+    def _publish(self, revision: int) -> None:
+        models: List[List[Any]] = []
+        pending: List[Path] = []
+        for record in self.registry.page()[0]:
+            record_digest = self.store.put_bytes(
+                _canonical({"created_at": record.created_at, "metrics": record.metrics})
+            )
+            artifacts: Dict[str, Any] = {}
+            model_file = record.metrics.get("artifact")
+            if isinstance(model_file, str) and Path(model_file).is_file():
+                artifacts[Path(model_file).name] = self._artifact(Path(model_file))
+            dataset_dir = self._dataset_dir(record)
+            if dataset_dir is not None:
+                for path in sorted(dataset_dir.iterdir()):
+                    if path.is_file():
+                        artifacts[path.name] = self._artifact(path)
+                if "meta.json" not in artifacts:
+                    # The approval is still copying files; look again on the next poll.
+                    pending.append(dataset_dir)
+            models.append([record.version, record.model_name, record.status, record_digest, artifacts])
+        index = _canonical({"revision": revision, "fields": list(INDEX_FIELDS), "models": models})
+        self.digest = self.store.put_bytes(index)
+        self.index = index
+        self._revision = revision
+        self._pending = pending
+        LOGGER.info("Published registry snapshot %s (revision %d, %d models)", self.digest, revision, len(models))
+
+
+def parse_range(header: str, size: int) -> Tuple[int, int] | None:
+    """``(start, end)`` inclusive for a single ``bytes=`` range; ``None`` to serve the whole body.
+
+    Raises :class:`ValueError` when the range cannot be satisfied.
+    """
+
+    match = _RANGE.fullmatch(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if header is None:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class RegistryHandler(BaseHTTPRequestHandler):
+    publisher: RegistryPublisher
+    protocol_version = "HTTP/1.1"
+    server_version = "cne-registry"
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        self._serve(head=False)
+
+    def do_HEAD(self) -> None:  # noqa: N802 - http.server naming
+        self._serve(head=True)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - http.server signature
+        LOGGER.debug("%s " + format, self.address_string(), *args)
+
+    def _serve(self, head: bool) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/index":
+            digest, index = self.publisher.current()
+            self._send_bytes(index, f'"{digest}"', "no-cache", head)
+            return
+        if path.startswith("/blobs/"):
+            digest = path[len("/blobs/"):]
+            blob = self.publisher.store.path(digest) if _DIGEST.fullmatch(digest) else None
+            if blob is not None and blob.is_file():
+                self._send_file(blob, f'"{digest}"', head)
+                return
+        self._send_error(HTTPStatus.NOT_FOUND, head)
+
+    def _not_modified(self, etag: str, cache_control: str) -> bool:
+        if not _etag_matches(self.headers.get("If-None-Match"), etag):
+            return False
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        return True
+
+    def _send_bytes(self, body: bytes, etag: str, cache_control: str, head: bool) -> None:
+        if self._not_modified(etag, cache_control):
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _send_file(self, path: Path, etag: str, head: bool) -> None:
+        if self._not_modified(etag, IMMUTABLE):
+            return
+        size = path.stat().st_size
+        byte_range = None
+        if_range = self.headers.get("If-Range")
+        if "Range" in self.headers and (if_range is None or if_range.strip() == etag):
+            try:
+                byte_range = parse_range(self.headers["Range"], size)
+            except ValueError:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        start, end = byte_range or (0, size - 1)
+        self.send_response(HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", IMMUTABLE)
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if head:
+            return
+        with path.open("rb") as handle:
+            handle.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = handle.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def _send_error(self, status: HTTPStatus, head: bool) -> None:
+        body = _canonical({"detail": status.phrase})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+def make_server(host: str, port: int, publisher: RegistryPublisher) -> ThreadingHTTPServer:
+    handler = type("BoundRegistryHandler", (RegistryHandler,), {"publisher": publisher})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve content-addressed model registry snapshots.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--blobs", type=Path, default=BLOB_DIR)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    publisher = RegistryPublisher(BlobStore(args.blobs), poll_interval=args.poll_interval)
+    publisher.current()
+    server = make_server(args.host, args.port, publisher)
+    LOGGER.info("Registry serving on http://%s:%d", args.host, server.server_address[1])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:  # pragma: no cover - interactive shutdown
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,197 @@
+"""Synthetic training rows derived from the approved corpus.
+
+Each synthetic row is a corpus row with its sigla and proposing party
+swapped for a random master-data entry and its candidate name tagged as
+synthetic. The dataset is ``multiplier`` passes over the corpus.
+
+:func:`write_synthetic_dataset` streams that dataset to disk in shards of
+``shard_rows`` rows. Shard ``i`` covers a fixed range of the dataset and
+draws from its own generator seeded by ``(seed, i)``, so shards can be
+written by parallel worker processes and the files are the same whatever
+the number of workers. Rows are read from the corpus and written one at a
+time, so memory does not depend on the dataset size.
+"""
+
 from __future__ import annotations
 
+import argparse
+import csv
+import hashlib
+import json
 import random
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from api.app.services import codec, master_data
+from api.app.services.columnar import ColumnarWriter
+from worker.src.ocr import POOL_CONTEXT
+
+from . import training
+from .corpus import TrainingCorpus
+
+SHARD_ROWS = 250_000
+FORMATS = ("csv", "columnar")
+SUFFIXES = {"csv": ".csv", "columnar": ".cols"}
+
+MasterPair = Tuple[str, str]
 
-from api.app.services.master_data import MasterDataService
 
-from .training import build_training_corpus
+def master_pairs(directory: Path | None = None) -> List[MasterPair]:
+    """``(sigla, descricao)`` of every master-data record, in file order."""
+
+    pairs: List[MasterPair] = []
+    for file in sorted((directory or master_data.DATA_DIR).glob("*.json")):
+        data = json.loads(file.read_text(encoding="utf-8"))
+        for item in data if isinstance(data, list) else [data]:
+            pairs.append((item["sigla"], item["descricao"]))
+    return pairs
+
+
+def synthesize(row: Mapping[str, str], pairs: Sequence[MasterPair], rng: random.Random) -> Dict[str, str]:
+    record = dict(row)
+    if pairs:
+        record["SIGLA"], record["PARTIDO_PROPONENTE"] = rng.choice(pairs)
+    record["INDEPENDENTE"] = record.get("INDEPENDENTE") or "N"
+    record["NOME_CANDIDATO"] = f"{record.get('NOME_CANDIDATO', '').strip()} (synthetic)".strip()
+    return record
 
 
 def generate_synthetic_dataset(multiplier: int = 2) -> List[dict[str, str]]:
-    master_service = MasterDataService()
-    master_records = master_service.list_records().records
-    base_rows = build_training_corpus()
-    synthetic: List[dict[str, str]] = []
-    for _ in range(multiplier):
-        for row in base_rows:
-            record = row.copy()
-            if master_records:
-                match = random.choice(master_records)
-                record["SIGLA"] = match.sigla
-                record["PARTIDO_PROPONENTE"] = match.descricao
-            record["INDEPENDENTE"] = record.get("INDEPENDENTE") or "N"
-            record["NOME_CANDIDATO"] = f"{record.get('NOME_CANDIDATO', '').strip()} (synthetic)".strip()
-            synthetic.append(record)
-    return synthetic
+    corpus = training.training_corpus()
+    corpus.refresh()
+    pairs = master_pairs()
+    rng = random.Random()
+    return [synthesize(row, pairs, rng) for _ in range(multiplier) for row in corpus.iter_rows()]
+
+
+def shard_seed(seed: int, shard: int) -> int:
+    digest = hashlib.sha256(f"{seed}:{shard}".encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+@dataclass(frozen=True)
+class ShardTask:
+    index: int
+    start: int
+    stop: int
+    seed: int
+    path: Path
+    fmt: str
+    corpus: TrainingCorpus
+    corpus_rows: int
+    pairs: Tuple[MasterPair, ...]
+
+
+def _source_rows(task: ShardTask) -> Iterator[Dict[str, str]]:
+    """Corpus rows behind dataset rows ``task.start:task.stop``, wrapping between passes."""
+
+    if len(task.corpus) != task.corpus_rows:
+        raise RuntimeError("The training corpus changed while the synthetic dataset was being written")
+    position = task.start
+    while position < task.stop:
+        offset = position % task.corpus_rows
+        take = min(task.stop - position, task.corpus_rows - offset)
+        yield from task.corpus.iter_rows(start=offset, stop=offset + take)
+        position += take
+
+
+def write_shard(task: ShardTask) -> Dict[str, Any]:
+    rng = random.Random(task.seed)
+    rows = (synthesize(row, task.pairs, rng) for row in _source_rows(task))
+    first = next(rows)
+    columns = list(first)
+    count = 0
+    if task.fmt == "columnar":
+        with ColumnarWriter(task.path, columns) as writer:
+            for record in chain([first], rows):
+                writer.append(record)
+                count += 1
+    else:
+        temp_path = task.path.with_name(f"{task.path.name}.tmp")
+        with temp_path.open("w", encoding="utf-8", newline="") as handle:
+            out = csv.DictWriter(handle, fieldnames=columns, delimiter=";")
+            out.writeheader()
+            for record in chain([first], rows):
+                out.writerow(record)
+                count += 1
+        temp_path.replace(task.path)
+    return {"file": task.path.name, "rows": count, "start": task.start, "seed": task.seed}
+
+
+def write_synthetic_dataset(
+    output_dir: Path,
+    multiplier: int = 2,
+    seed: int = 0,
+    shard_rows: int = SHARD_ROWS,
+    workers: int = 1,
+    fmt: str = "csv",
+) -> Dict[str, Any]:
+    """Write ``multiplier`` synthetic passes over the corpus as shards.
+
+    Returns the manifest also saved as ``output_dir/manifest.json``.
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (expected one of {', '.join(FORMATS)})")
+    corpus = training.training_corpus()
+    corpus.refresh()
+    corpus_rows = len(corpus)
+    total = corpus_rows * max(0, multiplier)
+    shard_rows = max(1, shard_rows)
+    pairs = tuple(master_pairs())
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tasks = [
+        ShardTask(
+            index=index,
+            start=start,
+            stop=min(start + shard_rows, total),
+            seed=shard_seed(seed, index),
+            path=output_dir / f"shard-{index:05d}{SUFFIXES[fmt]}",
+            fmt=fmt,
+            corpus=corpus,
+            corpus_rows=corpus_rows,
+            pairs=pairs,
+        )
+        for index, start in enumerate(range(0, total, shard_rows))
+    ]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=POOL_CONTEXT) as pool:
+            shards = list(pool.map(write_shard, tasks))
+    else:
+        shards = [write_shard(task) for task in tasks]
+    written = {shard["file"] for shard in shards}
+    for stale in output_dir.glob("shard-*"):
+        if stale.name not in written:
+            stale.unlink()
+    manifest = {
+        "seed": seed,
+        "multiplier": multiplier,
+        "format": fmt,
+        "corpus_rows": corpus_rows,
+        "rows": sum(shard["rows"] for shard in shards),
+        "shards": shards,
+    }
+    codec.write(output_dir / "manifest.json", manifest)
+    return manifest
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Write a sharded synthetic dataset from the approved corpus.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--multiplier", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    args = parser.parse_args(argv)
+    manifest = write_synthetic_dataset(
+        args.output, args.multiplier, args.seed, args.shard_rows, args.workers, args.format
+    )
+    print(f"{args.output}: {manifest['rows']} rows in {len(manifest['shards'])} shard(s)")
+
+
+if __name__ == "__main__":  # pragma: no cover - convenience CLI
+    main()
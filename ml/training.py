@@ -1,47 +1,70 @@
 from __future__ import annotations
 
-import csv
-import json
+import hashlib
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Sequence
 
-from ml.registry import ModelRegistry
+from api.app.services import codec
+from ml.corpus import TrainingCorpus
+from ml.corrector import train_corrector
+from ml.registry import ModelRecord, ModelRegistry
+from worker.src.sigla_corrector import MODEL_NAME
 
 JOBS_FILE = Path("data/state/jobs.json")
 PROCESSED_DIR = Path("data/processed")
+CORPUS_DIR = Path("data/state/corpus")
+MODELS_DIR = Path("data/state/models")
 
 
-def _approved_jobs() -> List[str]:
-    if not JOBS_FILE.exists():
-        return []
-    data = json.loads(JOBS_FILE.read_text(encoding="utf-8"))
-    return [job_id for job_id, record in data.items() if record.get("status") == "approved"]
+def training_corpus() -> TrainingCorpus:
+    return TrainingCorpus(CORPUS_DIR, JOBS_FILE, PROCESSED_DIR)
 
 
-def _load_rows(job_id: str) -> List[dict[str, str]]:
-    csv_path = PROCESSED_DIR / job_id / "output.csv"
-    if not csv_path.exists():
-        return []
-    with csv_path.open(encoding="utf-8") as handle:
-        reader = csv.DictReader(handle, delimiter=";")
-        return list(reader)
+def iter_training_corpus(columns: Sequence[str] | None = None) -> Iterator[dict[str, str]]:
+    """Stream the rows of every approved job, ingesting new approvals first.
 
+    Pass ``columns`` to read only those.
+    """
 
-def build_training_corpus() -> List[dict[str, str]]:
-    rows: List[dict[str, str]] = []
-    for job_id in _approved_jobs():
-        rows.extend(_load_rows(job_id))
-    return rows
+    corpus = training_corpus()
+    corpus.refresh()
+    return corpus.iter_rows(columns)
 
 
-def train(model_name: str = "baseline") -> None:
+def build_training_corpus(columns: Sequence[str] | None = None) -> List[dict[str, str]]:
+    """Rows of every approved job; pass ``columns`` to read only those."""
+
+    return list(iter_training_corpus(columns))
+
+
+def train(model_name: str = MODEL_NAME) -> ModelRecord:
+    """Train the sigla corrector on the approved corpus and register it as a candidate.
+
+    The model is saved under ``MODELS_DIR``, named by its content hash;
+    the registry record points at it. The worker only uses it between jobs
+    once it has been reviewed and promoted to production.
+    """
+
     registry = ModelRegistry()
-    rows = build_training_corpus()
+    rows = 0
+    siglas: set[str] = set()
+    for row in iter_training_corpus(columns=["SIGLA"]):
+        rows += 1
+        if row["SIGLA"]:
+            siglas.add(row["SIGLA"])
+    corrector, corrector_metrics = train_corrector(training_corpus())
+    payload = corrector.to_payload()
+    digest = hashlib.sha256(codec.dumps(payload)).hexdigest()
+    artifact = MODELS_DIR / f"{model_name}-{digest[:16]}.json"
+    codec.write(artifact, payload)
     metrics = {
-        "rows": len(rows),
-        "unique_siglas": len({row.get("SIGLA") for row in rows if row.get("SIGLA")}),
+        "rows": rows,
+        "unique_siglas": len(siglas),
+        **corrector_metrics,
+        "artifact": str(artifact),
+        "sha256": digest,
     }
-    registry.register(model_name=model_name, metrics=metrics)
+    return registry.register(model_name=model_name, metrics=metrics)
 
 
 if __name__ == "__main__":  # pragma: no cover - convenience CLI
@@ -4,7 +4,6 @@ import csv
 import json
 import shutil
 import sys
-from collections import defaultdict
 from pathlib import Path
 from types import SimpleNamespace
 from typing import Callable
@@ -17,7 +16,9 @@ if str(PROJECT_ROOT) not in sys.path:
 import pytest
 
 from api.app.schemas import JobCreate
+from api.app.services import events as events_module
 from api.app.services import jobs as jobs_module
+from api.app.services import metrics as metrics_module
 from api.app.services.jobs import JobService
 from worker.src import fuzzy
 
@@ -82,14 +83,17 @@ def reset_metrics(monkeypatch: pytest.MonkeyPatch) -> None:
 
 
 @pytest.fixture(autouse=True)
-def isolated_data_dirs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+def isolated_data_dirs(
+    request: pytest.FixtureRequest, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> SimpleNamespace:
     data_dir = tmp_path / "data"
     incoming = data_dir / "incoming"
     processed = data_dir / "processed"
     approved = data_dir / "approved"
     state_dir = data_dir / "state"
     master_dir = data_dir / "master"
-    for directory in (incoming, processed, approved, state_dir, master_dir):
+    cache_dir = data_dir / "cache"
+    for directory in (incoming, processed, approved, state_dir, master_dir, cache_dir):
         directory.mkdir(parents=True, exist_ok=True)
 
     monkeypatch.setattr(jobs_module, "STATE_FILE", state_dir / "jobs.json")
@@ -98,7 +102,12 @@ def isolated_data_dirs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Simpl
     monkeypatch.setattr(jobs_module, "PROCESSED_DIR", processed)
     monkeypatch.setattr(jobs_module, "APPROVED_DIR", approved)
     monkeypatch.setattr(jobs_module, "MASTER_DATA_DIR", master_dir)
-    monkeypatch.setattr(jobs_module, "_EVENT_LISTENERS", defaultdict(list))
+    monkeypatch.setattr(events_module, "JOURNAL_FILE", state_dir / "events.jsonl")
+    monkeypatch.setattr(events_module, "_BUS", None)
+    request.addfinalizer(events_module.reset_bus)
+    monkeypatch.setattr(metrics_module, "METRICS_DIR", state_dir / "metrics")
+    monkeypatch.setattr(metrics_module, "_PUBLISHER", None)
+    request.addfinalizer(metrics_module.stop_publisher)
     for directory in (jobs_module.STATE_FILE.parent, incoming, processed, approved):
         directory.mkdir(parents=True, exist_ok=True)
 
@@ -107,16 +116,42 @@ def isolated_data_dirs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Simpl
     monkeypatch.setattr(pipeline_module, "INCOMING_DIR", incoming)
     monkeypatch.setattr(pipeline_module, "PROCESSED_DIR", processed)
 
+    import worker.src.ocr_cache as ocr_cache_module
+
+    monkeypatch.setattr(ocr_cache_module, "CACHE_DIR", cache_dir / "ocr")
+
+    import worker.src.master_snapshot as master_snapshot_module
+
+    monkeypatch.setattr(master_snapshot_module, "SNAPSHOT_PATH", cache_dir / "master.snap")
+
+    import worker.src.spill as spill_module
+
+    monkeypatch.setattr(spill_module, "SPILL_DIR", cache_dir / "spill")
+
     import ml.registry as registry_module
 
     registry_module.REGISTRY_FILE = state_dir / "model_registry.json"
     registry_module.REGISTRY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(registry_module, "REGISTRY_DB", state_dir / "model_registry.sqlite3")
+
+    import ml.training as training_module
+
+    monkeypatch.setattr(training_module, "JOBS_FILE", state_dir / "jobs.json")
+    monkeypatch.setattr(training_module, "PROCESSED_DIR", processed)
+    monkeypatch.setattr(training_module, "CORPUS_DIR", state_dir / "corpus")
+    monkeypatch.setattr(training_module, "MODELS_DIR", state_dir / "models")
 
     import api.app.services.master_data as master_data_module
 
     monkeypatch.setattr(master_data_module, "DATA_DIR", master_dir)
 
-    return SimpleNamespace(incoming=incoming, processed=processed, approved=approved, state=state_dir)
+    return SimpleNamespace(
+        incoming=incoming,
+        processed=processed,
+        approved=approved,
+        state=state_dir,
+        cache=cache_dir,
+    )
 
 
 @pytest.fixture(autouse=True)
@@ -131,6 +166,7 @@ def synthetic_master_data(monkeypatch: pytest.MonkeyPatch) -> None:
         "GCE": {"sigla": "GCE", "descricao": "Grupo Consultivo Especial", "codigo": "003"},
     }
     monkeypatch.setattr(fuzzy, "MASTER_CACHE", master_cache)
+    monkeypatch.setattr(fuzzy, "CORRECTOR", None)
 
 
 @pytest.fixture
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from api.app.schemas import JobCreate, PreviewResponse, PreviewRow, ValidationBadge
+from api.app.services import codec
+from api.app.services import jobs as jobs_module
+from api.app.services.jobs import JobService
+
+
+def _preview() -> PreviewResponse:
+    rows = [
+        PreviewRow.construct(
+            columns=["2024-01-01", "AM", "2", "MEC", "", "Lista Única", str(index), "Ana", "", "N"],
+            validations=[
+                ValidationBadge.construct(field="DTMNFR", status="OK", message=None),
+                ValidationBadge.construct(field="SIGLA", status="AVISO", message="Sigla ajustada para MEC"),
+            ],
+        )
+        for index in range(3)
+    ]
+    return PreviewResponse.construct(
+        job_id="job", headers=["DTMNFR"], rows=rows, total_rows=len(rows), metadata={"ocr_conf_mean": 0.5}
+    )
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_codec_encodes_models_like_pydantic(monkeypatch: pytest.MonkeyPatch, use_orjson: bool) -> None:
+    if not use_orjson:
+        monkeypatch.setattr(codec, "orjson", None)
+    elif codec.orjson is None:
+        pytest.skip("orjson is not installed")
+    preview = _preview()
+
+    encoded = codec.dumps(preview)
+
+    assert b"\n" not in encoded
+    assert codec.loads(encoded) == json.loads(preview.json())
+    assert PreviewResponse(**codec.loads(encoded)) == PreviewResponse(**json.loads(preview.json()))
+
+
+def test_job_state_is_written_compactly_and_reloaded() -> None:
+    service = JobService()
+    job = service.create(JobCreate(filename="doc.pdf", uploader="pytest"))
+
+    raw = jobs_module.STATE_FILE.read_bytes()
+    assert b"\n" not in raw
+    assert JobService().get(job.job_id) == job
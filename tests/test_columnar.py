@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+
+import pytest
+
+from api.app.services import columnar
+from api.app.services import jobs as jobs_module
+from ml import training
+from worker.src.extract import EXPECTED_COLUMNS
+from worker.src.pipeline import process_job
+
+
+def test_columnar_round_trip_with_row_groups(tmp_path: Path) -> None:
+    records = [
+        {"ORGAO": "AM" if index % 3 else "CM", "NOME_CANDIDATO": f"Candidata {index} ção", "TIPO": ""}
+        for index in range(1000)
+    ]
+    path = tmp_path / columnar.FILENAME
+    with columnar.ColumnarWriter(path, ["ORGAO", "NOME_CANDIDATO", "TIPO"], row_group_size=300) as writer:
+        for record in records:
+            writer.append(record)
+
+    reader = columnar.ColumnarReader(path)
+    assert len(reader) == 1000
+    assert list(reader.iter_rows()) == records
+    assert reader.read(["ORGAO"]) == {"ORGAO": [record["ORGAO"] for record in records]}
+    assert list(reader.iter_rows(["ORGAO"], 250, 650)) == [{"ORGAO": record["ORGAO"]} for record in records[250:650]]
+    assert list(reader.iter_rows(None, 990, 2000)) == records[990:]
+    with pytest.raises(KeyError):
+        reader.read(["SIGLA"])
+
+
+def test_pipeline_writes_columnar_output_matching_csv(
+    pdf_sample: Path, job_factory, job_service, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(training, "JOBS_FILE", jobs_module.STATE_FILE)
+    monkeypatch.setattr(training, "PROCESSED_DIR", jobs_module.PROCESSED_DIR)
+    job_id = job_factory(pdf_sample)
+    process_job(job_id)
+    job_dir = jobs_module.PROCESSED_DIR / job_id
+
+    with (job_dir / "output.csv").open(encoding="utf-8", newline="") as handle:
+        csv_rows = list(csv.DictReader(handle, delimiter=";"))
+    reader = columnar.ColumnarReader(job_dir / columnar.FILENAME)
+    assert reader.columns == EXPECTED_COLUMNS
+    assert list(reader.iter_rows()) == csv_rows
+
+    job_service.approve(job_id, approver="pytest")
+    assert training.build_training_corpus(columns=["SIGLA"]) == [{"SIGLA": row["SIGLA"]} for row in csv_rows]
+    approved = list(jobs_module.APPROVED_DIR.glob(f"*/{job_id}/{columnar.FILENAME}"))
+    assert len(approved) == 1
+
+
+def test_dataset_reader_falls_back_to_csv(tmp_path: Path) -> None:
+    (tmp_path / "output.csv").write_text("ORGAO;TIPO\nAM;2\n", encoding="utf-8")
+    assert list(columnar.iter_dataset(tmp_path, ["TIPO"])) == [{"TIPO": "2"}]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from api.app.services import columnar
+from ml import corpus as corpus_module
+from ml.corpus import TrainingCorpus
+
+
+def _dataset(processed: Path, job_id: str, siglas: list[str]) -> None:
+    directory = processed / job_id
+    directory.mkdir(parents=True, exist_ok=True)
+    lines = ["SIGLA;NOME_CANDIDATO"] + [f"{sigla};Candidato {job_id} {index}" for index, sigla in enumerate(siglas)]
+    (directory / "output.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _approve(jobs_file: Path, statuses: dict[str, str]) -> None:
+    jobs_file.write_text(json.dumps({job_id: {"status": status} for job_id, status in statuses.items()}))
+
+
+@pytest.fixture
+def corpus(tmp_path: Path) -> TrainingCorpus:
+    return TrainingCorpus(tmp_path / "corpus", tmp_path / "jobs.json", tmp_path / "processed")
+
+
+def test_refresh_ingests_only_new_approvals(corpus: TrainingCorpus, monkeypatch: pytest.MonkeyPatch) -> None:
+    _dataset(corpus.processed_dir, "a", ["MEC", "INEP"])
+    _dataset(corpus.processed_dir, "b", ["GCE"])
+    _dataset(corpus.processed_dir, "c", ["MEC"])
+    _approve(corpus.jobs_file, {"a": "approved", "b": "completed", "c": "approved"})
+
+    assert corpus.refresh() == ["a", "c"]
+    assert len(corpus) == 3
+
+    reads: list[Path] = []
+    original = corpus_module.iter_dataset
+    monkeypatch.setattr(corpus_module, "iter_dataset", lambda path, *args: reads.append(path) or original(path, *args))
+    assert corpus.refresh() == []
+    assert reads == []
+
+    _approve(corpus.jobs_file, {"a": "approved", "b": "approved", "c": "approved"})
+    assert corpus.refresh() == ["b"]
+    assert reads == [corpus.processed_dir / "b"]
+    assert [row["SIGLA"] for row in corpus.iter_rows(["SIGLA"])] == ["MEC", "INEP", "MEC", "GCE"]
+    assert next(corpus.iter_rows())["NOME_CANDIDATO"] == "Candidato a 0"
+    assert corpus.manifest()["jobs"]["b"]["rows"] == 1
+
+
+def test_changed_or_withdrawn_datasets_rebuild_the_corpus(corpus: TrainingCorpus) -> None:
+    _dataset(corpus.processed_dir, "a", ["MEC"])
+    _dataset(corpus.processed_dir, "b", ["INEP"])
+    _approve(corpus.jobs_file, {"a": "approved", "b": "approved"})
+    corpus.refresh()
+
+    _dataset(corpus.processed_dir, "a", ["MEC", "GCE"])
+    assert corpus.refresh() == ["a", "b"]
+    assert [row["SIGLA"] for row in corpus.iter_rows(["SIGLA"])] == ["MEC", "GCE", "INEP"]
+
+    _approve(corpus.jobs_file, {"a": "completed", "b": "approved"})
+    assert corpus.refresh() == ["b"]
+    assert list(corpus.iter_rows(["SIGLA"])) == [{"SIGLA": "INEP"}]
+    assert sorted(path.name for path in corpus.directory.glob("segment-*")) == corpus.manifest()["segments"]
+
+
+def test_segments_are_compacted(tmp_path: Path) -> None:
+    corpus = TrainingCorpus(tmp_path / "corpus", tmp_path / "jobs.json", tmp_path / "processed", max_segments=2)
+    statuses: dict[str, str] = {}
+    for index in range(5):
+        job_id = f"job{index}"
+        _dataset(corpus.processed_dir, job_id, [f"S{index}"])
+        statuses[job_id] = "approved"
+        _approve(corpus.jobs_file, statuses)
+        assert corpus.refresh() == [job_id]
+        assert len(corpus.manifest()["segments"]) <= 2
+
+    assert [row["SIGLA"] for row in corpus.iter_rows(["SIGLA", "MISSING"])] == [f"S{index}" for index in range(5)]
+    assert len(list(corpus.directory.glob("segment-*.cols"))) == len(corpus.manifest()["segments"])
+    segment = corpus.directory / corpus.manifest()["segments"][0]
+    assert columnar.ColumnarReader(segment).columns == ["SIGLA", "NOME_CANDIDATO"]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import csv
+import gzip
+from pathlib import Path
+
+from api.app.services import columnar
+from worker.src import csv_writer
+from worker.src.extract import EXPECTED_COLUMNS
+
+
+def _dict_writer_bytes(records: list[dict[str, str]], path: Path) -> bytes:
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=EXPECTED_COLUMNS, delimiter=";")
+        writer.writeheader()
+        for record in records:
+            writer.writerow({key: record.get(key, "") for key in EXPECTED_COLUMNS})
+    return path.read_bytes()
+
+
+def test_positional_writer_matches_dict_writer_and_variants(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(csv_writer, "CHUNK_ROWS", 7)
+    records = [
+        {column: f"{column.lower()} {index}" for column in EXPECTED_COLUMNS} for index in range(30)
+    ]
+    records[3]["NOME_CANDIDATO"] = 'Ana "Maria"; da Silva'
+    del records[4]["SIMBOLO"]
+    expected = _dict_writer_bytes(records, tmp_path / "expected.csv")
+
+    rows = (csv_writer.record_row(record) for record in records)
+    path = csv_writer.write_rows("job", rows, tmp_path, write_columnar=True, compress=True)
+
+    assert path.read_bytes() == expected
+    assert gzip.decompress((tmp_path / "job" / "output.csv.gz").read_bytes()) == expected
+    reader = columnar.ColumnarReader(tmp_path / "job" / columnar.FILENAME)
+    assert [tuple(row.values()) for row in reader.iter_rows()] == [
+        csv_writer.record_row(record) for record in records
+    ]
+
+
+def test_column_batches_and_stale_variants(tmp_path: Path) -> None:
+    batch = [[f"{column} {index}" for index in range(3)] for column in EXPECTED_COLUMNS]
+    csv_writer.write_rows("job", csv_writer.rows_from_batches([batch, batch]), tmp_path, compress=True)
+    csv_writer.write_rows("job", csv_writer.rows_from_batches([batch]), tmp_path, write_columnar=False)
+
+    with (tmp_path / "job" / "output.csv").open(encoding="utf-8", newline="") as handle:
+        assert len(list(csv.reader(handle, delimiter=";"))) == 4
+    assert not (tmp_path / "job" / "output.csv.gz").exists()
+    assert not (tmp_path / "job" / columnar.FILENAME).exists()
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+from api.app.schemas import JobStatus
+from api.app.services import events
+from api.app.services.events import DropPolicy, Event, EventBus, EventJournal, JournalReader
+from api.app.services.jobs import JobService
+from api.app.services.metrics import MetricsService
+
+
+def _bus(tmp_path: Path, **journal_options) -> EventBus:
+    return EventBus(EventJournal(tmp_path / "events.jsonl", **journal_options))
+
+
+def test_slow_listener_does_not_delay_emit(tmp_path: Path) -> None:
+    bus = _bus(tmp_path)
+    received: list[dict] = []
+
+    def _slow(payload: dict) -> None:
+        time.sleep(0.2)
+        received.append(payload)
+
+    bus.subscribe("job.done", _slow, name="slow")
+    started = time.perf_counter()
+    for index in range(3):
+        bus.emit("job.done", {"index": index})
+    assert time.perf_counter() - started < 0.1
+    assert bus.flush()
+    assert [payload["index"] for payload in received] == [0, 1, 2]
+    metrics = MetricsService.get_instance()
+    assert metrics.get_counter("events.job.done.slow.delivered") == 3
+    latency = metrics.get_summary("events.job.done.slow.latency_s")
+    assert latency["count"] == 3 and latency["max"] >= 0.2
+    bus.close()
+
+
+def test_batch_listener_receives_queued_events_together(tmp_path: Path) -> None:
+    bus = _bus(tmp_path)
+    busy, gate = threading.Event(), threading.Event()
+    batches: list[list[dict]] = []
+
+    def _listener(payloads: list[dict]) -> None:
+        busy.set()
+        gate.wait(5)
+        batches.append(payloads)
+
+    bus.subscribe("row", _listener, batch=True, batch_size=4)
+    bus.emit("row", {"index": 0})
+    busy.wait(5)
+    for index in range(1, 9):
+        bus.emit("row", {"index": index})
+    gate.set()
+    assert bus.flush()
+    assert [len(batch) for batch in batches] == [1, 4, 4]
+    assert [payload["index"] for batch in batches for payload in batch] == list(range(9))
+    bus.close()
+
+
+def test_full_queue_applies_drop_policy(tmp_path: Path) -> None:
+    bus = _bus(tmp_path)
+    gate = threading.Event()
+    seen: dict[str, list[int]] = {"oldest": [], "newest": []}
+    started = threading.Barrier(3)
+
+    def _listener(name: str):
+        def _receive(payload: dict) -> None:
+            if payload["index"] == 0:
+                started.wait(5)
+                gate.wait(5)
+            seen[name].append(payload["index"])
+
+        return _receive
+
+    bus.subscribe("tick", _listener("oldest"), name="oldest", queue_size=2, policy=DropPolicy.DROP_OLDEST)
+    bus.subscribe("tick", _listener("newest"), name="newest", queue_size=2, policy=DropPolicy.DROP_NEWEST)
+    bus.emit("tick", {"index": 0})
+    started.wait(5)  # both listeners hold event 0, their queues are empty
+    for index in range(1, 6):
+        bus.emit("tick", {"index": index})
+    gate.set()
+    assert bus.flush()
+
+    assert seen == {"oldest": [0, 4, 5], "newest": [0, 1, 2]}
+    metrics = MetricsService.get_instance()
+    assert metrics.get_counter("events.tick.oldest.dropped") == 3
+    assert metrics.get_counter("events.tick.newest.dropped") == 3
+    bus.close()
+
+
+def test_block_policy_applies_backpressure(tmp_path: Path) -> None:
+    bus = _bus(tmp_path)
+    received: list[int] = []
+
+    def _listener(payload: dict) -> None:
+        time.sleep(0.05)
+        received.append(payload["index"])
+
+    bus.subscribe("tick", _listener, queue_size=1, policy=DropPolicy.BLOCK, block_timeout=5)
+    for index in range(5):
+        bus.emit("tick", {"index": index})
+    assert bus.flush()
+    assert received == [0, 1, 2, 3, 4]
+    bus.close()
+
+
+def test_full_journal_writer_drops_instead_of_blocking(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(events, "QUEUE_SIZE", 2)
+    busy, gate = threading.Event(), threading.Event()
+
+    class _StalledJournal(EventJournal):
+        def append(self, batch: list[Event]) -> None:
+            busy.set()
+            gate.wait(5)
+            super().append(batch)
+
+    bus = EventBus(_StalledJournal(tmp_path / "events.jsonl"))
+    bus.emit("tick", {"index": 0}, durable=True)
+    busy.wait(5)
+    started = time.perf_counter()
+    for index in range(1, 6):
+        bus.emit("tick", {"index": index}, durable=True)
+    assert time.perf_counter() - started < 0.5
+    gate.set()
+    assert bus.flush()
+
+    lines = (tmp_path / "events.jsonl").read_bytes().splitlines()
+    assert [Event.from_line(line).payload["index"] for line in lines] == [0, 1, 2]
+    assert MetricsService.get_instance().get_counter("events.journal.dropped") == 3
+    bus.close()
+
+
+def test_failing_listener_does_not_affect_others(tmp_path: Path) -> None:
+    bus = _bus(tmp_path)
+    received: list[dict] = []
+
+    def _broken(payload: dict) -> None:
+        raise RuntimeError("boom")
+
+    bus.subscribe("tick", _broken, name="broken")
+    bus.subscribe("tick", received.append, name="healthy")
+    bus.emit("tick", {"index": 1})
+    assert bus.flush()
+    assert received == [{"index": 1}]
+    assert MetricsService.get_instance().get_counter("events.tick.broken.failed") == 1
+    bus.close()
+
+
+def test_durable_events_reach_other_processes_once(tmp_path: Path) -> None:
+    worker, api = _bus(tmp_path), _bus(tmp_path)
+    from_worker: list[dict] = []
+    local: list[dict] = []
+    api.subscribe("job.status", from_worker.append)
+    worker.subscribe("job.status", local.append)
+    api.follow_journal(interval=60)
+    worker.follow_journal(interval=60)
+
+    worker.emit("job.status", {"job_id": "a"}, durable=True)
+    worker.emit("job.status", {"job_id": "local-only"})
+    assert worker.flush()
+    assert api.poll_journal() == 1
+    assert worker.poll_journal() == 0  # its own events are not delivered twice
+    assert api.flush() and worker.flush()
+
+    assert from_worker == [{"job_id": "a"}]
+    assert local == [{"job_id": "a"}, {"job_id": "local-only"}]
+    worker.close()
+    api.close()
+
+
+def test_journal_reader_resumes_from_cursor_across_rotation(tmp_path: Path) -> None:
+    journal = EventJournal(tmp_path / "events.jsonl", max_bytes=200)
+    cursor = tmp_path / "api.cursor"
+
+    def _write(*indexes: int) -> None:
+        journal.append([Event("tick", {"index": index}, 0.0, "worker") for index in indexes])
+
+    _write(0)
+    reader = JournalReader(journal, cursor)
+    assert reader.read() == []  # a new reader starts at the end
+    _write(1, 2)
+    assert [event.payload["index"] for event in reader.read()] == [1, 2]
+    reader.close()
+
+    # Written while the reader was stopped, rotating the journal on the way.
+    _write(3, 4)
+    _write(5, 6)
+    assert journal.rotated_path.exists()
+    reader = JournalReader(journal, cursor)
+    assert [event.payload["index"] for event in reader.read()] == [3, 4, 5, 6]
+    _write(7)
+    assert [event.payload["index"] for event in reader.read()] == [7]
+    reader.close()
+
+
+def test_reader_saves_cursor_only_when_it_moves(tmp_path: Path, monkeypatch) -> None:
+    journal = EventJournal(tmp_path / "events.jsonl")
+    journal.append([Event("tick", {}, 0.0, "worker")])
+    cursor = tmp_path / "api.cursor"
+    writes: list[Path] = []
+    original_write = events.codec.write
+    monkeypatch.setattr(events.codec, "write", lambda path, value: writes.append(path) or original_write(path, value))
+
+    reader = JournalReader(journal, cursor)
+    for _ in range(3):
+        reader.read()
+    assert writes == [cursor]
+    journal.append([Event("tick", {}, 0.0, "worker")])
+    assert len(reader.read()) == 1
+    reader.read()
+    assert writes == [cursor, cursor]
+    reader.close()
+
+
+def test_reader_ignores_partial_lines(tmp_path: Path) -> None:
+    journal = EventJournal(tmp_path / "events.jsonl")
+    journal.path.write_bytes(b"")
+    reader = JournalReader(journal)
+    reader.read()
+    with journal.path.open("ab") as handle:
+        handle.write(b'{"name":"tick","payload":{},"emitted_at":0,"ori')
+    assert reader.read() == []
+    with journal.path.open("ab") as handle:
+        handle.write(b'gin":"other"}\n')
+    assert [event.origin for event in reader.read()] == ["other"]
+    reader.close()
+
+
+def test_api_job_state_follows_worker_updates(job_service: JobService, job_factory, pdf_sample: Path) -> None:
+    job_id = job_factory(pdf_sample)
+    api_bus = EventBus()
+    events._BUS = api_bus
+    job_service.follow_events()
+
+    # The worker process has its own bus and its own copy of the state.
+    worker_bus = EventBus()
+    events._BUS = worker_bus
+    JobService().update_status(job_id, JobStatus.PROCESSING)
+    assert worker_bus.flush()
+
+    events._BUS = api_bus
+    assert api_bus.poll_journal() == 1
+    assert api_bus.flush()
+    assert job_service.get(job_id).status == JobStatus.PROCESSING
+    worker_bus.close()
+    api_bus.close()
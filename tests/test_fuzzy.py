@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import random
+import string
+from difflib import SequenceMatcher, get_close_matches
+
+from worker.src import fuzzy
+from worker.src.sigla_index import SiglaIndex
+
+
+def test_index_matches_difflib_best_match_and_ratio() -> None:
+    rng = random.Random(11)
+    alphabet = string.ascii_uppercase[:8] + "12"
+    keys = sorted({"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 7))) for _ in range(400)})
+    index = SiglaIndex(keys)
+
+    for _ in range(500):
+        query = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8)))
+        expected = get_close_matches(query, keys, n=1, cutoff=0.7)
+        actual = index.best_match(query, cutoff=0.7)
+        if not expected:
+            assert actual is None, query
+            continue
+        assert actual is not None, query
+        assert actual[0] == expected[0], query
+        matcher = SequenceMatcher(None, expected[0], query)
+        assert actual[1] == matcher.ratio()
+
+
+def test_match_sigla_uses_index_for_current_master_data() -> None:
+    assert fuzzy.match_sigla("mecq")[0] == "MEC"
+    assert fuzzy.match_sigla("INEPP")[0] == "INEP"
+    assert fuzzy.match_sigla("zzz") == ("ZZZ", None)
+    assert fuzzy.get_index() is fuzzy.get_index()
+
+
+def test_resolution_shared_between_normalize_and_validate(monkeypatch) -> None:
+    from worker.src import normalize, validate
+
+    calls: list[str] = []
+    original = SiglaIndex.best_match
+
+    def _counting_best_match(self, query, cutoff=0.7):
+        calls.append(query)
+        return original(self, query, cutoff)
+
+    monkeypatch.setattr(SiglaIndex, "best_match", _counting_best_match)
+    raw_records = [
+        {"DTMNFR": "2024-01-01", "ORGAO": "AM", "TIPO": "Titular", "NOME_LISTA": "Lista", "SIGLA": sigla}
+        for sigla in ("mecq", "Mecq", "MECQ", "mec", "Mec")
+    ]
+
+    normalized = normalize.normalize(raw_records)
+    results = validate.validate(normalized, context={"raw_records": raw_records})
+
+    assert calls == ["MECQ"]
+    assert [record["SIGLA"] for record in normalized] == ["MEC"] * 5
+    assert [{badge.field: badge.status for badge in badges}["SIGLA"] for badges in results] == [
+        "AVISO",
+        "AVISO",
+        "AVISO",
+        "OK",
+        "OK",
+    ]
+
+
+def test_resolution_cache_is_bounded_and_reset_on_master_change(monkeypatch) -> None:
+    monkeypatch.setattr(fuzzy, "RESOLUTION_CACHE_SIZE", 2)
+    monkeypatch.setattr(fuzzy, "MASTER_CACHE", dict(fuzzy.MASTER_CACHE))
+
+    for sigla in ("MEC", "INEP", "GCE", "GCE"):
+        fuzzy.resolve_sigla(sigla)
+
+    info = fuzzy.resolution_cache_info()
+    assert info["size"] == 2
+    assert info["hits"] == 1
+
+    monkeypatch.setattr(fuzzy, "MASTER_CACHE", {"MEC": {"sigla": "MEC", "descricao": "Novo"}})
+    assert fuzzy.resolve_sigla("mec").metadata == {"sigla": "MEC", "descricao": "Novo"}
+    assert fuzzy.resolution_cache_info()["size"] == 1
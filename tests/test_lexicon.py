@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from worker.src import extract, layout, segment
+from worker.src.lexicon import LEXICON, Lexicon
+
+
+def test_segment_prefers_first_listed_key() -> None:
+    assert LEXICON.segment("Tipo: Titular da LISTA") == "lista"
+    assert LEXICON.segment("descricao: candidato") == "body"
+    assert LEXICON.segment("ORGAO: Conselho") == "orgao"
+
+
+def test_labels_are_normalized_once_and_mapped() -> None:
+    lexicon = Lexicon(["orgao"], extract.FIELD_MAPPING)
+    for _ in range(3):
+        label, value = lexicon.split("Partido-Proponente :  Partido X ")
+        assert label == ("partido_proponente", "PARTIDO_PROPONENTE")
+        assert value == "Partido X"
+    assert lexicon.split("Descrição: Maria")[0].column == "NOME_CANDIDATO"
+    assert lexicon.split("fonte: DOU")[0].column is None
+    assert lexicon.split("sem rotulo") is None
+    assert lexicon.label.cache_info().hits >= 2
+
+
+def test_segment_and_extract_share_label_classification() -> None:
+    lines = [
+        "CNE",
+        "Competência: 2024",
+        "Órgão: Conselho",
+        "Lista: Lista A",
+        "Tipo: Titular",
+        "Descrição: Ana",
+        "continuação do nome",
+        "",
+        "orgao: Conselho",
+        "sigla: mec",
+    ]
+    records = extract.extract_records(segment.segment_lines(layout.detect_layout(lines)))
+
+    assert [record["NOME_CANDIDATO"] for record in records] == ["Ana continuação do nome", ""]
+    assert records[0]["DTMNFR"] == "2024"
+    assert records[1]["_raw_sigla"] == "mec"
+
+
+def test_extract_uses_the_segment_classification(monkeypatch) -> None:
+    lines = ["Competência: 2024", "orgao: Conselho", "Lista: Lista A", "Descrição: Ana"]
+    entries = list(segment.iter_segments(layout.iter_layout(lines)))
+
+    def _resplit(text: str) -> None:
+        raise AssertionError(f"extract split {text!r} again")
+
+    monkeypatch.setattr(LEXICON, "split", _resplit)
+    records = list(extract.iter_records(entries))
+
+    assert [(record["DTMNFR"], record["ORGAO"], record["NOME_CANDIDATO"]) for record in records] == [
+        ("2024", "Conselho", "Ana")
+    ]
+
+
+def test_records_stream_without_an_orgao_header() -> None:
+    consumed = 0
+
+    def _entries():
+        nonlocal consumed
+        for number in range(10 * extract.HEADER_LINES):
+            consumed += 1
+            yield from segment.iter_segments(layout.iter_layout([f"Lista: Lista {number}", ""]))
+
+    records = extract.iter_records(_entries())
+
+    assert next(records)["NOME_LISTA"] == "Lista 0"
+    assert consumed <= extract.HEADER_LINES
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.load_api import Sample, parse_mix, percentile, summarize
+
+
+def test_parse_mix_normalizes_weights() -> None:
+    assert parse_mix("upload=1,preview=3") == {"upload": 0.25, "preview": 0.75}
+    assert parse_mix("download") == {"download": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("delete=1")
+    with pytest.raises(ValueError):
+        parse_mix("upload=0")
+
+
+def test_summarize_reports_percentiles_and_errors() -> None:
+    samples = [Sample("preview", 200, value / 1000) for value in range(1, 101)]
+    samples += [Sample("approve", 200, 0.010), Sample("approve", 500, 0.020), Sample("approve", 0, 0.030)]
+
+    summary = summarize(samples, duration=2.0)
+
+    preview = summary["endpoints"]["preview"]
+    assert (preview["p50_ms"], preview["p95_ms"], preview["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert preview["throughput_rps"] == 50.0
+    assert preview["error_rate"] == 0.0
+    approve = summary["endpoints"]["approve"]
+    assert approve["errors"] == 2
+    assert approve["statuses"] == {"0": 1, "200": 1, "500": 1}
+    assert summary["total"]["requests"] == 103
+    assert "upload" not in summary["endpoints"]
+    assert percentile([], 99) == 0.0
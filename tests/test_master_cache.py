@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from api.app.services.metrics import MetricsService
+from worker.src import fuzzy
+from worker.src.master_cache import MasterDataManager
+from worker.src.master_snapshot import MappedMaster
+
+
+def _write_master(directory: Path, records: list[dict]) -> None:
+    path = directory / "default.json"
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+    # Bump the mtime explicitly so back-to-back writes are always detected.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_reload_is_built_in_background_and_swapped_between_jobs(isolated_data_dirs, tmp_path: Path) -> None:
+    master_dir = tmp_path / "data" / "master"
+    _write_master(master_dir, [{"sigla": "NOVO", "descricao": "Partido Novo", "codigo": "9"}])
+    manager = MasterDataManager(master_dir)
+    previous = fuzzy.MASTER_CACHE
+
+    assert manager.check() is True
+    assert fuzzy.MASTER_CACHE is previous, "Snapshots must not be published before the swap"
+    assert manager.check() is False, "Unchanged directories should not be reloaded"
+
+    assert manager.swap_if_ready() is True
+    assert fuzzy.match_sigla("novo")[1]["descricao"] == "Partido Novo"
+    assert fuzzy.match_sigla("mec")[1] is None
+    assert isinstance(fuzzy.MASTER_CACHE, MappedMaster)
+    assert list(fuzzy.get_index().keys) == ["NOVO"]
+    assert MetricsService.get_instance().get_counter("worker.master_data.reloads") == 1
+    assert manager.swap_if_ready() is False
+
+
+def test_unreadable_master_data_keeps_current_snapshot(isolated_data_dirs, tmp_path: Path) -> None:
+    master_dir = tmp_path / "data" / "master"
+    (master_dir / "partial.json").write_text('[{"sigla": "NO', encoding="utf-8")
+    manager = MasterDataManager(master_dir)
+    previous = fuzzy.MASTER_CACHE
+
+    assert manager.check() is False
+    assert manager.swap_if_ready() is False
+    assert fuzzy.MASTER_CACHE is previous
+
+    (master_dir / "partial.json").write_text('[{"sigla": "NOVO", "descricao": "Novo"}]', encoding="utf-8")
+    assert manager.check() is True
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import random
+import string
+from pathlib import Path
+
+from worker.src import master_snapshot
+from worker.src.master_snapshot import MappedMaster, compile_snapshot, ensure_snapshot, open_current
+from worker.src.sigla_index import SiglaIndex
+
+
+def _records(count: int) -> dict[str, dict]:
+    rng = random.Random(7)
+    records: dict[str, dict] = {}
+    while len(records) < count:
+        sigla = "".join(rng.choices(string.ascii_uppercase + "ÇÃ", k=rng.randint(2, 9)))
+        records[sigla] = {"sigla": sigla, "descricao": f"Partido {sigla.title()}", "codigo": str(len(records))}
+    return records
+
+
+def test_mapped_snapshot_round_trips_records_and_matches(tmp_path: Path) -> None:
+    records = _records(300)
+    path = compile_snapshot(records, tmp_path / "master.snap")
+    mapped = MappedMaster(path)
+
+    assert len(mapped) == len(records)
+    assert dict(mapped) == records
+    assert "ZZZZZZZZZZ" not in mapped
+    assert mapped.version == master_snapshot.content_version(records)
+
+    reference = SiglaIndex(records)
+    rng = random.Random(11)
+    for _ in range(200):
+        key = rng.choice(list(records))
+        query = "".join(char if rng.random() > 0.2 else rng.choice(string.ascii_uppercase) for char in key)
+        assert mapped.index.best_match(query) == reference.best_match(query)
+
+
+def test_snapshot_is_compiled_once_per_source_change(tmp_path: Path) -> None:
+    source = tmp_path / "master"
+    source.mkdir()
+    (source / "default.json").write_text(json.dumps([{"sigla": "mec", "codigo": "1"}]), encoding="utf-8")
+    target = tmp_path / "master.snap"
+
+    assert open_current(source, target) is None
+    first = ensure_snapshot(source, target)
+    mtime = target.stat().st_mtime_ns
+    second = ensure_snapshot(source, target)
+
+    assert target.stat().st_mtime_ns == mtime, "An up-to-date snapshot must not be recompiled"
+    assert second.version == first.version
+    assert second["MEC"] == {"sigla": "mec", "codigo": "1"}
+    assert open_current(source, target) is not None
+
+    (source / "extra.json").write_text(json.dumps({"sigla": "inep"}), encoding="utf-8")
+    assert open_current(source, target) is None
+    assert "INEP" in ensure_snapshot(source, target)
+
+
+def test_corrupt_snapshot_is_recompiled(tmp_path: Path) -> None:
+    source = tmp_path / "master"
+    source.mkdir()
+    (source / "default.json").write_text(json.dumps([{"sigla": "mec", "codigo": "1"}]), encoding="utf-8")
+    target = tmp_path / "master.snap"
+
+    for damaged in (b"", b"CNEMAST1", b"x" * master_snapshot.HEADER.size):
+        target.write_bytes(damaged)
+        assert open_current(source, target) is None
+        assert ensure_snapshot(source, target)["MEC"] == {"sigla": "mec", "codigo": "1"}
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from pathlib import Path
+
+from api.app.routers.metrics import read_metrics
+from api.app.services import metrics as metrics_module
+from api.app.services.metrics import MetricsPublisher, MetricsService, aggregate
+
+
+def test_concurrent_increments_are_not_lost() -> None:
+    service = MetricsService()
+
+    def _work() -> None:
+        for _ in range(5000):
+            service.increment("hits")
+        service.observe("latency", 0.5)
+
+    threads = [threading.Thread(target=_work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert service.get_counter("hits") == 40000
+    assert service.get_summary("latency") == {"count": 8, "sum": 4.0, "max": 0.5}
+    # Shards of the finished threads were folded into one.
+    assert service._shards == []
+    assert service.snapshot()["hits"] == 40000
+
+
+def test_delta_reports_only_new_counts() -> None:
+    child, parent = MetricsService(), MetricsService()
+    child.increment("rows", 3)
+    child.delta()
+    child.increment("rows", 2)
+    child.observe("latency", 1.5)
+
+    delta = child.delta()
+    assert delta == {"counters": {"rows": 2}, "summaries": {"latency": (1, 1.5, 1.5)}}
+    parent.merge(delta)
+    assert parent.get_counter("rows") == 2
+    assert child.delta() == {"counters": {}, "summaries": {}}
+
+
+def test_aggregate_merges_published_processes(tmp_path: Path) -> None:
+    worker, api = MetricsService(), MetricsService()
+    worker.increment("worker.jobs.completed", 2)
+    worker.increment("shared", 1)
+    worker.set_gauge("worker.queue", 4)
+    api.increment("shared", 10)
+    api.observe("latency", 2.0)
+    worker_publisher = MetricsPublisher("worker", worker, tmp_path)
+    api_publisher = MetricsPublisher("api", api, tmp_path)
+    worker_publisher.publish()
+    api_publisher.publish()
+    api.increment("shared", 100)  # live counts, not the stale file
+
+    view = aggregate(api_publisher)
+
+    assert view["counters"] == {"worker.jobs.completed": 2, "shared": 111}
+    assert view["gauges"] == {"worker.queue": 4}
+    assert view["summaries"] == {"latency": (1, 2.0, 2.0)}
+    assert sorted(process["role"] for process in view["processes"]) == ["api", "worker"]
+
+
+def test_exited_processes_are_folded_into_retired_totals(tmp_path: Path) -> None:
+    worker = MetricsService()
+    worker.increment("worker.jobs.completed", 2)
+    publisher = MetricsPublisher("worker", worker, tmp_path)
+    publisher.publish()
+
+    view = aggregate(directory=tmp_path, retire_after=-1)
+    assert view["counters"] == {"worker.jobs.completed": 2}
+    assert not publisher.path.exists()
+    assert (tmp_path / "retired.json").exists()
+
+    # A stalled process that publishes again only adds what it counted since.
+    worker.increment("worker.jobs.completed", 1)
+    publisher.publish()
+    assert aggregate(directory=tmp_path)["counters"] == {"worker.jobs.completed": 3}
+    assert aggregate(directory=tmp_path, retire_after=-1)["counters"] == {"worker.jobs.completed": 3}
+
+
+def test_metrics_endpoint_includes_worker_counters() -> None:
+    worker = MetricsService()
+    worker.increment("worker.jobs.completed")
+    MetricsPublisher("worker", worker).publish()
+    MetricsService.get_instance().increment("jobs.created", 2)
+    publisher = metrics_module.start_publisher("api")
+
+    response = asyncio.run(read_metrics())
+
+    assert response.counters["worker.jobs.completed"] == 1
+    assert response.counters["jobs.created"] == 2
+    assert {process.role for process in response.processes} == {"api", "worker"}
+    assert publisher is metrics_module.current_publisher()
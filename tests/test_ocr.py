@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from zipfile import ZipFile
+
+import pytest
+
+from worker.src import ocr, ocr_cache
+
+
+def test_zip_members_merge_in_sorted_order(tmp_path: Path) -> None:
+    archive_path = tmp_path / "pages.zip"
+    with ZipFile(archive_path, "w") as archive:
+        for page in (3, 1, 2, 0):
+            archive.writestr(f"page-{page}.txt", f"pagina {page}\r\nlinha unica {page}\n\n")
+
+    # With the cache on, the second run would be served from the first.
+    parallel = list(ocr.run_ocr(archive_path, max_workers=2, use_cache=False))
+    sequential = list(ocr.run_ocr(archive_path, max_workers=1, use_cache=False))
+
+    assert parallel == sequential
+    assert [line.text for line in parallel[::2]] == [f"pagina {page}" for page in range(4)]
+
+
+def test_fake_backend_recognises_pages_concurrently_in_order(tmp_path: Path) -> None:
+    archive_path = tmp_path / "pages.zip"
+    with ZipFile(archive_path, "w") as archive:
+        for page in range(4):
+            archive.writestr(f"page-{page}.png", b"\x89PNG")
+    backend = ocr.FakeOCRBackend(
+        transcripts={f"page-{page}.png": [f"sigla: P{page}"] for page in range(4)},
+        delays={"page-0.png": 0.05},
+    )
+
+    lines = list(ocr.run_ocr(archive_path, backend=backend, max_workers=4))
+
+    assert [line.text for line in lines] == [f"sigla: P{page}" for page in range(4)]
+    assert {line.confidence for line in lines} == {0.9}
+    assert sorted(backend.calls) == [f"page-{page}.png" for page in range(4)]
+
+
+def test_page_timeout_raises(tmp_path: Path) -> None:
+    document = tmp_path / "slow.txt"
+    document.write_text("orgao: AM\n", encoding="utf-8")
+    backend = ocr.FakeOCRBackend(delays={"slow.txt": 0.5})
+
+    with pytest.raises(ocr.OCRTimeoutError):
+        ocr.run_ocr(document, backend=backend, page_timeout=0.01)
+
+
+def _write_pages(path: Path, count: int) -> Path:
+    with ZipFile(path, "w") as archive:
+        for page in range(count):
+            archive.writestr(f"page-{page}.txt", f"pagina {page}\n")
+    return path
+
+
+def test_page_timeout_runs_from_when_the_page_starts(tmp_path: Path) -> None:
+    archive_path = _write_pages(tmp_path / "pages.zip", 2)
+    # Queued behind a slow page, a slow page is not charged for the wait.
+    queued = ocr.FakeOCRBackend(delays={"page-0.txt": 0.3, "page-1.txt": 0.3})
+    lines = ocr.run_ocr(archive_path, backend=queued, max_workers=1, page_timeout=0.5, use_cache=False)
+    assert [line.text for line in lines] == ["pagina 0", "pagina 1"]
+
+    # A hung page behind a slow one times out on its own budget.
+    hung = ocr.FakeOCRBackend(delays={"page-0.txt": 0.45, "page-1.txt": 1.5})
+    started = time.perf_counter()
+    with pytest.raises(ocr.OCRTimeoutError, match="page-1.txt"):
+        ocr.run_ocr(archive_path, backend=hung, max_workers=2, page_timeout=0.5, use_cache=False)
+    assert time.perf_counter() - started < 0.8
+
+
+class _HangingBackend(ocr.OCRBackend):
+    name = "hanging"
+    use_processes = True
+
+    def __init__(self, pid_dir: Path) -> None:
+        self.pid_dir = pid_dir
+
+    def recognize(self, page: ocr.Page) -> list[ocr.OCRLine]:
+        (self.pid_dir / str(os.getpid())).touch()
+        time.sleep(30)
+        return []
+
+
+def test_timed_out_process_workers_are_terminated(tmp_path: Path) -> None:
+    document = tmp_path / "scan.txt"
+    document.write_text("orgao: AM\n", encoding="utf-8")
+
+    with pytest.raises(ocr.OCRTimeoutError):
+        ocr.run_ocr(document, backend=_HangingBackend(tmp_path), page_timeout=1.0, use_cache=False)
+
+    (pid,) = [int(path.name) for path in tmp_path.iterdir() if path.name.isdigit()]
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("the hung OCR worker is still running")
+
+
+def test_archive_directory_is_parsed_once_per_upload(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    archive_path = _write_pages(tmp_path / "pages.zip", 20)
+    opened: list[Path] = []
+
+    class _CountingZipFile(ZipFile):
+        def __init__(self, file, *args, **kwargs) -> None:
+            opened.append(Path(file))
+            super().__init__(file, *args, **kwargs)
+
+    monkeypatch.setattr(ocr, "ZipFile", _CountingZipFile)
+    cache = ocr_cache.OCRCache(tmp_path / "cache")
+    lines = ocr.run_ocr(archive_path, backend=ocr.FakeOCRBackend(), max_workers=1, cache=cache)
+
+    assert len(lines) == 20
+    # One listing for the page order, one archive for every member read.
+    assert opened == [archive_path, archive_path]
+
+
+def test_default_backend_is_configurable(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    document = tmp_path / "scan.tif"
+    document.write_bytes(b"binary")
+    monkeypatch.setattr(ocr, "DEFAULT_BACKEND", "scripted")
+    ocr.register_backend("scripted", lambda: ocr.FakeOCRBackend(transcripts={"scan.tif": ["orgao: AM"]}))
+
+    try:
+        lines = list(ocr.run_ocr(document))
+    finally:
+        ocr.BACKENDS.pop("scripted", None)
+
+    assert [line.text for line in lines] == ["orgao: AM"]
+
+
+def test_reprocessing_is_served_from_cache(tmp_path: Path) -> None:
+    from api.app.services.metrics import MetricsService
+
+    document = tmp_path / "scan.txt"
+    document.write_text("orgao: AM\nlista: Lista Unica\n", encoding="utf-8")
+    first_backend = ocr.FakeOCRBackend()
+    second_backend = ocr.FakeOCRBackend()
+
+    first = list(ocr.run_ocr(document, backend=first_backend))
+    second = list(ocr.run_ocr(document, backend=second_backend))
+
+    assert first == second
+    assert first_backend.calls == ["scan.txt"]
+    assert second_backend.calls == []
+    metrics = MetricsService.get_instance()
+    assert metrics.get_counter("ocr.cache.misses") == 1
+    assert metrics.get_counter("ocr.cache.hits") == 1
+
+
+def test_page_evicted_after_the_probe_is_counted_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from api.app.services.metrics import MetricsService
+
+    document = tmp_path / "scan.txt"
+    document.write_text("orgao: AM\n", encoding="utf-8")
+    cache = ocr_cache.OCRCache(tmp_path / "cache")
+    ocr.run_ocr(document, backend=ocr.FakeOCRBackend(), cache=cache)
+    missing = cache.missing
+
+    def _probe_then_evict(keys):
+        positions = missing(keys)
+        for path in (tmp_path / "cache").glob("*/*.json"):
+            path.unlink()
+        return positions
+
+    monkeypatch.setattr(cache, "missing", _probe_then_evict)
+    backend = ocr.FakeOCRBackend()
+
+    assert [line.text for line in ocr.run_ocr(document, backend=backend, cache=cache)] == ["orgao: AM"]
+    assert backend.calls == ["scan.txt"]
+    metrics = MetricsService.get_instance()
+    assert metrics.get_counter("ocr.cache.misses") == 1
+    assert metrics.get_counter("ocr.cache.hits") == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = ocr_cache.OCRCache(tmp_path / "cache", max_bytes=200)
+    cache.put("aa01", [("x" * 60, 0.9)])
+    cache.put("bb02", [("y" * 60, 0.9)])
+    old = tmp_path / "cache" / "aa" / "aa01.json"
+    os.utime(old, (1, 1))
+
+    cache.put("cc03", [("z" * 60, 0.9)])
+
+    assert cache.get("aa01") is None
+    assert cache.get("bb02") == [("y" * 60, 0.9)]
+    assert cache.get("cc03") == [("z" * 60, 0.9)]
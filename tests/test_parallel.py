@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import pytest
+
+from api.app.services import jobs as jobs_module
+from worker.src import normalize, parallel, validate
+from worker.src.pipeline import process_job
+
+
+def _raw_records(count: int) -> list[dict[str, str]]:
+    rng = random.Random(3)
+    records = []
+    for _ in range(count):
+        sigla = rng.choice(["mec", "Mec ", "inep", "gce", "mex", ""])
+        lista = rng.choice(["Lista Unica", "Coligacao Educação & Cidadania", "lista b", ""])
+        records.append(
+            {
+                "DTMNFR": rng.choice(["2024-03-15", "2024-04-01"]),
+                "ORGAO": rng.choice(["AM", "cm", "Conselho"]),
+                "TIPO": rng.choice(["Titular", "Suplente", "2", ""]),
+                "SIGLA": sigla,
+                "NOME_LISTA": lista,
+                "NOME_CANDIDATO": rng.choice(["Ana  Silva", "Rui", "Eva", ""]),
+                "PARTIDO_PROPONENTE": "",
+                "_raw_lista": lista,
+                "_raw_sigla": sigla,
+            }
+        )
+    return records
+
+
+def test_partitioned_run_matches_sequential_path() -> None:
+    raw_records = _raw_records(600)
+    expected_records = normalize.normalize(raw_records)
+    expected_badges = validate.validate(expected_records, context={"raw_records": raw_records})
+
+    records, badges = parallel.normalize_and_validate(raw_records, workers=2)
+
+    assert records == expected_records
+    assert badges == expected_badges
+
+    _, revalidated = parallel.normalize_and_validate(raw_records, normalized=expected_records, workers=2)
+    assert revalidated == expected_badges
+
+
+def test_pipeline_output_is_identical_in_parallel_mode(
+    pdf_sample: Path, job_factory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    outputs = []
+    for min_rows in (10**9, 1):
+        monkeypatch.setattr(parallel, "MIN_ROWS", min_rows)
+        monkeypatch.setattr(parallel, "WORKERS", 2)
+        job_id = job_factory(pdf_sample)
+        process_job(job_id)
+        job_dir = jobs_module.PROCESSED_DIR / job_id
+        preview = (job_dir / "preview.json").read_text(encoding="utf-8").replace(job_id, "<job>")
+        outputs.append(((job_dir / "output.csv").read_bytes(), preview))
+
+    assert outputs[0] == outputs[1]
+
+
+def _install_counting(*master) -> None:
+    from api.app.services.metrics import MetricsService
+
+    parallel._install_master(*master)
+    normalize_record = normalize.normalize_record
+
+    def _counting(record):
+        MetricsService.get_instance().increment("test.normalized")
+        return normalize_record(record)
+
+    normalize.normalize_record = _counting
+
+
+def test_pool_worker_metrics_reach_the_parent(monkeypatch: pytest.MonkeyPatch) -> None:
+    from api.app.services.metrics import MetricsService
+
+    # Pool workers start from a fresh interpreter, so the counting hook is
+    # installed by their initializer rather than patched in this process.
+    monkeypatch.setattr(parallel, "_install_master", _install_counting)
+    MetricsService.get_instance().increment("test.normalized", 5)  # not re-reported by the workers
+
+    parallel.normalize_and_validate(_raw_records(300), workers=2)
+
+    assert MetricsService.get_instance().get_counter("test.normalized") == 305
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import csv
 import json
+import tracemalloc
 from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 
 import pytest
+from fastapi import BackgroundTasks, HTTPException
 
-from api.app.schemas import ApprovalRequest
+from api.app.schemas import ApprovalRequest, BatchApprovalRequest, JobStatus
 from api.app.services import jobs as jobs_module
-from worker.src.pipeline import process_job
+from api.app.services.events import get_bus
+from benchmarks import synthetic_docs
+import worker.src.pipeline as pipeline_module
+from ml.registry import ModelRegistry
+from worker.src import checkpoints, fuzzy, rules, spill
+from worker.src.pipeline import process_job, reprocess_job, reprocess_jobs
 
 
 def _load_csv(path: Path) -> list[dict[str, str]]:
@@ -105,6 +113,32 @@ def test_ocr_confidence_persisted(
     assert detail.ocr_conf_mean == pytest.approx(conf_from_preview)
 
 
+def test_large_document_is_processed_in_bounded_memory(
+    tmp_path: Path,
+    job_factory,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(spill, "SPILL_ROWS", 500)
+    monkeypatch.setattr(rules, "SPILL_ROWS", 500)
+    monkeypatch.setattr(spill, "MAX_FAN_IN", 4)
+    monkeypatch.setattr(spill, "CHUNK_SIZE", 128)
+    document = tmp_path / "large.zip"
+    stats = synthetic_docs.write_zip(document, 40000, seed=3, page_lines=2000)
+    job_id = job_factory(document)
+
+    tracemalloc.start()
+    try:
+        process_job(job_id)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    preview = json.loads((jobs_module.PROCESSED_DIR / job_id / "preview.json").read_bytes())
+    assert preview["total_rows"] == len(preview["rows"]) == stats.records > 10 * 500
+    # Holding the document's rows, as the pipeline used to, takes over 40 MB.
+    assert peak < 20 * 1024 * 1024
+
+
 def test_approval_promotes_artifacts(
     job_factory,
     job_service: jobs_module.JobService,
@@ -148,16 +182,15 @@ def test_approval_promotes_artifacts(
     assert meta["versions"]["model"]["version"], "Model version should be recorded"
     assert meta["versions"]["master_data"] == job_service._master_data_version()  # type: ignore[attr-defined]
 
-    registry_file = isolated_data_dirs.state / "model_registry.json"
-    assert registry_file.exists()
-    history = json.loads(registry_file.read_text(encoding="utf-8"))
-    assert history, "Model registry should contain at least one candidate entry"
-    latest = history[-1]
-    assert latest["model_name"] == f"dataset-{job_id}"
-    assert latest["status"] == "candidate"
-    assert latest["metrics"]["rows"] == len(golden_rows)
-    assert latest["metrics"]["sample_orgao"] == golden_rows[0]["ORGAO"]
-    assert latest["metrics"]["sample_tipo"] == golden_rows[0]["TIPO"]
+    assert (isolated_data_dirs.state / "model_registry.sqlite3").exists()
+    history = ModelRegistry().history()
+    assert history.items, "Model registry should contain at least one candidate entry"
+    latest = history.items[0]
+    assert latest.model_name == f"dataset-{job_id}"
+    assert latest.status == "candidate"
+    assert latest.metrics["rows"] == len(golden_rows)
+    assert latest.metrics["sample_orgao"] == golden_rows[0]["ORGAO"]
+    assert latest.metrics["sample_tipo"] == golden_rows[0]["TIPO"]
 
 
 def test_approval_emits_event(
@@ -177,8 +210,178 @@ def test_approval_emits_event(
     process_job(job_id)
     approval_request = ApprovalRequest(approver="listener", notes=None)
     job_service.approve(job_id, approver=approval_request.approver, notes=approval_request.notes)
+    assert get_bus().flush()
 
     assert events, "result.approved event should be emitted"
     payload = events[0]
     assert payload["meta"]["job"]["job_id"] == job_id
     assert Path(payload["path"]).exists()
+
+
+def test_batch_approval_writes_state_and_registry_once(
+    job_factory,
+    pdf_sample: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from api.app.routers import approval
+
+    job_ids = [job_factory(pdf_sample) for _ in range(3)]
+    for job_id in job_ids:
+        process_job(job_id)
+    service = jobs_module.JobService()
+    monkeypatch.setattr(approval, "service", service)
+    status_batches: list[list[dict]] = []
+    jobs_module.subscribe("job.status", status_batches.append, batch=True)
+
+    state_writes: list[Path] = []
+    original_write = jobs_module.codec.write
+    monkeypatch.setattr(
+        jobs_module.codec, "write", lambda path, value: state_writes.append(path) or original_write(path, value)
+    )
+    registrations: list[int] = []
+    original_register = ModelRegistry.register_many
+    monkeypatch.setattr(
+        ModelRegistry,
+        "register_many",
+        lambda self, entries, status="candidate": registrations.append(len(entries))
+        or original_register(self, entries, status),
+    )
+    hashes: list[str] = []
+    original_version = jobs_module.JobService._master_data_version
+    monkeypatch.setattr(
+        jobs_module.JobService, "_master_data_version", lambda self: hashes.append("x") or original_version(self)
+    )
+
+    tasks = BackgroundTasks()
+    request = BatchApprovalRequest(job_ids=job_ids + job_ids[:1], approver="batch", notes="ok")
+    response = asyncio.run(approval.approve_jobs(request, tasks))
+
+    assert [item.job_id for item in response.approved] == job_ids
+    assert state_writes == [jobs_module.STATE_FILE]
+    assert not list(jobs_module.APPROVED_DIR.glob("*/*/meta.json")), "materialization runs after the response"
+    assert get_bus().flush()
+    statuses = [payload for batch in status_batches for payload in batch]
+    assert [payload["job_id"] for payload in statuses] == job_ids
+    assert {payload["status"] for payload in statuses} == {JobStatus.APPROVED.value}
+
+    asyncio.run(tasks())
+
+    assert registrations == [3]
+    assert len(hashes) == 1
+    versions = [item.version for item in ModelRegistry().history().items]
+    assert sorted(versions) == ["001", "002", "003"]
+    for job_id in job_ids:
+        assert jobs_module.JobService().get(job_id).status == JobStatus.APPROVED
+        (meta_path,) = jobs_module.APPROVED_DIR.glob(f"*/{job_id}/meta.json")
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        assert meta["job"]["metadata"]["approved_by"] == "batch"
+        assert meta["versions"]["model"]["name"] == f"dataset-{job_id}"
+
+
+def test_batch_approval_rejects_unknown_jobs(job_factory, pdf_sample: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from api.app.routers import approval
+
+    job_id = job_factory(pdf_sample)
+    service = jobs_module.JobService()
+    monkeypatch.setattr(approval, "service", service)
+    request = BatchApprovalRequest(job_ids=[job_id, "missing"], approver="batch")
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(approval.approve_jobs(request, BackgroundTasks()))
+
+    assert excinfo.value.status_code == 404
+    assert "missing" in excinfo.value.detail
+    assert service.get(job_id).status == JobStatus.RECEIVED
+
+
+def _fail_ocr(*args, **kwargs):
+    raise AssertionError("OCR should not run when its checkpoint is current")
+
+
+def test_reprocess_skips_up_to_date_jobs(pdf_sample: Path, job_factory, monkeypatch: pytest.MonkeyPatch) -> None:
+    job_id = job_factory(pdf_sample)
+    process_job(job_id)
+    monkeypatch.setattr(pipeline_module.ocr, "run_ocr", _fail_ocr)
+
+    assert reprocess_job(job_id) is None
+
+
+def test_reprocess_resumes_after_master_data_change(
+    pdf_sample: Path,
+    job_factory,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    job_id = job_factory(pdf_sample)
+    process_job(job_id)
+    monkeypatch.setattr(pipeline_module.ocr, "run_ocr", _fail_ocr)
+    updated_cache = {
+        **fuzzy.MASTER_CACHE,
+        "MEC": {"sigla": "MEC", "descricao": "Ministério da Educação (atualizado)", "codigo": "001"},
+    }
+    monkeypatch.setattr(fuzzy, "MASTER_CACHE", updated_cache)
+
+    assert reprocess_job(job_id) == "normalize"
+
+    rows = _load_csv(jobs_module.PROCESSED_DIR / job_id / "output.csv")
+    assert rows[0]["PARTIDO_PROPONENTE"] == "Ministério da Educação (atualizado)"
+    detail = jobs_module.JobService().get(job_id)
+    assert detail.status == jobs_module.JobStatus.COMPLETED
+    assert detail.metadata["reprocessed_from"] == "normalize"
+
+
+def test_reprocess_resumes_from_changed_stage_and_keeps_approval(
+    pdf_sample: Path,
+    job_factory,
+    job_service: jobs_module.JobService,
+    golden_rows,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    job_id = job_factory(pdf_sample)
+    process_job(job_id)
+    job_service.approve(job_id, approver="admin")
+    monkeypatch.setattr(pipeline_module.ocr, "run_ocr", _fail_ocr)
+    monkeypatch.setitem(checkpoints.STAGE_VERSIONS, "segment", "test-bump")
+
+    results = reprocess_jobs()
+
+    assert results == {job_id: "segment"}
+    assert _load_csv(jobs_module.PROCESSED_DIR / job_id / "output.csv") == golden_rows
+    assert jobs_module.JobService().get(job_id).status == jobs_module.JobStatus.APPROVED
+
+
+def test_reprocess_withdraws_approval_when_output_changes(
+    pdf_sample: Path,
+    job_factory,
+    job_service: jobs_module.JobService,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    job_id = job_factory(pdf_sample)
+    process_job(job_id)
+    job_service.approve(job_id, approver="admin")
+    statuses: list[dict] = []
+    jobs_module.subscribe("job.status", statuses.append)
+    monkeypatch.setattr(pipeline_module.ocr, "run_ocr", _fail_ocr)
+    updated_cache = {
+        **fuzzy.MASTER_CACHE,
+        "MEC": {"sigla": "MEC", "descricao": "Ministério da Educação (atualizado)", "codigo": "001"},
+    }
+    monkeypatch.setattr(fuzzy, "MASTER_CACHE", updated_cache)
+
+    assert reprocess_job(job_id) == "normalize"
+
+    detail = jobs_module.JobService().get(job_id)
+    assert detail.status == jobs_module.JobStatus.COMPLETED
+    assert detail.approved_at is None
+    assert detail.metadata["approval_withdrawn_at"] == detail.metadata["reprocessed_at"]
+    assert get_bus().flush()
+    assert statuses[-1]["status"] == jobs_module.JobStatus.COMPLETED.value
+
+
+def test_enqueue_appends_queue_entry(job_service: jobs_module.JobService) -> None:
+    job = job_service.create(jobs_module.JobCreate(filename="upload.txt", uploader="pytest"))
+    job_service.enqueue(job)
+
+    lines = jobs_module.QUEUE_FILE.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["job_id"] for line in lines] == [job.job_id]
+    assert json.loads(lines[0])["received_at"] == job.created_at.isoformat()
+    assert job_service.get(job.job_id).status == jobs_module.JobStatus.QUEUED
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from ml.registry import ModelRegistry
+
+
+def _register_many(path: Path, count: int) -> list[str]:
+    registry = ModelRegistry(path, legacy_file=path.with_suffix(".json"))
+    return [registry.register("concurrent", {"index": index}).version for index in range(count)]
+
+
+@pytest.fixture
+def registry(tmp_path: Path) -> ModelRegistry:
+    return ModelRegistry(tmp_path / "registry.sqlite3", legacy_file=tmp_path / "registry.json")
+
+
+def test_concurrent_registrations_get_unique_versions(registry: ModelRegistry) -> None:
+    registry.register("seed", {})
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        versions = [version for chunk in pool.map(_register_many, [registry.path] * 4, [10] * 4) for version in chunk]
+
+    assert len(set(versions)) == 40
+    assert registry.count() == 41
+    assert sorted(versions) == [f"{seq:03d}" for seq in range(2, 42)]
+
+
+def test_history_pages_newest_first(registry: ModelRegistry) -> None:
+    for index in range(5):
+        registry.register(f"model-{index}", {"index": index})
+
+    first = registry.history(limit=2)
+    assert [item.version for item in first.items] == ["005", "004"]
+    assert first.next_cursor == "004"
+    assert first.total == 5
+
+    second = registry.history(limit=2, before=first.next_cursor)
+    assert [item.version for item in second.items] == ["003", "002"]
+    last = registry.history(limit=2, before=second.next_cursor)
+    assert [item.version for item in last.items] == ["001"]
+    assert last.next_cursor is None
+
+    with pytest.raises(KeyError):
+        registry.history(before="999")
+
+
+def test_status_filter_and_promotion(registry: ModelRegistry) -> None:
+    for index in range(3):
+        registry.register(f"dataset-job-{index}", {})
+    registry.promote("002")
+
+    assert [record.version for record in registry.with_status("production")] == ["002"]
+    assert [record.version for record in registry.with_status("archived")] == ["003", "001"]
+    assert registry.history(status="archived").total == 2
+
+    registry.rollback("001")
+    assert registry.get("001").status == "production"
+    assert registry.get("002").status == "archived"
+
+    registry.update_metrics("001", {"score": 0.9})
+    assert registry.get("001").metrics == {"score": 0.9}
+    with pytest.raises(KeyError):
+        registry.get("404")
+
+
+def test_promotion_only_archives_the_same_family(registry: ModelRegistry) -> None:
+    corrector = registry.register("sigla-corrector", {})
+    registry.promote(corrector.version)
+    dataset = registry.register("dataset-job-1", {})
+    older = registry.register("dataset-job-0", {})
+
+    registry.promote(dataset.version)
+    assert registry.get(corrector.version).status == "production"
+    assert registry.get(older.version).status == "archived"
+
+    registry.rollback(older.version)
+    assert registry.get(dataset.version).status == "archived"
+    assert registry.get(corrector.version).status == "production"
+
+
+def test_revision_changes_on_write(registry: ModelRegistry) -> None:
+    start = registry.revision()
+    registry.register("model", {})
+    after_register = registry.revision()
+    assert after_register > start
+
+    registry.history()
+    assert registry.revision() == after_register
+    registry.promote("001")
+    assert registry.revision() > after_register
+
+
+def test_register_many_is_one_write(registry: ModelRegistry) -> None:
+    registry.register("first", {})
+    start = registry.revision()
+
+    records = registry.register_many([("a", {"rows": 1}), ("b", {"rows": 2})])
+
+    assert [(record.model_name, record.version) for record in records] == [("a", "002"), ("b", "003")]
+    assert registry.revision() == start + 1
+    assert registry.get("003").metrics == {"rows": 2}
+    assert registry.register_many([]) == []
+
+
+def test_legacy_history_is_imported_once(tmp_path: Path) -> None:
+    legacy = tmp_path / "registry.json"
+    entry = {"created_at": "2024-01-01T00:00:00", "status": "candidate", "metrics": {}}
+    legacy.write_text(
+        json.dumps(
+            [
+                {**entry, "model_name": "a", "version": "001"},
+                {**entry, "model_name": "b", "version": "002"},
+                {**entry, "model_name": "c", "version": "002"},
+            ]
+        ),
+        encoding="utf-8",
+    )
+    registry = ModelRegistry(tmp_path / "registry.sqlite3", legacy_file=legacy)
+
+    assert [(record.model_name, record.version) for record in registry.page()[0]] == [
+        ("c", "003"),
+        ("b", "002"),
+        ("a", "001"),
+    ]
+    assert registry.register("d", {}).version == "004"
+
+    legacy.write_text("[]", encoding="utf-8")
+    assert ModelRegistry(registry.path, legacy_file=legacy).count() == 4
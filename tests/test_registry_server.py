@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import threading
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from ml.registry import ModelRegistry
+from ml.registry_server import BlobStore, RegistryPublisher, make_server, parse_range
+
+
+@pytest.fixture
+def registry(tmp_path: Path) -> ModelRegistry:
+    return ModelRegistry(tmp_path / "registry.sqlite3", legacy_file=tmp_path / "registry.json")
+
+
+@pytest.fixture
+def publisher(tmp_path: Path, registry: ModelRegistry) -> RegistryPublisher:
+    return RegistryPublisher(BlobStore(tmp_path / "blobs"), registry, tmp_path / "approved", poll_interval=0)
+
+
+@pytest.fixture
+def client(publisher: RegistryPublisher) -> Iterator[http.client.HTTPConnection]:
+    server = make_server("127.0.0.1", 0, publisher)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        yield connection
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+
+
+def _get(client: http.client.HTTPConnection, path: str, **headers: str) -> http.client.HTTPResponse:
+    client.request("GET", path, headers=headers)
+    response = client.getresponse()
+    response.body = response.read()  # type: ignore[attr-defined]
+    return response
+
+
+def _approve(root: Path, job_id: str, csv: bytes, meta: bool = True) -> None:
+    directory = root / "2024-01-01" / job_id
+    directory.mkdir(parents=True)
+    (directory / "output.csv").write_bytes(csv)
+    if meta:
+        (directory / "meta.json").write_text("{}", encoding="utf-8")
+
+
+def test_index_is_revalidated_with_etag(client, registry: ModelRegistry) -> None:
+    registry.register("baseline", {"rows": 3})
+    first = _get(client, "/index")
+    assert first.status == 200
+    assert first.getheader("Cache-Control") == "no-cache"
+    etag = first.getheader("ETag")
+    assert etag == f'"{hashlib.sha256(first.body).hexdigest()}"'
+    index = json.loads(first.body)
+    assert [model[:3] for model in index["models"]] == [["001", "baseline", "candidate"]]
+
+    assert _get(client, "/index", **{"If-None-Match": etag}).status == 304
+
+    registry.promote("001")
+    changed = _get(client, "/index", **{"If-None-Match": etag})
+    assert changed.status == 200
+    assert json.loads(changed.body)["models"][0][2] == "production"
+
+    snapshot = _get(client, f"/blobs/{etag.strip(chr(34))}")
+    assert snapshot.body == first.body
+    assert "immutable" in snapshot.getheader("Cache-Control")
+
+
+def test_artifacts_are_content_addressed(client, registry: ModelRegistry, publisher: RegistryPublisher) -> None:
+    content = b"SIGLA;NOME\nMEC;Ana\n"
+    _approve(publisher.approved_dir, "job-1", content)
+    registry.register("dataset-job-1", {"job_id": "job-1"})
+
+    model = json.loads(_get(client, "/index").body)["models"][0]
+    artifact = model[4]["output.csv"]
+    assert artifact == {"digest": hashlib.sha256(content).hexdigest(), "size": len(content)}
+    record = json.loads(_get(client, f"/blobs/{model[3]}").body)
+    assert record["metrics"] == {"job_id": "job-1"}
+
+    path = f"/blobs/{artifact['digest']}"
+    full = _get(client, path)
+    assert full.body == content
+    assert full.getheader("Accept-Ranges") == "bytes"
+
+    partial = _get(client, path, Range="bytes=6-9")
+    assert partial.status == 206
+    assert partial.body == content[6:10]
+    assert partial.getheader("Content-Range") == f"bytes 6-9/{len(content)}"
+    assert _get(client, path, Range="bytes=-4").body == content[-4:]
+    assert _get(client, path, Range="bytes=100-").status == 416
+    assert _get(client, path, Range="bytes=0-3", **{"If-Range": '"other"'}).status == 200
+    assert _get(client, path, **{"If-None-Match": f'"{artifact["digest"]}"'}).status == 304
+
+
+def test_pending_approval_is_republished(client, registry: ModelRegistry, publisher: RegistryPublisher) -> None:
+    _approve(publisher.approved_dir, "job-2", b"SIGLA\nMEC\n", meta=False)
+    registry.register("dataset-job-2", {"job_id": "job-2"})
+    assert list(json.loads(_get(client, "/index").body)["models"][0][4]) == ["output.csv"]
+
+    (publisher.approved_dir / "2024-01-01" / "job-2" / "meta.json").write_text("{}", encoding="utf-8")
+    assert list(json.loads(_get(client, "/index").body)["models"][0][4]) == ["meta.json", "output.csv"]
+
+
+def test_only_index_and_blobs_are_served(client) -> None:
+    assert _get(client, "/jobs.json").status == 404
+    assert _get(client, "/blobs/../registry.sqlite3").status == 404
+    assert _get(client, "/blobs/" + "0" * 64).status == 404
+
+
+def test_parse_range() -> None:
+    assert parse_range("bytes=0-", 10) == (0, 9)
+    assert parse_range("bytes=2-50", 10) == (2, 9)
+    assert parse_range("bytes=-3", 10) == (7, 9)
+    assert parse_range("bytes=0-1,4-5", 10) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=10-", 10)
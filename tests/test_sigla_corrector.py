@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+
+from ml import promotion, training
+from ml.corrector import align, fit_corrector
+from ml.registry import ModelRegistry
+from worker.src import fuzzy, normalize
+from worker.src.checkpoints import CheckpointStore
+from worker.src.sigla_corrector import CorrectorLoader, SiglaCorrector
+from worker.src.sigla_index import SiglaIndex
+
+
+def test_align_lists_character_edits() -> None:
+    assert align("P5B", "PSB") == [("5", "S")]
+    assert align("PS-B", "PSB") == [("-", "")]
+    assert align("MC", "MEC") == [("", "E")]
+    assert align("MEC", "MEC") == []
+
+
+def test_fit_remembers_corrections_and_discounts_frequent_edits() -> None:
+    pairs = [("P5B", "PSB")] * 3 + [("PSB", "PSB"), ("5DB", "SDB")]
+    corrector, stats = fit_corrector(pairs)
+
+    assert stats == {"pairs": 5, "corrections": 2, "edits": 1}
+    assert corrector.memory == {"P5B": "PSB"}  # 5DB -> SDB was seen once
+    assert corrector.cost("5", "S") < 1.0
+    assert corrector.cost("X", "Y") == 1.0
+
+    disputed, _ = fit_corrector([("P5B", "PSB")] * 2 + [("P5B", "PDB")] * 2)
+    assert disputed.memory == {}
+
+    restored = SiglaCorrector.from_payload(json.loads(json.dumps(corrector.to_payload())))
+    assert restored.memory == corrector.memory
+    assert restored.costs == corrector.costs
+
+
+def test_learned_costs_recover_matches_difflib_misses() -> None:
+    master = {"PSB": {}, "PDB": {}}
+    index = SiglaIndex(master)
+    corrector = SiglaCorrector({}, {("5", "S"): 0.1})
+
+    assert index.best_match("P5B") is None
+    assert corrector.correct("P5B", master) == "PSB"
+    assert corrector.correct("QQQ", master) is None
+    assert SiglaCorrector({"P5B": "GONE"}, {}).correct("P5B", master) is None
+    assert SiglaCorrector({}, {("5", "S"): 0.1, ("5", "D"): 0.1}).correct("P5B", master) is None
+
+
+def test_normalize_resolves_siglas_in_batches(monkeypatch) -> None:
+    calls: list[list[str]] = []
+    original = SiglaCorrector.correct_many
+
+    def _counting(self, raws, master):
+        raws = list(raws)
+        calls.append(raws)
+        return original(self, raws, master)
+
+    monkeypatch.setattr(SiglaCorrector, "correct_many", _counting)
+    fuzzy.install_corrector(SiglaCorrector({"M3C": "MEC"}, {}))
+    records = [
+        {"DTMNFR": "2024-01-01", "ORGAO": "AM", "TIPO": "Titular", "NOME_LISTA": "Lista", "SIGLA": sigla}
+        for sigla in ("m3c", "M3C", "MEC", "inepp")
+    ]
+
+    normalized = normalize.normalize(records)
+
+    assert [record["SIGLA"] for record in normalized] == ["MEC", "MEC", "MEC", "INEP"]
+    assert calls == [["M3C", "INEPP"]]
+    assert fuzzy.resolve_sigla("m3c").ratio < 1.0
+
+
+def test_trained_corrector_is_registered_and_loaded(isolated_data_dirs) -> None:
+    job_dir = isolated_data_dirs.processed / "job-1"
+    raw = ["M3C", "M3C", "MEC", "1NEP", "GCE"]
+    approved = ["MEC", "MEC", "MEC", "INEP", "GCE"]
+    CheckpointStore(job_dir).write("extract", [{"SIGLA": sigla, "_raw_sigla": sigla} for sigla in raw])
+    (job_dir / "output.csv").write_text("SIGLA\n" + "\n".join(approved) + "\n", encoding="utf-8")
+    (isolated_data_dirs.state / "jobs.json").write_text(json.dumps({"job-1": {"status": "approved"}}))
+    master_dir = isolated_data_dirs.state.parent / "master"
+    (master_dir / "siglas.json").write_text(
+        json.dumps([{"sigla": sigla, "descricao": sigla} for sigla in ("MEC", "INEP", "GCE")]), encoding="utf-8"
+    )
+
+    record = training.train()
+
+    assert record.model_name == "sigla-corrector"
+    assert record.metrics["rows"] == 5
+    assert record.metrics["pairs"] == 5
+    assert record.metrics["corrections"] == 2
+    assert (training.MODELS_DIR / record.metrics["artifact"].rsplit("/", 1)[-1]).exists()
+    assert record.status == "candidate"
+
+    loader = CorrectorLoader()
+    assert not loader.refresh(), "an unreviewed candidate must not go live"
+    assert fuzzy.CORRECTOR is None
+
+    ModelRegistry().promote(record.version)
+    assert ModelRegistry().production("sigla-corrector") == ModelRegistry().get(record.version)
+    assert loader.refresh()
+    assert fuzzy.CORRECTOR is not None and fuzzy.CORRECTOR.memory == {"M3C": "MEC"}
+    assert fuzzy.resolution_version() != fuzzy.master_version()
+    assert not loader.refresh()
+
+    dataset = ModelRegistry().register("dataset-job-1", {})
+    promotion.evaluate_and_promote(dataset.version)
+    assert ModelRegistry().get(dataset.version).status == "production"
+    assert not loader.refresh(), "promoting a dataset must leave the corrector in production"
+    assert fuzzy.CORRECTOR is not None
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+
+from api.app.services import columnar
+from api.app.services import master_data
+from ml import training
+from ml.synthetic import generate_synthetic_dataset, write_synthetic_dataset
+
+
+def _approved_corpus(isolated_data_dirs, jobs: dict[str, list[str]]) -> None:
+    for job_id, names in jobs.items():
+        directory = isolated_data_dirs.processed / job_id
+        directory.mkdir(parents=True)
+        lines = ["SIGLA;NOME_CANDIDATO;PARTIDO_PROPONENTE;INDEPENDENTE"]
+        lines += [f"MEC;{name};Ministério da Educação;" for name in names]
+        (directory / "output.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    training.JOBS_FILE.write_text(json.dumps({job_id: {"status": "approved"} for job_id in jobs}))
+    master = [
+        {"sigla": "MEC", "descricao": "Ministério da Educação", "codigo": "001"},
+        {"sigla": "INEP", "descricao": "Instituto Nacional de Estudos e Pesquisas Educacionais", "codigo": "002"},
+    ]
+    (master_data.DATA_DIR / "default.json").write_text(json.dumps(master), encoding="utf-8")
+
+
+def _csv_rows(directory: Path) -> list[dict[str, str]]:
+    rows: list[dict[str, str]] = []
+    for path in sorted(directory.glob("shard-*.csv")):
+        with path.open(encoding="utf-8", newline="") as handle:
+            rows.extend(csv.DictReader(handle, delimiter=";"))
+    return rows
+
+
+def test_sharded_output_is_reproducible_across_worker_counts(tmp_path: Path, isolated_data_dirs) -> None:
+    _approved_corpus(isolated_data_dirs, {"a": [f"Ana {index}" for index in range(7)], "b": ["Rui", "Rita"]})
+
+    serial = write_synthetic_dataset(tmp_path / "serial", multiplier=3, seed=5, shard_rows=4)
+    parallel = write_synthetic_dataset(tmp_path / "parallel", multiplier=3, seed=5, shard_rows=4, workers=2)
+
+    assert serial == parallel
+    assert serial["rows"] == 27 and len(serial["shards"]) == 7
+    for shard in serial["shards"]:
+        assert (tmp_path / "serial" / shard["file"]).read_bytes() == (tmp_path / "parallel" / shard["file"]).read_bytes()
+
+    rows = _csv_rows(tmp_path / "serial")
+    names = [f"Ana {index}" for index in range(7)] + ["Rui", "Rita"]
+    assert [row["NOME_CANDIDATO"] for row in rows] == [f"{name} (synthetic)" for name in names] * 3
+    assert {row["SIGLA"] for row in rows} <= {"MEC", "INEP"}
+    assert all(row["INDEPENDENTE"] == "N" for row in rows)
+    other_seed = write_synthetic_dataset(tmp_path / "other", multiplier=3, seed=6, shard_rows=4)
+    assert [row["SIGLA"] for row in _csv_rows(tmp_path / "other")] != [row["SIGLA"] for row in rows]
+
+
+def test_columnar_shards_match_csv_shards(tmp_path: Path, isolated_data_dirs) -> None:
+    _approved_corpus(isolated_data_dirs, {"a": ["Ana", "Beatriz", "Carlos"]})
+
+    write_synthetic_dataset(tmp_path / "csv", multiplier=2, seed=1, shard_rows=4)
+    (tmp_path / "csv" / "shard-00009.csv").write_text("stale", encoding="utf-8")
+    write_synthetic_dataset(tmp_path / "csv", multiplier=2, seed=1, shard_rows=4)
+    manifest = write_synthetic_dataset(tmp_path / "cols", multiplier=2, seed=1, shard_rows=4, fmt="columnar")
+
+    assert sorted(path.name for path in (tmp_path / "csv").glob("shard-*")) == ["shard-00000.csv", "shard-00001.csv"]
+    columnar_rows = [
+        row
+        for shard in manifest["shards"]
+        for row in columnar.ColumnarReader(tmp_path / "cols" / shard["file"]).iter_rows()
+    ]
+    assert columnar_rows == _csv_rows(tmp_path / "csv")
+    assert len(generate_synthetic_dataset(multiplier=2)) == 6
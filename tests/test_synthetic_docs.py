@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from pathlib import Path
+from zipfile import ZipFile
+
+from benchmarks import synthetic_docs
+from worker.src import extract, layout, normalize, ocr, segment
+
+
+def _extract(path: Path) -> list[dict[str, str]]:
+    lines = [line.text for line in ocr.run_ocr(path, backend=ocr.get_backend("text"), use_cache=False)]
+    return extract.extract_records(segment.segment_lines(layout.detect_layout(lines)))
+
+
+def test_generator_is_deterministic_and_matches_extraction(tmp_path: Path) -> None:
+    first = synthetic_docs.write_text(tmp_path / "a.txt", 3000, seed=11)
+    second = synthetic_docs.write_text(tmp_path / "b.txt", 3000, seed=11)
+
+    assert (tmp_path / "a.txt").read_bytes() == (tmp_path / "b.txt").read_bytes()
+    assert first == second
+    assert first.lines >= 3000
+    records = _extract(tmp_path / "a.txt")
+    assert len(records) == first.records
+    assert any(" " in record["NOME_CANDIDATO"] for record in records)
+    assert {record["DTMNFR"] for record in records} == {records[0]["DTMNFR"]}
+
+
+def test_zip_pages_split_at_block_boundaries(tmp_path: Path) -> None:
+    text_stats = synthetic_docs.write_text(tmp_path / "doc.txt", 3000, seed=5)
+    zip_stats = synthetic_docs.write_zip(tmp_path / "doc.zip", 3000, seed=5, page_lines=500)
+
+    with ZipFile(tmp_path / "doc.zip") as archive:
+        members = archive.namelist()
+        joined = "".join(archive.read(name).decode("utf-8") for name in members)
+    assert len(members) == zip_stats.pages > 1
+    assert joined == (tmp_path / "doc.txt").read_text(encoding="utf-8")
+    assert zip_stats.records == text_stats.records
+    assert normalize.normalize(_extract(tmp_path / "doc.zip")) == normalize.normalize(_extract(tmp_path / "doc.txt"))
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from worker.src import validate
+import pytest
+
+from api.app.services.metrics import MetricsService
+from worker.src import rules, validate
 
 
 def _badge_map(badges):
@@ -133,3 +136,80 @@ def test_validate_warns_fuzzy_sigla():
 
     assert sigla_badge.status == "AVISO"
     assert "ajustada" in (sigla_badge.message or "")
+
+
+def test_repeated_candidate_is_not_flagged():
+    base = {
+        "DTMNFR": "2024-01-01",
+        "ORGAO": "AM",
+        "TIPO": "2",
+        "SIGLA": "MEC",
+        "NOME_LISTA": "Lista Única",
+    }
+    records = [
+        {**base, "NUM_ORDEM": "1", "NOME_CANDIDATO": "Ana Souza"},
+        {**base, "NUM_ORDEM": "2", "NOME_CANDIDATO": "Bruno Lima"},
+        {**base, "NUM_ORDEM": "3", "NOME_CANDIDATO": "Ana Souza"},
+    ]
+
+    results = validate.validate(records)
+
+    # The rule plan keeps the badges of the hand-written checks it replaced.
+    assert all("NOME_CANDIDATO" not in _badge_map(badges) for badges in results)
+
+
+def test_compiled_plan_evaluates_each_distinct_value_once():
+    calls: list[str] = []
+
+    def _check(value: str):
+        calls.append(value)
+        return (("DTMNFR", "OK" if value else "ERRO", None),)
+
+    plan = rules.compile_rules(
+        [rules.ColumnRule(name="dtmnfr", columns=("DTMNFR",), check=_check)],
+        validate.SOURCES,
+        batch_size=2,
+    )
+    records = [{"DTMNFR": value} for value in ("2024-01-01", "", "2024-01-01", "2024-01-01", "")]
+
+    results = plan.run(records)
+
+    assert sorted(calls) == ["", "2024-01-01"]
+    assert [states["DTMNFR"][0] for states in results] == ["OK", "ERRO", "OK", "OK", "ERRO"]
+
+
+def test_compile_rules_rejects_unknown_sources():
+    rule = rules.ColumnRule(name="unknown", columns=("NOPE",), check=lambda value: ())
+
+    with pytest.raises(KeyError):
+        rules.compile_rules([rule], validate.SOURCES)
+
+
+def test_iter_validate_spills_and_matches_in_memory_validation(isolated_data_dirs, monkeypatch):
+    import random
+
+    from worker.src import spill
+
+    monkeypatch.setattr(spill, "MAX_FAN_IN", 3)
+    rng = random.Random(5)
+    records = [
+        {
+            "DTMNFR": rng.choice(["2024-01-01", "2024-13-01", ""]),
+            "ORGAO": rng.choice(["AM", "CM", "XX"]),
+            "TIPO": rng.choice(["2", "3", ""]),
+            "SIGLA": rng.choice(["MEC", "INEP", "MEX", ""]),
+            "NOME_LISTA": rng.choice(["Lista A", "lista a", "Lista B", ""]),
+            "NUM_ORDEM": rng.choice(["1", "2", "3", "x", ""]),
+            "NOME_CANDIDATO": rng.choice(["Ana", "Rui", "Eva", ""]),
+        }
+        for _ in range(500)
+    ]
+    raw_records = [{"_raw_sigla": record["SIGLA"].lower()} for record in records[:450]]
+    context = {"raw_records": raw_records}
+
+    expected = validate.validate(records, context=context)
+    streamed = list(validate.iter_validate(iter(records), context=context, max_rows=16))
+
+    assert [[badge.dict() for badge in row] for row in streamed] == [[badge.dict() for badge in row] for row in expected]
+    assert MetricsService.get_instance().get_counter("worker.spill.runs") > 0
+    assert not any((isolated_data_dirs.cache / "spill").iterdir()), "Spill files must be removed"
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useState } from 'react';
 
 import useJobs from '../hooks/useJobs';
 import axios from '../api';
@@ -11,18 +11,32 @@ interface ModelMetadata {
   metrics: Record<string, unknown>;
 }
 
+interface ModelHistoryPage {
+  items: ModelMetadata[];
+  next_cursor: string | null;
+  total: number;
+}
+
 const HistoryPage = () => {
   const { jobs, refresh } = useJobs();
   const [models, setModels] = useState<ModelMetadata[]>([]);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [total, setTotal] = useState(0);
+
+  // The registry returns the newest versions first, a page at a time.
+  const loadModels = useCallback(async (before: string | null) => {
+    const response = await axios.get<ModelHistoryPage>('/models/history', {
+      params: before ? { before } : undefined,
+    });
+    setModels((current) => (before ? [...current, ...response.data.items] : response.data.items));
+    setCursor(response.data.next_cursor);
+    setTotal(response.data.total);
+  }, []);
 
   useEffect(() => {
     refresh();
-    const loadModels = async () => {
-      const response = await axios.get<{ items: ModelMetadata[] }>('/models/history');
-      setModels(response.data.items);
-    };
-    loadModels();
-  }, [refresh]);
+    loadModels(null);
+  }, [refresh, loadModels]);
 
   return (
     <div className="history-page">
@@ -40,6 +54,9 @@ const HistoryPage = () => {
       </div>
       <div className="card">
         <h2>Histórico de modelos</h2>
+        <p>
+          {models.length} de {total} versões, mais recentes primeiro
+        </p>
         <ul>
           {models.map((model) => (
             <li key={model.version}>
@@ -48,6 +65,7 @@ const HistoryPage = () => {
             </li>
           ))}
         </ul>
+        {cursor && <button onClick={() => loadModels(cursor)}>Carregar mais</button>}
       </div>
     </div>
   );
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping
+
+from api.app.schemas import PipelineStage
+from api.app.services import codec
+
+FORMAT_VERSION = 1
+STAGES = tuple(stage.value for stage in PipelineStage)
+STAGE_VERSIONS = {
+    "ocr": "1",
+    "segment": "3",
+    "extract": "1",
+    "normalize": "1",
+    "validate": "1",
+}
+"""Code version of every stage; bump an entry whenever that stage's output changes."""
+
+ARTIFACT_STAGES = ("ocr", "segment", "extract")
+"""Stages whose output is persisted as a checkpoint artifact.
+
+Normalization and validation outputs are the job's ``output.csv`` and
+``preview.json`` themselves, so they are not duplicated here. Artifacts are
+JSON-lines files written and read one item at a time, so no stage holds a
+whole document's intermediate output.
+"""
+
+
+def fingerprint(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_fingerprints(upload_digest: str, ocr_backend: str, master_version: str) -> dict[str, str]:
+    """Chain stage fingerprints so a change invalidates every later stage."""
+
+    prints: dict[str, str] = {}
+    previous = upload_digest
+    for stage in STAGES:
+        extra = ""
+        if stage == "ocr":
+            extra = ocr_backend
+        elif stage in ("normalize", "validate"):
+            extra = master_version
+        previous = prints[stage] = fingerprint(stage, STAGE_VERSIONS[stage], previous, extra)
+    return prints
+
+
+def first_stale_stage(manifest: Mapping[str, Any], prints: Mapping[str, str]) -> str | None:
+    """Return the earliest stage whose recorded fingerprint no longer matches."""
+
+    if manifest.get("format") != FORMAT_VERSION:
+        return STAGES[0]
+    recorded = manifest.get("stages", {})
+    for stage in STAGES:
+        if recorded.get(stage, {}).get("fingerprint") != prints[stage]:
+            return stage
+    return None
+
+
+class CheckpointStore:
+    """Versioned intermediate artifacts for a single job."""
+
+    def __init__(self, job_dir: Path) -> None:
+        self.directory = job_dir / "checkpoints"
+        self.manifest_path = self.directory / "manifest.json"
+
+    def load_manifest(self) -> dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {}
+        return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+
+    def save_manifest(self, manifest: Mapping[str, Any]) -> None:
+        self._write_atomic(self.manifest_path, json.dumps(manifest, ensure_ascii=False))
+
+    def has(self, stage: str) -> bool:
+        return self._stream_path(stage).exists() or self._artifact_path(stage).exists()
+
+    def write(self, stage: str, payload: Any) -> None:
+        self._write_atomic(self._artifact_path(stage), json.dumps(payload, ensure_ascii=False))
+
+    def read(self, stage: str) -> Any:
+        return json.loads(self._artifact_path(stage).read_text(encoding="utf-8"))
+
+    def write_stream(self, stage: str, items: Iterable[Any]) -> int:
+        """Write ``items`` as one JSON line each, consuming them lazily; returns how many."""
+
+        path = self._stream_path(stage)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        count = 0
+        with temp_path.open("wb", buffering=1 << 20) as handle:
+            for item in items:
+                handle.write(codec.dumps(item))
+                handle.write(b"\n")
+                count += 1
+        os.replace(temp_path, path)
+        self._artifact_path(stage).unlink(missing_ok=True)
+        return count
+
+    def iter_stream(self, stage: str) -> Iterator[Any]:
+        """Items of a :meth:`write_stream` artifact, read one line at a time.
+
+        Checkpoints from before artifacts were streamed hold a single JSON
+        list, which is read whole.
+        """
+
+        path = self._stream_path(stage)
+        if not path.exists():
+            yield from self.read(stage)
+            return
+        with path.open("rb") as handle:
+            for line in handle:
+                yield codec.loads(line)
+
+    def _artifact_path(self, stage: str) -> Path:
+        return self.directory / f"{stage}.json"
+
+    def _stream_path(self, stage: str) -> Path:
+        return self.directory / f"{stage}.jsonl"
+
+    def _write_atomic(self, path: Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(text, encoding="utf-8")
+        os.replace(temp_path, path)
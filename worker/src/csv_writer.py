@@ -1,19 +1,111 @@
 from __future__ import annotations
 
 import csv
+import gzip
+import io
+import os
+from contextlib import ExitStack
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Iterable
+from typing import IO, Iterable, Iterator, Mapping, Sequence
+
+from api.app.services import columnar
 
 from .extract import EXPECTED_COLUMNS
 
+COLUMNAR_OUTPUT = os.environ.get("CNE_COLUMNAR_OUTPUT", "1") != "0"
+"""Also write ``output.cols`` next to ``output.csv`` for column-selective readers."""
+
+COMPRESSED_OUTPUT = os.environ.get("CNE_COMPRESSED_OUTPUT", "0") != "0"
+"""Also write ``output.csv.gz``."""
+
+BUFFER_SIZE = 1 << 20
+CHUNK_ROWS = 4096
+GZIP_LEVEL = 6
+
+Row = Sequence[str]
+
+_row_of = itemgetter(*EXPECTED_COLUMNS)
+
+
+def record_row(record: Mapping[str, str]) -> Row:
+    """Positional row of ``record`` in ``EXPECTED_COLUMNS`` order."""
+
+    try:
+        return _row_of(record)
+    except KeyError:
+        return tuple(record.get(column, "") for column in EXPECTED_COLUMNS)
+
+
+def rows_from_batches(batches: Iterable[Sequence[Sequence[str]]]) -> Iterator[Row]:
+    """Flatten column batches (one sequence per column) into rows."""
+
+    for batch in batches:
+        yield from zip(*batch)
+
+
+def write_rows(
+    job_id: str,
+    rows: Iterable[Row],
+    base_dir: Path,
+    write_columnar: bool | None = None,
+    compress: bool | None = None,
+) -> Path:
+    """Write positional rows to ``output.csv`` and its variants in one pass.
+
+    ``rows`` may be any iterable, including a generator; it is consumed
+    once, ``CHUNK_ROWS`` at a time. Each chunk is formatted and encoded
+    once and the same bytes go to the CSV and the gzip variant, while the
+    columnar variant takes the chunk's rows directly, so no per-row dict is
+    ever built.
+    """
 
-def write_csv(job_id: str, records: Iterable[dict[str, str]], base_dir: Path) -> Path:
     job_dir = base_dir / job_id
     job_dir.mkdir(parents=True, exist_ok=True)
     csv_path = job_dir / "output.csv"
-    with csv_path.open("w", encoding="utf-8", newline="") as handle:
-        writer = csv.DictWriter(handle, fieldnames=EXPECTED_COLUMNS, delimiter=";")
-        writer.writeheader()
-        for record in records:
-            writer.writerow({key: record.get(key, "") for key in EXPECTED_COLUMNS})
+    columns_path = job_dir / columnar.FILENAME
+    gzip_path = job_dir / "output.csv.gz"
+    use_columnar = COLUMNAR_OUTPUT if write_columnar is None else write_columnar
+    use_gzip = COMPRESSED_OUTPUT if compress is None else compress
+    # A stale variant would disagree with the new CSV.
+    if not use_columnar:
+        columns_path.unlink(missing_ok=True)
+    if not use_gzip:
+        gzip_path.unlink(missing_ok=True)
+
+    with ExitStack() as stack:
+        sinks: list[IO[bytes]] = [stack.enter_context(csv_path.open("wb", buffering=BUFFER_SIZE))]
+        if use_gzip:
+            sinks.append(stack.enter_context(gzip.open(gzip_path, "wb", compresslevel=GZIP_LEVEL)))
+        columns = None
+        if use_columnar:
+            columns = stack.enter_context(columnar.ColumnarWriter(columns_path, EXPECTED_COLUMNS))
+
+        text = io.StringIO()
+        writer = csv.writer(text, delimiter=";")
+        writer.writerow(EXPECTED_COLUMNS)
+        iterator = iter(rows)
+        while True:
+            chunk = list(islice(iterator, CHUNK_ROWS))
+            writer.writerows(chunk)
+            data = text.getvalue().encode("utf-8")
+            for sink in sinks:
+                sink.write(data)
+            text.seek(0)
+            text.truncate()
+            if columns is not None:
+                columns.extend_rows(chunk)
+            if len(chunk) < CHUNK_ROWS:
+                break
     return csv_path
+
+
+def write_csv(
+    job_id: str,
+    records: Iterable[Mapping[str, str]],
+    base_dir: Path,
+    write_columnar: bool | None = None,
+    compress: bool | None = None,
+) -> Path:
+    return write_rows(job_id, map(record_row, records), base_dir, write_columnar=write_columnar, compress=compress)
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
-import unicodedata
-from typing import Dict, Iterator, List
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .lexicon import FIELD_MAPPING, LEXICON
+
+__all__ = ["EXPECTED_COLUMNS", "FIELD_MAPPING", "METADATA_MAPPING", "extract_records", "iter_records"]
 
 EXPECTED_COLUMNS = [
     "DTMNFR",
@@ -16,21 +20,13 @@ EXPECTED_COLUMNS = [
     "INDEPENDENTE",
 ]
 
-FIELD_MAPPING = {
-    "dtmnfr": "DTMNFR",
-    "competencia": "DTMNFR",
-    "orgao": "ORGAO",
-    "lista": "NOME_LISTA",
-    "tipo": "TIPO",
-    "sigla": "SIGLA",
-    "descricao": "NOME_CANDIDATO",
-    "partido_proponente": "PARTIDO_PROPONENTE",
-}
-
 METADATA_MAPPING = {
     "dtmnfr": "DTMNFR",
 }
 
+HEADER_LINES = 200
+"""Most entries read for document metadata when no ``orgao`` line ends the header."""
+
 
 def _init_record() -> dict[str, str]:
     record = {column: "" for column in EXPECTED_COLUMNS}
@@ -38,24 +34,37 @@ def _init_record() -> dict[str, str]:
     record["_raw_sigla"] = ""
     return record
 
-def _normalize_key(label: str) -> str:
-    normalized = unicodedata.normalize("NFKD", label)
-    stripped = "".join(character for character in normalized if not unicodedata.combining(character))
-    return stripped.lower().replace("-", "_").replace(" ", "_")
 
+def _split(entry: dict) -> Tuple[str | None, str | None, str] | None:
+    """``(label, column, value)`` of a ``label: value`` entry, else ``None``.
+
+    Entries from :func:`segment.iter_segments` carry the split already;
+    only untagged entries are split here.
+    """
 
-def _extract_metadata(segments: Dict[str, List[dict]]) -> dict[str, str]:
+    if "segment" in entry:
+        if "label" not in entry:
+            return None
+        return entry["label"], entry["column"], entry["value"]
+    parsed = LEXICON.split(entry["content"].strip())
+    if parsed is None:
+        return None
+    label, value = parsed
+    return label.key, label.column, value
+
+
+def _extract_metadata(entries: Iterable[dict]) -> dict[str, str]:
     metadata: dict[str, str] = {}
-    for entry in _iter_entries(segments):
+    for entry in entries:
         text = entry["content"].strip()
         if not text:
             continue
         if text.lower().startswith("orgao"):
             break
-        if ":" not in text:
+        parsed = _split(entry)
+        if parsed is None:
             continue
-        prefix, value = [part.strip() for part in text.split(":", 1)]
-        key = _normalize_key(prefix)
+        key, _, value = parsed
         metadata[key] = value
     return metadata
 
@@ -69,8 +78,26 @@ def _iter_entries(segments: Dict[str, List[dict]]) -> Iterator[dict[str, str]]:
 
 
 def extract_records(segments: Dict[str, List[dict]]) -> List[dict[str, str]]:
+    return list(iter_records(_iter_entries(segments)))
+
+
+def iter_records(entries: Iterable[dict]) -> Iterator[dict[str, str]]:
+    """Records of layout ``entries`` given in document order, one at a time.
+
+    Only the header, up to the first ``orgao`` line, is buffered to read the
+    document metadata every record inherits. A document without one has
+    its metadata read from the first ``HEADER_LINES`` entries, so records
+    still stream instead of waiting for the end of the input.
+    """
+
+    entries = iter(entries)
+    head: List[dict] = []
+    for entry in entries:
+        head.append(entry)
+        if entry["content"].strip().lower().startswith("orgao") or len(head) >= HEADER_LINES:
+            break
+    metadata = _extract_metadata(head)
     records: List[dict[str, str]] = []
-    metadata = _extract_metadata(segments)
     current = _init_record()
 
     def finalize_record() -> None:
@@ -83,17 +110,19 @@ def extract_records(segments: Dict[str, List[dict]]) -> List[dict[str, str]]:
             records.append(record)
         current = _init_record()
 
-    for entry in _iter_entries(segments):
+    for entry in chain(head, entries):
+        if records:
+            yield from records
+            records.clear()
         text = entry["content"].strip()
         if not text:
             if any(current.get(column) for column in ("ORGAO", "NOME_LISTA", "TIPO", "NOME_CANDIDATO")):
                 finalize_record()
             continue
 
-        if ":" in text:
-            prefix, value = [part.strip() for part in text.split(":", 1)]
-            key = _normalize_key(prefix)
-            column = FIELD_MAPPING.get(key)
+        parsed = _split(entry)
+        if parsed is not None:
+            _, column, value = parsed
             if column is None:
                 continue
             if column == "ORGAO" and current["ORGAO"]:
@@ -113,4 +142,4 @@ def extract_records(segments: Dict[str, List[dict]]) -> List[dict[str, str]]:
                 ).strip()
 
     finalize_record()
-    return records
+    yield from records
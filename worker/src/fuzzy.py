@@ -1,34 +1,232 @@
 from __future__ import annotations
 
-import json
-from difflib import get_close_matches
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, Mapping, Tuple
+
+from .master_snapshot import MappedMaster, content_version, load_records, open_current
+from .sigla_index import SiglaIndex
+
+if TYPE_CHECKING:
+    from .sigla_corrector import SiglaCorrector
 
 MASTER_DIR = Path("data/master")
+MATCH_CUTOFF = 0.7
+RESOLUTION_CACHE_SIZE = 4096
 
 
-def _load_master() -> Dict[str, dict]:
-    records: Dict[str, dict] = {}
-    for file in MASTER_DIR.glob("*.json"):
-        data = json.loads(file.read_text(encoding="utf-8"))
-        if isinstance(data, dict):
-            records[data["sigla"].upper()] = data
-        elif isinstance(data, list):
-            for item in data:
-                records[item["sigla"].upper()] = item
-    return records
+@dataclass(frozen=True)
+class SiglaResolution:
+    """Outcome of matching a raw sigla against the master data."""
 
+    candidate: str
+    metadata: dict | None
+    ratio: float
 
-MASTER_CACHE = _load_master()
 
+@dataclass(frozen=True)
+class MasterSnapshot:
+    """Fully built master data: records, content version and fuzzy index."""
+
+    records: Mapping[str, dict]
+    version: str
+    index: SiglaIndex
+
+
+def _load_master(directory: Path | None = None) -> Dict[str, dict]:
+    return load_records(directory or MASTER_DIR)
+
+
+def _initial_master() -> Mapping[str, dict]:
+    """Map a current compiled snapshot when there is one, else parse the JSON files."""
+
+    try:
+        mapped = open_current(MASTER_DIR)
+    except (OSError, ValueError):
+        mapped = None
+    return mapped if mapped is not None else _load_master()
+
+
+MASTER_CACHE: Mapping[str, dict] = _initial_master()
+_VERSION_MEMO: tuple[Mapping[str, dict], str] | None = None
+_INDEX_MEMO: tuple[Mapping[str, dict], SiglaIndex] | None = None
+CORRECTOR: "SiglaCorrector | None" = None
+
+
+class _ResolutionCache:
+    """Bounded LRU of sigla resolutions for one master-data snapshot and corrector."""
+
+    def __init__(self, master: Mapping[str, dict], corrector: "SiglaCorrector | None", maxsize: int) -> None:
+        self.master = master
+        self.corrector = corrector
+        self.maxsize = maxsize
+        self.entries: OrderedDict[str, SiglaResolution] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+
+_RESOLUTIONS: _ResolutionCache | None = None
+
+
+def master_version() -> str:
+    """Content hash of the master data currently used for matching."""
+
+    global _VERSION_MEMO
+    cache = MASTER_CACHE
+    if _VERSION_MEMO is None or _VERSION_MEMO[0] is not cache:
+        version = cache.version if isinstance(cache, MappedMaster) else content_version(cache)
+        _VERSION_MEMO = (cache, version)
+    return _VERSION_MEMO[1]
+
+
+def resolution_version() -> str:
+    """Version of everything sigla matching depends on: master data and corrector."""
+
+    if CORRECTOR is None:
+        return master_version()
+    return f"{master_version()}+{CORRECTOR.version}"
+
+
+def build_snapshot(directory: Path | None = None) -> MasterSnapshot:
+    records = _load_master(directory)
+    return MasterSnapshot(records=records, version=content_version(records), index=SiglaIndex(records.keys()))
+
+
+def mapped_snapshot(mapped: MappedMaster) -> MasterSnapshot:
+    return MasterSnapshot(records=mapped, version=mapped.version, index=mapped.index)
+
+
+def install_snapshot(snapshot: MasterSnapshot) -> None:
+    """Make ``snapshot`` the master data used by subsequent lookups.
+
+    The version and index memos are primed before the records are
+    published, so the first lookup after the swap does no rebuilding.
+    Publishing is a single reference assignment, which readers observe
+    atomically.
+    """
+
+    global MASTER_CACHE, _VERSION_MEMO, _INDEX_MEMO
+    _VERSION_MEMO = (snapshot.records, snapshot.version)
+    _INDEX_MEMO = (snapshot.records, snapshot.index)
+    MASTER_CACHE = snapshot.records
+
+
+def install_corrector(corrector: "SiglaCorrector | None") -> None:
+    """Consult ``corrector`` before the ``difflib`` matcher; ``None`` turns it off."""
+
+    global CORRECTOR
+    CORRECTOR = corrector
+
+
+def get_index() -> SiglaIndex:
+    """Fuzzy index for the current master data, rebuilt when the data changes."""
+
+    global _INDEX_MEMO
+    cache = MASTER_CACHE
+    if _INDEX_MEMO is None or _INDEX_MEMO[0] is not cache:
+        index = cache.index if isinstance(cache, MappedMaster) else SiglaIndex(cache.keys())
+        _INDEX_MEMO = (cache, index)
+    return _INDEX_MEMO[1]
+
+
+def _resolution_cache() -> _ResolutionCache:
+    global _RESOLUTIONS
+    cache = MASTER_CACHE
+    corrector = CORRECTOR
+    if _RESOLUTIONS is None or _RESOLUTIONS.master is not cache or _RESOLUTIONS.corrector is not corrector:
+        _RESOLUTIONS = _ResolutionCache(cache, corrector, RESOLUTION_CACHE_SIZE)
+    return _RESOLUTIONS
+
+
+def _resolve(
+    upper: str, master: Mapping[str, dict], corrector: "SiglaCorrector | None", corrected: str | None = None
+) -> SiglaResolution:
+    """Exact match, then the learned corrector, then the ``difflib`` matcher.
+
+    ``corrected`` is the corrector's answer when it was already computed
+    for a batch.
+    """
+
+    if upper in master:
+        return SiglaResolution(candidate=upper, metadata=master[upper], ratio=1.0)
+    match = corrected
+    if match is None and corrector is not None:
+        match = corrector.correct(upper, master)
+    if match is None:
+        best = get_index().best_match(upper, cutoff=MATCH_CUTOFF)
+        match = best[0] if best is not None else None
+    if match is not None:
+        ratio = SequenceMatcher(None, upper, match).ratio()
+        return SiglaResolution(candidate=match, metadata=master[match], ratio=ratio)
+    return SiglaResolution(candidate=upper, metadata=None, ratio=1.0)
+
+
+def _remember(memo: _ResolutionCache, upper: str, resolution: SiglaResolution) -> None:
+    memo.entries[upper] = resolution
+    if len(memo.entries) > memo.maxsize:
+        memo.entries.popitem(last=False)
+
+
+def resolve_sigla(sigla: str) -> SiglaResolution:
+    """Match ``sigla`` once per master-data snapshot.
+
+    Resolutions are memoised case-insensitively in a bounded LRU that is
+    discarded whenever the master data is replaced, so normalization fills
+    it and validation of the same rows only reads from it.
+    """
 
-def match_sigla(sigla: str) -> Tuple[str, dict | None]:
     upper = sigla.upper()
-    if upper in MASTER_CACHE:
-        return upper, MASTER_CACHE[upper]
-    matches = get_close_matches(upper, MASTER_CACHE.keys(), n=1, cutoff=0.7)
-    if matches:
-        match = matches[0]
-        return match, MASTER_CACHE[match]
-    return upper, None
+    memo = _resolution_cache()
+    with memo.lock:
+        found = memo.entries.get(upper)
+        if found is not None:
+            memo.entries.move_to_end(upper)
+            memo.hits += 1
+            return found
+    resolution = _resolve(upper, memo.master, memo.corrector)
+    with memo.lock:
+        memo.misses += 1
+        _remember(memo, upper, resolution)
+    return resolution
+
+
+def resolve_batch(siglas: Iterable[str]) -> None:
+    """Resolve the distinct, not yet cached values of ``siglas`` in one pass.
+
+    The corrector scores the whole batch in a single call and the results
+    land in the resolution cache, so the :func:`resolve_sigla` calls that
+    follow for the same values are cache hits.
+    """
+
+    memo = _resolution_cache()
+    master = memo.master
+    with memo.lock:
+        pending = [
+            upper
+            for upper in dict.fromkeys(sigla.upper() for sigla in siglas if sigla)
+            if upper not in memo.entries and upper not in master
+        ]
+    if not pending:
+        return
+    corrected = memo.corrector.correct_many(pending, master) if memo.corrector is not None else {}
+    # The corrector already had its say: ``None`` goes straight to difflib.
+    resolutions = [(upper, _resolve(upper, master, None, corrected.get(upper))) for upper in pending]
+    with memo.lock:
+        memo.misses += len(resolutions)
+        for upper, resolution in resolutions:
+            _remember(memo, upper, resolution)
+
+
+def resolution_cache_info() -> dict[str, int]:
+    memo = _resolution_cache()
+    with memo.lock:
+        return {"hits": memo.hits, "misses": memo.misses, "size": len(memo.entries), "maxsize": memo.maxsize}
+
+
+def match_sigla(sigla: str) -> Tuple[str, dict | None]:
+    resolution = resolve_sigla(sigla)
+    return resolution.candidate, resolution.metadata
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
-from typing import Iterable, List
+from typing import Iterable, Iterator, List
 
 
 def detect_layout(lines: Iterable[str]) -> List[dict[str, str]]:
     """Detects layout structures in the OCR lines."""
 
-    layout = []
+    return list(iter_layout(lines))
+
+
+def iter_layout(lines: Iterable[str]) -> Iterator[dict[str, str]]:
+    """:func:`detect_layout` one line at a time."""
+
     for index, line in enumerate(lines):
-        layout.append({
+        yield {
             "index": index,
             "content": line,
             "section": "header" if index == 0 else "body",
-        })
-    return layout
+        }
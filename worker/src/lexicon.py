@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import Mapping, NamedTuple, Sequence, Tuple
+
+SEGMENT_KEYS = ["orgao", "lista", "tipo"]
+
+FIELD_MAPPING = {
+    "dtmnfr": "DTMNFR",
+    "competencia": "DTMNFR",
+    "orgao": "ORGAO",
+    "lista": "NOME_LISTA",
+    "tipo": "TIPO",
+    "sigla": "SIGLA",
+    "descricao": "NOME_CANDIDATO",
+    "partido_proponente": "PARTIDO_PROPONENTE",
+}
+
+LABEL_CACHE_SIZE = 1024
+
+
+class Label(NamedTuple):
+    key: str
+    column: str | None
+
+
+def normalize_label(label: str) -> str:
+    normalized = unicodedata.normalize("NFKD", label)
+    stripped = "".join(character for character in normalized if not unicodedata.combining(character))
+    return stripped.lower().replace("-", "_").replace(" ", "_")
+
+
+class Lexicon:
+    """Labels recognised by the segment and extract stages, compiled once.
+
+    ``segment_keys`` are matched as lower-case substrings of a line, the
+    first listed key winning. ``fields`` maps normalized labels to output
+    columns. Documents repeat a few dozen labels over thousands of lines, so
+    the NFKD normalization and column lookup of a raw label are memoized and
+    the normalized keys interned.
+    """
+
+    def __init__(
+        self,
+        segment_keys: Sequence[str],
+        fields: Mapping[str, str],
+        cache_size: int = LABEL_CACHE_SIZE,
+    ) -> None:
+        self.segment_keys = tuple(segment_keys)
+        self.fields = dict(fields)
+        self.label = lru_cache(maxsize=cache_size)(self._label)
+
+    def _label(self, prefix: str) -> Label:
+        key = sys.intern(normalize_label(prefix))
+        return Label(key, self.fields.get(key))
+
+    def segment(self, text: str) -> str:
+        # Plain substring tests run in C; for a handful of keys they beat a
+        # regex alternation over the same line.
+        lowered = text.lower()
+        for key in self.segment_keys:
+            if key in lowered:
+                return key
+        return "body"
+
+    def split(self, text: str) -> Tuple[Label, str] | None:
+        """Classify a stripped ``label: value`` line, or ``None`` without a colon."""
+
+        prefix, separator, value = text.partition(":")
+        if not separator:
+            return None
+        return self.label(prefix.strip()), value.strip()
+
+
+LEXICON = Lexicon(SEGMENT_KEYS, FIELD_MAPPING)
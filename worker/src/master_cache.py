@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+
+from api.app.services.metrics import MetricsService
+
+from . import fuzzy, master_snapshot
+from .master_snapshot import Stamp, directory_stamp
+
+LOGGER = logging.getLogger(__name__)
+
+POLL_INTERVAL = 5.0
+
+
+class MasterDataManager:
+    """Keeps the worker's master data current without blocking jobs.
+
+    A daemon thread polls the master-data directory for changes to file
+    names, sizes or modification times. When something changed it maps
+    the compiled snapshot of the directory (compiling it first if no other
+    worker has) off the job thread, then parks it. The worker calls
+    :meth:`swap_if_ready` between jobs to publish it, so a job never sees
+    the registry change mid-run and never waits for a reload. With
+    ``use_mmap=False``, or when the snapshot cannot be written, the records
+    are loaded into process memory instead.
+    """
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        interval: float = POLL_INTERVAL,
+        use_mmap: bool = True,
+    ) -> None:
+        self._directory = directory
+        self._interval = interval
+        self._use_mmap = use_mmap
+        self._stamp: Stamp | None = None
+        self._pending: fuzzy.MasterSnapshot | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._metrics = MetricsService.get_instance()
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or fuzzy.MASTER_DIR
+
+    def _build(self, stamp: Stamp) -> fuzzy.MasterSnapshot:
+        if self._use_mmap:
+            try:
+                mapped = master_snapshot.ensure_snapshot(self.directory, stamp=stamp)
+            except OSError:
+                LOGGER.warning("Cannot map a master-data snapshot, loading records in memory", exc_info=True)
+            else:
+                return fuzzy.mapped_snapshot(mapped)
+        return fuzzy.build_snapshot(self.directory)
+
+    def check(self) -> bool:
+        """Build a new snapshot if the directory changed; return whether one is pending."""
+
+        stamp = directory_stamp(self.directory)
+        if stamp == self._stamp:
+            return False
+        try:
+            snapshot = self._build(stamp)
+        except (OSError, ValueError, KeyError, TypeError):
+            # A writer may be halfway through a file; keep the current data
+            # and retry on the next poll.
+            LOGGER.warning("Master data in %s is not readable yet, retrying", self.directory, exc_info=True)
+            return False
+        with self._lock:
+            self._pending = snapshot
+            self._stamp = stamp
+        LOGGER.info("Master data snapshot %s built with %d records", snapshot.version[:12], len(snapshot.records))
+        return True
+
+    def swap_if_ready(self) -> bool:
+        with self._lock:
+            snapshot, self._pending = self._pending, None
+        if snapshot is None:
+            return False
+        changed = snapshot.version != fuzzy.master_version()
+        # Install even when the content is unchanged so a worker that started
+        # from the JSON files moves onto the shared mapping.
+        fuzzy.install_snapshot(snapshot)
+        if changed:
+            self._metrics.increment("worker.master_data.reloads")
+            LOGGER.info("Master data snapshot %s is now active", snapshot.version[:12])
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception:  # pragma: no cover - defensive logging
+                LOGGER.exception("Master data refresh failed")
+            self._stop.wait(self._interval)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="master-data-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Sequence
+
+from .sigla_index import SiglaIndex
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts compile without locking
+    fcntl = None  # type: ignore[assignment]
+
+LOGGER = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = Path("data/cache/master.snap")
+MAGIC = b"CNEMAST1"
+FORMAT_VERSION = 1
+# magic, format, record count, seven section offsets, content version, source stamp
+HEADER = struct.Struct("=8sII7Q64s64s")
+SECTIONS = (
+    "key_offsets",
+    "key_blob",
+    "record_offsets",
+    "record_blob",
+    "lengths",
+    "directory",
+    "postings",
+)
+
+Stamp = tuple[tuple[str, int, int], ...]
+
+
+def load_records(directory: Path) -> Dict[str, dict]:
+    records: Dict[str, dict] = {}
+    for file in directory.glob("*.json"):
+        data = json.loads(file.read_text(encoding="utf-8"))
+        if isinstance(data, dict):
+            records[data["sigla"].upper()] = data
+        elif isinstance(data, list):
+            for item in data:
+                records[item["sigla"].upper()] = item
+    return records
+
+
+def content_version(records: Mapping[str, dict]) -> str:
+    payload = json.dumps(dict(records), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def directory_stamp(directory: Path) -> Stamp:
+    """Cheap change detector: name, mtime and size of every master JSON file."""
+
+    entries = []
+    try:
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    except FileNotFoundError:
+        return ()
+    return tuple(sorted(entries))
+
+
+def stamp_digest(stamp: Stamp) -> str:
+    return hashlib.sha256(repr(stamp).encode("utf-8")).hexdigest()
+
+
+def _offsets_and_blob(items: Sequence[bytes]) -> tuple[array, bytes]:
+    offsets = array("I", [0])
+    for item in items:
+        offsets.append(offsets[-1] + len(item))
+    return offsets, b"".join(items)
+
+
+def _pad(buffer: bytearray) -> None:
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+
+def compile_snapshot(records: Mapping[str, dict], path: Path, source_stamp: Stamp = ()) -> Path:
+    """Serialise ``records`` and their fuzzy index into a snapshot file.
+
+    The file is written next to ``path`` and renamed into place, so
+    processes that already mapped the previous snapshot keep a consistent
+    view until they reopen it. Integer sections use the host byte order;
+    snapshots are a local cache, not an interchange format.
+    """
+
+    index = SiglaIndex(records.keys())
+    keys, lengths, postings = index.tables()
+    key_offsets, key_blob = _offsets_and_blob([key.encode("utf-8") for key in keys])
+    record_offsets, record_blob = _offsets_and_blob(
+        [json.dumps(records[key], ensure_ascii=False, default=str).encode("utf-8") for key in keys]
+    )
+    directory = array("I")
+    posting_ids = array("I")
+    posting_counts = array("I")
+    for char in sorted(postings):
+        for length in sorted(postings[char]):
+            ids, counts = postings[char][length]
+            start = len(posting_ids)
+            posting_ids.extend(ids)
+            posting_counts.extend(counts)
+            directory.extend((ord(char), length, start, len(posting_ids)))
+
+    sections = [
+        key_offsets.tobytes(),
+        key_blob,
+        record_offsets.tobytes(),
+        record_blob,
+        array("I", lengths).tobytes(),
+        directory.tobytes(),
+        posting_ids.tobytes() + posting_counts.tobytes(),
+    ]
+    body = bytearray(b"\0" * HEADER.size)
+    _pad(body)
+    offsets = []
+    for section in sections:
+        offsets.append(len(body))
+        body.extend(section)
+        _pad(body)
+    HEADER.pack_into(
+        body,
+        0,
+        MAGIC,
+        FORMAT_VERSION,
+        len(keys),
+        *offsets,
+        content_version(records).encode("ascii"),
+        stamp_digest(source_stamp).encode("ascii"),
+    )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp_path.write_bytes(bytes(body))
+    os.replace(temp_path, path)
+    return path
+
+
+class _KeyTable(Sequence[str]):
+    def __init__(self, view: memoryview, offsets: memoryview, count: int) -> None:
+        self._view = view
+        self._offsets = offsets
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, key_id):  # type: ignore[override]
+        if isinstance(key_id, slice):
+            return [self[position] for position in range(*key_id.indices(self._count))]
+        return self.raw(key_id).decode("utf-8")
+
+    def raw(self, key_id: int) -> bytes:
+        return bytes(self._view[self._offsets[key_id] : self._offsets[key_id + 1]])
+
+
+class MappedMaster(Mapping[str, dict]):
+    """Read-only master data backed by a memory-mapped snapshot.
+
+    Every worker process maps the same file, so the tables live once in the
+    page cache. Records are decoded on first access and kept per process.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, fmt, count, *offsets, version, source = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a master-data snapshot")
+        bounds = dict(zip(SECTIONS, offsets))
+        ends = dict(zip(SECTIONS, offsets[1:] + [len(view)]))
+
+        def section(name: str) -> memoryview:
+            return view[bounds[name] : ends[name]]
+
+        def ints(name: str, length: int) -> memoryview:
+            return section(name)[: length * 4].cast("I")
+
+        self.version = version.decode("ascii")
+        self.source_digest = source.decode("ascii")
+        self._count = count
+        self._keys = _KeyTable(section("key_blob"), ints("key_offsets", count + 1), count)
+        self._record_blob = section("record_blob")
+        self._record_offsets = ints("record_offsets", count + 1)
+        self._records: Dict[int, dict] = {}
+
+        directory = ints("directory", (ends["directory"] - bounds["directory"]) // 4)
+        total = directory[-1] if len(directory) else 0
+        posting_view = section("postings")
+        posting_ids = posting_view[: total * 4].cast("I")
+        posting_counts = posting_view[total * 4 : total * 8].cast("I")
+        postings: Dict[str, Dict[int, tuple[Sequence[int], Sequence[int]]]] = {}
+        for position in range(0, len(directory), 4):
+            codepoint, length, start, end = directory[position : position + 4]
+            postings.setdefault(chr(codepoint), {})[length] = (
+                posting_ids[start:end],
+                posting_counts[start:end],
+            )
+        self.index = SiglaIndex.from_tables(self._keys, ints("lengths", count), postings)
+
+    def __reduce__(self) -> tuple[type, tuple[Path]]:
+        # Other processes map the same file rather than copying the tables.
+        return MappedMaster, (self.path,)
+
+    def _find(self, sigla: str) -> int | None:
+        target = sigla.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._keys.raw(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._keys.raw(low) == target:
+            return low
+        return None
+
+    def _record(self, key_id: int) -> dict:
+        record = self._records.get(key_id)
+        if record is None:
+            start, end = self._record_offsets[key_id], self._record_offsets[key_id + 1]
+            record = self._records[key_id] = json.loads(bytes(self._record_blob[start:end]))
+        return record
+
+    def __getitem__(self, sigla: str) -> dict:
+        key_id = self._find(sigla)
+        if key_id is None:
+            raise KeyError(sigla)
+        return self._record(key_id)
+
+    def __contains__(self, sigla: object) -> bool:
+        return isinstance(sigla, str) and self._find(sigla) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return self._count
+
+
+@contextmanager
+def _compile_lock(path: Path) -> Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.with_name(f"{path.name}.lock").open("a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _map_existing(target: Path) -> MappedMaster | None:
+    """Map ``target``, or ``None`` if it is missing or not a readable snapshot."""
+
+    if not target.exists():
+        return None
+    try:
+        return MappedMaster(target)
+    except (OSError, ValueError, struct.error):
+        LOGGER.warning("Ignoring unreadable master-data snapshot %s", target, exc_info=True)
+        return None
+
+
+def open_current(directory: Path, path: Path | None = None) -> MappedMaster | None:
+    """Map the snapshot at ``path`` if it was compiled from ``directory`` as it is now."""
+
+    mapped = _map_existing(path or SNAPSHOT_PATH)
+    if mapped is None or mapped.source_digest != stamp_digest(directory_stamp(directory)):
+        return None
+    return mapped
+
+
+def ensure_snapshot(directory: Path, path: Path | None = None, stamp: Stamp | None = None) -> MappedMaster:
+    """Map an up-to-date snapshot of ``directory``, compiling it if needed.
+
+    Compilation holds an exclusive lock, so when several workers notice the
+    same change only the first compiles and the others map its output. A
+    truncated or corrupt snapshot is recompiled.
+    """
+
+    target = path or SNAPSHOT_PATH
+    stamp = directory_stamp(directory) if stamp is None else stamp
+    digest = stamp_digest(stamp)
+    with _compile_lock(target):
+        mapped = _map_existing(target)
+        if mapped is not None and mapped.source_digest == digest:
+            return mapped
+        compile_snapshot(load_records(directory), target, stamp)
+    LOGGER.info("Compiled master-data snapshot %s from %s", target, directory)
+    return MappedMaster(target)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    from .fuzzy import MASTER_DIR
+
+    parser = argparse.ArgumentParser(description="Compile master data into a memory-mappable snapshot.")
+    parser.add_argument("--source", type=Path, default=MASTER_DIR)
+    parser.add_argument("--output", type=Path, default=SNAPSHOT_PATH)
+    args = parser.parse_args(argv)
+    mapped = ensure_snapshot(args.source, args.output)
+    print(f"{args.output}: {len(mapped)} records, version {mapped.version[:12]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,11 @@ from __future__ import annotations
 
 import re
 from collections import defaultdict
-from typing import Iterable, List, Tuple
-from .fuzzy import match_sigla
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+from .fuzzy import match_sigla, resolve_batch
+
+SIGLA_BATCH_SIZE = 512
 
 
 def _normalize_tipo(value: str) -> str:
@@ -66,58 +69,100 @@ def _is_independent(raw_lista: str) -> str:
 
 
 def normalize(records: Iterable[dict[str, str]]) -> List[dict[str, str]]:
-    normalized: List[dict[str, str]] = []
+    return list(iter_normalize(records))
+
+
+def iter_normalize(records: Iterable[dict[str, str]]) -> Iterator[dict[str, str]]:
+    """Normalize records one at a time.
+
+    Only the ``NUM_ORDEM`` counter of each list group is kept between
+    records, so memory grows with the number of groups, not of candidates.
+    """
+
+    return number_records(normalize_record(record) for record in prefetch_siglas(records))
+
+
+def prefetch_siglas(records: Iterable[dict[str, str]]) -> Iterator[dict[str, str]]:
+    """Yield ``records`` unchanged, resolving their siglas a batch at a time.
+
+    The siglas of the next ``SIGLA_BATCH_SIZE`` records are matched together
+    before those records are yielded, so :func:`normalize_record` finds them
+    in the resolution cache.
+    """
+
+    iterator = iter(records)
+    while batch := list(islice(iterator, SIGLA_BATCH_SIZE)):
+        resolve_batch((record.get("_raw_sigla") or record.get("SIGLA", "") or "").strip() for record in batch)
+        yield from batch
+
+
+def order_key(record: dict[str, str]) -> tuple[str, str, str, str, str]:
+    """Group a normalized record is numbered within."""
+
+    return (
+        record["DTMNFR"],
+        record["ORGAO"].upper(),
+        record["SIGLA"].upper(),
+        record["NOME_LISTA"].upper(),
+        record["TIPO"],
+    )
+
+
+def number_records(records: Iterable[dict[str, str]]) -> Iterator[dict[str, str]]:
+    """Assign ``NUM_ORDEM`` in input order within each :func:`order_key` group."""
+
     counters: dict[tuple[str, str, str, str, str], int] = defaultdict(int)
     for record in records:
-        dtmnfr = (record.get("DTMNFR", "") or "").strip()
-        orgao = (record.get("ORGAO", "") or "").strip()
-        raw_tipo = record.get("TIPO", "") or ""
-        tipo = _normalize_tipo(raw_tipo)
-
-        raw_lista = record.get("_raw_lista") or record.get("NOME_LISTA", "")
-        raw_lista = raw_lista.strip()
-        nome_lista_hint = (record.get("NOME_LISTA", "") or "").strip()
-        nome_lista_from_raw, simbolo = _split_lista(raw_lista or nome_lista_hint)
-        nome_lista = nome_lista_hint or nome_lista_from_raw
-
-        independente = _is_independent(raw_lista or nome_lista)
-
-        sigla_value = (record.get("SIGLA", "") or "").strip()
-        sigla_raw = (record.get("_raw_sigla") or sigla_value).strip()
-        partido = (record.get("PARTIDO_PROPONENTE", "") or "").strip()
-        sigla = ""
-        metadata: dict | None = None
-        if sigla_raw:
-            sigla, metadata = match_sigla(sigla_raw)
-        elif sigla_value:
-            sigla, metadata = match_sigla(sigla_value)
-        if metadata:
-            partido = metadata.get("descricao", partido)
-        elif not partido and sigla_raw:
-            partido = sigla_raw.upper()
-        if not sigla:
-            sigla = sigla_raw.upper() if sigla_raw else sigla_value.upper()
-
-        nome_candidato = " ".join((record.get("NOME_CANDIDATO", "") or "").split())
-
-        counter_key = (dtmnfr, orgao.upper(), sigla.upper(), nome_lista.upper(), tipo)
-        num_ordem = ""
-        if tipo:
-            counters[counter_key] += 1
-            num_ordem = str(counters[counter_key])
-
-        normalized.append(
-            {
-                "DTMNFR": dtmnfr,
-                "ORGAO": orgao,
-                "TIPO": tipo,
-                "SIGLA": sigla,
-                "SIMBOLO": simbolo,
-                "NOME_LISTA": nome_lista,
-                "NUM_ORDEM": num_ordem,
-                "NOME_CANDIDATO": nome_candidato,
-                "PARTIDO_PROPONENTE": partido,
-                "INDEPENDENTE": independente,
-            }
-        )
-    return normalized
+        if record["TIPO"]:
+            key = order_key(record)
+            counters[key] += 1
+            record["NUM_ORDEM"] = str(counters[key])
+        yield record
+
+
+def normalize_record(record: dict[str, str]) -> dict[str, str]:
+    """Row-local part of normalization; ``NUM_ORDEM`` is left empty."""
+
+    dtmnfr = (record.get("DTMNFR", "") or "").strip()
+    orgao = (record.get("ORGAO", "") or "").strip()
+    raw_tipo = record.get("TIPO", "") or ""
+    tipo = _normalize_tipo(raw_tipo)
+
+    raw_lista = record.get("_raw_lista") or record.get("NOME_LISTA", "")
+    raw_lista = raw_lista.strip()
+    nome_lista_hint = (record.get("NOME_LISTA", "") or "").strip()
+    nome_lista_from_raw, simbolo = _split_lista(raw_lista or nome_lista_hint)
+    nome_lista = nome_lista_hint or nome_lista_from_raw
+
+    independente = _is_independent(raw_lista or nome_lista)
+
+    sigla_value = (record.get("SIGLA", "") or "").strip()
+    sigla_raw = (record.get("_raw_sigla") or sigla_value).strip()
+    partido = (record.get("PARTIDO_PROPONENTE", "") or "").strip()
+    sigla = ""
+    metadata: dict | None = None
+    if sigla_raw:
+        sigla, metadata = match_sigla(sigla_raw)
+    elif sigla_value:
+        sigla, metadata = match_sigla(sigla_value)
+    if metadata:
+        partido = metadata.get("descricao", partido)
+    elif not partido and sigla_raw:
+        partido = sigla_raw.upper()
+    if not sigla:
+        sigla = sigla_raw.upper() if sigla_raw else sigla_value.upper()
+
+    nome_candidato = " ".join((record.get("NOME_CANDIDATO", "") or "").split())
+
+    return {
+        "DTMNFR": dtmnfr,
+        "ORGAO": orgao,
+        "TIPO": tipo,
+        "SIGLA": sigla,
+        "SIMBOLO": simbolo,
+        "NOME_LISTA": nome_lista,
+        "NUM_ORDEM": "",
+        "NOME_CANDIDATO": nome_candidato,
+        "PARTIDO_PROPONENTE": partido,
+        "INDEPENDENTE": independente,
+    }
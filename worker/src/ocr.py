@@ -1,10 +1,31 @@
 from __future__ import annotations
 
+import hashlib
+import io
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Iterator
+from typing import IO, Callable, Dict, Iterable, Iterator, Mapping, Sequence
 from zipfile import ZipFile, is_zipfile
 
+from .ocr_cache import OCRCache, get_default_cache
+
+MAX_WORKERS = os.cpu_count() or 1
+"""Upper bound on concurrent OCR tasks for a single document."""
+
+DEFAULT_BACKEND = os.environ.get("CNE_OCR_BACKEND", "text")
+
+# Never fork: the worker process runs background threads whose locks a
+# forked child could inherit held.
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
 
 @dataclass(frozen=True)
 class OCRLine:
@@ -14,6 +35,80 @@ class OCRLine:
     confidence: float
 
 
+@dataclass(frozen=True)
+class Page:
+    """Unit of OCR work: a whole upload or a single member of a ZIP upload."""
+
+    document: Path
+    member: str | None = None
+    number: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.member or self.document.name
+
+    def open(self) -> IO[bytes]:
+        if self.member is None:
+            return self.document.open("rb")
+        return _open_member(self.document, self.member)
+
+    def read_bytes(self) -> bytes:
+        with self.open() as handle:
+            return handle.read()
+
+
+_ARCHIVE_LOCK = threading.Lock()
+_ARCHIVE: tuple[tuple[Path, int, int], ZipFile] | None = None
+
+
+def _open_member(document: Path, member: str) -> IO[bytes]:
+    """Open ``member`` of the ZIP ``document``.
+
+    Each process keeps the last archive it read open while the file is
+    unchanged, so reading every member of an upload parses its central
+    directory once rather than once per member. Member handles stay
+    readable after the archive is replaced.
+    """
+
+    global _ARCHIVE
+    stat = document.stat()
+    key = (document, stat.st_mtime_ns, stat.st_size)
+    with _ARCHIVE_LOCK:
+        if _ARCHIVE is None or _ARCHIVE[0] != key:
+            if _ARCHIVE is not None:
+                _ARCHIVE[1].close()
+            _ARCHIVE = (key, ZipFile(document))
+        return _ARCHIVE[1].open(member)
+
+
+class OCRTimeoutError(TimeoutError):
+    """Raised when a page is not recognised within the configured timeout."""
+
+
+class OCRBackend:
+    """Interface implemented by OCR engines.
+
+    Backends recognise pages independently so :func:`run_ocr` can schedule
+    them concurrently. ``batch_size`` pages are handed to
+    :meth:`recognize_batch` per task, which engines with a native batch API
+    can override. CPU-bound pure-Python backends set ``use_processes`` so
+    that tasks run in a process pool instead of threads; such backends must
+    be picklable.
+    """
+
+    name = "base"
+    version = "0"
+    batch_size = 1
+    use_processes = False
+    page_timeout: float | None = None
+
+    def recognize(self, page: Page) -> list[OCRLine]:
+        raise NotImplementedError
+
+    def recognize_batch(self, pages: Sequence[Page]) -> list[list[OCRLine]]:
+        return [self.recognize(page) for page in pages]
+
+
 def _iter_text_lines(text: str) -> Iterator[OCRLine]:
     for raw_line in text.splitlines():
         line = raw_line.strip()
@@ -22,6 +117,14 @@ def _iter_text_lines(text: str) -> Iterator[OCRLine]:
         yield OCRLine(text=line, confidence=_estimate_confidence(line))
 
 
+def _iter_stream_lines(handle: IO[bytes]) -> Iterator[OCRLine]:
+    """Decode ``handle`` incrementally instead of materialising the whole page."""
+
+    reader = io.TextIOWrapper(handle, encoding="utf-8", errors="ignore")
+    for chunk in reader:
+        yield from _iter_text_lines(chunk)
+
+
 def _estimate_confidence(text: str) -> float:
     """Return a deterministic confidence score for placeholder OCR output."""
 
@@ -34,21 +137,238 @@ def _estimate_confidence(text: str) -> float:
     return max(0.0, min(1.0, score))
 
 
-def run_ocr(file_path: Path) -> Iterable[OCRLine]:
+class TextOCRBackend(OCRBackend):
+    """Placeholder engine that treats every page as UTF-8 text."""
+
+    name = "text"
+    version = "1"
+    use_processes = True
+
+    def recognize(self, page: Page) -> list[OCRLine]:
+        with page.open() as handle:
+            return list(_iter_stream_lines(handle))
+
+
+class FakeOCRBackend(OCRBackend):
+    """Deterministic in-process backend for tests.
+
+    Pages listed in ``transcripts`` return those lines verbatim, any other
+    page is decoded as text. Every line gets the same ``confidence`` and a
+    page can be slowed down through ``delays`` to exercise concurrency and
+    timeouts.
+    """
+
+    name = "fake"
+    version = "1"
+
+    def __init__(
+        self,
+        transcripts: Mapping[str, Sequence[str]] | None = None,
+        confidence: float = 0.9,
+        delays: Mapping[str, float] | None = None,
+        batch_size: int = 1,
+    ) -> None:
+        self.transcripts = dict(transcripts or {})
+        self.confidence = confidence
+        self.delays = dict(delays or {})
+        self.batch_size = batch_size
+        self.calls: list[str] = []
+
+    def recognize(self, page: Page) -> list[OCRLine]:
+        self.calls.append(page.name)
+        delay = self.delays.get(page.name)
+        if delay:
+            time.sleep(delay)
+        if page.name in self.transcripts:
+            texts: Iterable[str] = self.transcripts[page.name]
+        else:
+            texts = page.read_bytes().decode("utf-8", errors="ignore").splitlines()
+        return [OCRLine(text=text.strip(), confidence=self.confidence) for text in texts if text.strip()]
+
+
+BACKENDS: Dict[str, Callable[[], OCRBackend]] = {
+    TextOCRBackend.name: TextOCRBackend,
+    FakeOCRBackend.name: FakeOCRBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], OCRBackend]) -> None:
+    BACKENDS[name] = factory
+
+
+def get_backend(name: str | None = None) -> OCRBackend:
+    key = name or DEFAULT_BACKEND
+    try:
+        factory = BACKENDS[key]
+    except KeyError as exc:
+        raise KeyError(f"Unknown OCR backend: {key}") from exc
+    return factory()
+
+
+def iter_pages(file_path: Path) -> list[Page]:
+    if not is_zipfile(file_path):
+        return [Page(document=file_path)]
+    with ZipFile(file_path) as archive:
+        members = sorted(name for name in archive.namelist() if not name.endswith("/"))
+    return [Page(document=file_path, member=member, number=number) for number, member in enumerate(members)]
+
+
+def _recognize_batch(backend: OCRBackend, pages: Sequence[Page]) -> list[list[OCRLine]]:
+    return backend.recognize_batch(pages)
+
+
+def recognize_pages(
+    backend: OCRBackend,
+    pages: Sequence[Page],
+    max_workers: int | None = None,
+    page_timeout: float | None = None,
+) -> Iterator[list[OCRLine]]:
+    """Yield the lines of every page, in page order.
+
+    Batches of ``backend.batch_size`` pages are submitted only when a worker
+    is free, and at most two batches per worker are running or waiting to
+    be merged, so results held stay bounded regardless of the page count.
+    Since a batch starts when it is submitted, the timeout of
+    ``page_timeout`` seconds per page runs from submission. On a timeout
+    the process-pool workers are terminated; a hung thread of an in-process
+    backend cannot be stopped and is abandoned.
+    """
+
+    timeout = page_timeout if page_timeout is not None else backend.page_timeout
+    size = max(1, backend.batch_size)
+    batches = [pages[start : start + size] for start in range(0, len(pages), size)]
+    workers = max(1, min(max_workers or MAX_WORKERS, len(batches)))
+    if workers <= 1 and timeout is None:
+        for batch in batches:
+            yield from backend.recognize_batch(batch)
+        return
+
+    executor: Executor
+    if backend.use_processes:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    # Future -> (batch index, monotonic deadline).
+    running: dict[Future[list[list[OCRLine]]], tuple[int, float]] = {}
+    finished: dict[int, list[list[OCRLine]]] = {}
+    submitted = merged = 0
+    completed = False
+    try:
+        while merged < len(batches):
+            while submitted < len(batches) and len(running) < workers and submitted - merged < workers * 2:
+                batch = batches[submitted]
+                deadline = math.inf if timeout is None else time.monotonic() + timeout * len(batch)
+                running[executor.submit(_recognize_batch, backend, batch)] = (submitted, deadline)
+                submitted += 1
+            if merged in finished:
+                yield from finished.pop(merged)
+                merged += 1
+                continue
+            earliest = min(deadline for _, deadline in running.values())
+            done, _ = wait(
+                running,
+                timeout=None if earliest == math.inf else max(0.0, earliest - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                index, _ = running.pop(future)
+                finished[index] = future.result()
+            now = time.monotonic()
+            expired = [index for index, deadline in running.values() if deadline <= now]
+            if expired:
+                names = ", ".join(page.name for page in batches[min(expired)])
+                raise OCRTimeoutError(f"OCR timed out after {timeout}s per page on {names}")
+        completed = True
+    finally:
+        if not completed and isinstance(executor, ProcessPoolExecutor):
+            _terminate_workers(executor)
+        executor.shutdown(wait=completed, cancel_futures=not completed)
+
+
+def _terminate_workers(executor: ProcessPoolExecutor) -> None:
+    # Cancelling futures does not stop a page that is already being
+    # recognised, and shutdown would otherwise wait for it.
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+
+
+def page_cache_key(page: Page, backend: OCRBackend) -> str:
+    """Content hash of ``page`` scoped to the backend name and version."""
+
+    digest = hashlib.sha256(f"{backend.name}:{backend.version}\0".encode("utf-8"))
+    with page.open() as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def run_ocr(
+    file_path: Path,
+    backend: OCRBackend | None = None,
+    max_workers: int | None = None,
+    page_timeout: float | None = None,
+    cache: OCRCache | None = None,
+    use_cache: bool = True,
+) -> Iterable[OCRLine]:
     """Perform OCR on the uploaded document.
 
-    This placeholder implementation treats the file as UTF-8 text and
-    returns individual lines. In production this would call a dedicated OCR
-    engine such as Tesseract or a hosted API.
+    The upload is split into pages (ZIP members or the whole file) that the
+    configured backend recognises concurrently; lines are returned in page
+    order. The default backend is selected by ``CNE_OCR_BACKEND`` and is the
+    placeholder text engine unless a real engine has been registered.
+
+    Pages already recognised by the same backend version are served from
+    the content-hash cache, so reprocessing an unchanged upload skips the
+    engine entirely.
     """
-    if is_zipfile(file_path):
-        lines: list[OCRLine] = []
-        with ZipFile(file_path) as archive:
-            for member in sorted(name for name in archive.namelist() if not name.endswith("/")):
-                with archive.open(member) as handle:
-                    text = handle.read().decode("utf-8", errors="ignore")
-                lines.extend(_iter_text_lines(text))
-        return lines
-
-    text = file_path.read_text(encoding="utf-8", errors="ignore")
-    return list(_iter_text_lines(text))
+    return list(
+        iter_ocr(
+            file_path,
+            backend=backend,
+            max_workers=max_workers,
+            page_timeout=page_timeout,
+            cache=cache,
+            use_cache=use_cache,
+        )
+    )
+
+
+def iter_ocr(
+    file_path: Path,
+    backend: OCRBackend | None = None,
+    max_workers: int | None = None,
+    page_timeout: float | None = None,
+    cache: OCRCache | None = None,
+    use_cache: bool = True,
+) -> Iterator[OCRLine]:
+    """:func:`run_ocr` as a generator holding about one page of lines at a time."""
+
+    engine = backend or get_backend()
+    pages = iter_pages(file_path)
+    if not use_cache:
+        for page_lines in recognize_pages(engine, pages, max_workers=max_workers, page_timeout=page_timeout):
+            yield from page_lines
+        return
+
+    store = cache or get_default_cache()
+    keys = [page_cache_key(page, engine) for page in pages]
+    misses = store.missing(keys)
+    recognized = recognize_pages(
+        engine,
+        [pages[index] for index in misses],
+        max_workers=max_workers,
+        page_timeout=page_timeout,
+    )
+    pending = set(misses)
+    for index, key in enumerate(keys):
+        cached = None if index in pending else store.peek(key)
+        if cached is not None:
+            yield from (OCRLine(text=text, confidence=conf) for text, conf in cached)
+            continue
+        if index in pending:
+            page_lines = next(recognized)
+        else:
+            # Evicted since the cache was probed.
+            page_lines = engine.recognize_batch([pages[index]])[0]
+        store.put(key, [(line.text, line.confidence) for line in page_lines])
+        yield from page_lines
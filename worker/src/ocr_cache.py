@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+from api.app.services.metrics import MetricsService
+
+CACHE_DIR = Path("data/cache/ocr")
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+CachedLine = Tuple[str, float]
+
+
+class OCRCache:
+    """Disk-backed LRU store of OCR output keyed by content hash.
+
+    Entries are small JSON files sharded by key prefix. Reads refresh the
+    entry's modification time, which doubles as the LRU clock, and writes
+    evict the least recently used entries once the directory grows past
+    ``max_bytes``. Files are replaced atomically so several worker processes
+    can share one cache directory.
+    """
+
+    def __init__(self, directory: Path | None = None, max_bytes: int = MAX_CACHE_BYTES) -> None:
+        self.directory = directory or CACHE_DIR
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._metrics = MetricsService.get_instance()
+        self._size: int | None = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> List[CachedLine] | None:
+        lines = self.peek(key)
+        self._metrics.increment("ocr.cache.misses" if lines is None else "ocr.cache.hits")
+        return lines
+
+    def peek(self, key: str) -> List[CachedLine] | None:
+        """:meth:`get` without counting a hit or miss, for keys :meth:`missing` already counted."""
+
+        path = self._path(key)
+        try:
+            payload = path.read_text(encoding="utf-8")
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return [(text, confidence) for text, confidence in json.loads(payload)]
+
+    def missing(self, keys: Sequence[str]) -> List[int]:
+        """Positions of ``keys`` that are not cached; counts a hit or miss per key."""
+
+        positions = [index for index, key in enumerate(keys) if not self._path(key).exists()]
+        if positions:
+            self._metrics.increment("ocr.cache.misses", len(positions))
+        if len(keys) > len(positions):
+            self._metrics.increment("ocr.cache.hits", len(keys) - len(positions))
+        return positions
+
+    def put(self, key: str, lines: Sequence[CachedLine]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        encoded = json.dumps([list(line) for line in lines], ensure_ascii=False).encode("utf-8")
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_path.write_bytes(encoded)
+        previous = path.stat().st_size if path.exists() else 0
+        os.replace(temp_path, path)
+        with self._lock:
+            self._size = self._current_size() + len(encoded) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(entry.stat().st_size for entry in self.directory.glob("*/*.json"))
+        return self._size
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in self.directory.glob("*/*.json"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(key=lambda item: item[0])
+        size = sum(item[1] for item in entries)
+        # Evict down to a low watermark so bursts of writes do not rescan the
+        # directory on every insert.
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, entry_size, entry in entries:
+            if size <= target:
+                break
+            entry.unlink(missing_ok=True)
+            size -= entry_size
+            evicted += 1
+        self._size = size
+        if evicted:
+            self._metrics.increment("ocr.cache.evictions", evicted)
+
+
+_default_cache: OCRCache | None = None
+
+
+def get_default_cache() -> OCRCache:
+    global _default_cache
+    if _default_cache is None or _default_cache.directory != CACHE_DIR:
+        _default_cache = OCRCache(CACHE_DIR)
+    return _default_cache
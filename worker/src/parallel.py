@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+from api.app.schemas import ValidationBadge
+from api.app.services.metrics import MetricsService
+
+from . import fuzzy, normalize, validate
+from .master_snapshot import MappedMaster
+from .rules import FieldStates
+from .sigla_corrector import SiglaCorrector
+from .sigla_index import SiglaIndex
+
+WORKERS = int(os.environ.get("CNE_PARALLEL_WORKERS", str(os.cpu_count() or 1)))
+MIN_ROWS = int(os.environ.get("CNE_PARALLEL_MIN_ROWS", "20000"))
+"""Documents with fewer records run sequentially; below this a pool costs more than it saves."""
+
+PARTITIONS_PER_WORKER = 4
+
+# Pool workers must not be forked: the parent runs threads (the metrics
+# publisher, the event bus, master-data reloads) and a forked child could
+# inherit one of their locks held, e.g. ``MetricsService._lock``.
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+Record = dict[str, str]
+
+
+def should_parallelize(row_count: int, workers: int | None = None) -> bool:
+    return (workers or WORKERS) > 1 and row_count >= MIN_ROWS
+
+
+def partition_key(record: Mapping[str, Any]) -> tuple[str, ...]:
+    """Validation list-group key of a normalized record.
+
+    Every ``NUM_ORDEM`` numbering group and every validation group rule is
+    keyed by a refinement of this key, so partitions never split a group.
+    """
+
+    return tuple(validate.SOURCES[column](record, None) for column in validate.LIST_GROUP_KEY)
+
+
+def _install_master(records: Mapping[str, dict], version: str, corrector: SiglaCorrector | None) -> None:
+    # Workers must match against exactly the parent's master data and
+    # corrector, which may have been hot-reloaded since the worker module
+    # was imported.
+    index = records.index if isinstance(records, MappedMaster) else SiglaIndex(records.keys())
+    fuzzy.install_snapshot(fuzzy.MasterSnapshot(records, version, index))
+    fuzzy.install_corrector(corrector)
+    # Only report what the worker's tasks record from here on.
+    MetricsService.get_instance().delta()
+
+
+def _normalize_chunk(records: Sequence[Record]) -> Tuple[List[Record], Dict[str, Any]]:
+    normalized = [normalize.normalize_record(record) for record in normalize.prefetch_siglas(records)]
+    return normalized, MetricsService.get_instance().delta()
+
+
+def _validate_partition(
+    records: List[Record],
+    raw_records: List[Mapping[str, Any] | None],
+    renumber: bool,
+) -> Tuple[List[Record], List[FieldStates], Dict[str, Any]]:
+    if renumber:
+        records = list(normalize.number_records(records))
+    states = validate.PLAN.run(records, raw_records)
+    return records, states, MetricsService.get_instance().delta()
+
+
+def normalize_and_validate(
+    raw_records: Sequence[Mapping[str, Any]],
+    normalized: Sequence[Record] | None = None,
+    workers: int | None = None,
+) -> Tuple[List[Record], List[List[ValidationBadge]]]:
+    """Parallel equivalent of ``normalize`` followed by ``validate``.
+
+    Row-local normalization (including sigla matching) runs over contiguous
+    chunks. Records are then hash-partitioned by :func:`partition_key` and
+    each partition is numbered and validated in its original relative
+    order, so results are identical to the sequential path once reassembled
+    by row index. Pass ``normalized`` to only validate already normalized
+    records.
+    """
+
+    count = len(raw_records) if normalized is None else len(normalized)
+    pool_size = max(1, workers or WORKERS)
+    partitions = pool_size * PARTITIONS_PER_WORKER
+    master = (fuzzy.MASTER_CACHE, fuzzy.master_version(), fuzzy.CORRECTOR)
+    metrics = MetricsService.get_instance()
+    with ProcessPoolExecutor(
+        max_workers=pool_size, mp_context=POOL_CONTEXT, initializer=_install_master, initargs=master
+    ) as pool:
+        if normalized is None:
+            chunk = max(1, -(-count // partitions))
+            records: List[Record] = []
+            chunks = [raw_records[start : start + chunk] for start in range(0, count, chunk)]
+            for normalized_chunk, delta in pool.map(_normalize_chunk, chunks):
+                records.extend(normalized_chunk)
+                metrics.merge(delta)
+        else:
+            records = list(normalized)
+
+        members: List[List[int]] = [[] for _ in range(partitions)]
+        for index, record in enumerate(records):
+            members[hash(partition_key(record)) % partitions].append(index)
+        members = [indices for indices in members if indices]
+
+        raw_count = len(raw_records)
+        futures = [
+            pool.submit(
+                _validate_partition,
+                [records[index] for index in indices],
+                [raw_records[index] if index < raw_count else None for index in indices],
+                normalized is None,
+            )
+            for indices in members
+        ]
+        states: List[FieldStates] = [{} for _ in range(count)]
+        for indices, future in zip(members, futures):
+            partition_records, partition_states, delta = future.result()
+            metrics.merge(delta)
+            for index, record, row_states in zip(indices, partition_records, partition_states):
+                records[index] = record
+                states[index] = row_states
+
+    return records, [validate.to_badges(row_states) for row_states in states]
@@ -1,17 +1,49 @@
 from __future__ import annotations
 
+import csv
 import logging
-from statistics import fmean
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Iterable, Iterator
 
-from api.app.schemas import PreviewResponse, PreviewRow
+from api.app.schemas import PreviewRow
+from api.app.services import codec
 from api.app.services.jobs import INCOMING_DIR, PROCESSED_DIR, JobService, JobStatus
 from api.app.services.metrics import MetricsService
 
-from . import csv_writer, extract, layout, normalize, ocr, segment, validate
+from . import csv_writer, extract, fuzzy, layout, normalize, ocr, parallel, segment, spill, validate
+from .checkpoints import (
+    FORMAT_VERSION,
+    STAGES,
+    CheckpointStore,
+    file_digest,
+    first_stale_stage,
+    stage_fingerprints,
+)
 
 LOGGER = logging.getLogger(__name__)
 
+STAGE_INPUTS = {
+    "segment": ("ocr",),
+    "extract": ("segment",),
+    "normalize": ("extract",),
+    "validate": ("extract",),
+}
+"""Checkpoint artifacts a stage needs when a run resumes at that stage."""
+
+
+@dataclass
+class StagePlan:
+    job_id: str
+    file_path: Path
+    backend: ocr.OCRBackend
+    fingerprints: dict[str, str]
+    store: CheckpointStore
+    manifest: dict[str, Any] = field(default_factory=dict)
+    start: str | None = STAGES[0]
+
 
 def _first_file(job_dir: Path) -> Path:
     for file in job_dir.iterdir():
@@ -20,47 +52,175 @@ def _first_file(job_dir: Path) -> Path:
     raise FileNotFoundError(f"No files found in {job_dir}")
 
 
+def _iter_normalized(csv_path: Path) -> Iterator[dict[str, str]]:
+    with csv_path.open(encoding="utf-8", newline="") as handle:
+        yield from csv.DictReader(handle, delimiter=";")
+
+
+def _inputs_available(plan: StagePlan, stage: str) -> bool:
+    if not all(plan.store.has(required) for required in STAGE_INPUTS.get(stage, ())):
+        return False
+    if stage == "validate":
+        return (PROCESSED_DIR / plan.job_id / "output.csv").exists()
+    return True
+
+
+def plan_stages(job_id: str, resume: bool = False, from_stage: str | None = None) -> StagePlan:
+    """Work out where a run of ``job_id`` has to start.
+
+    Fresh runs start at OCR. Resumed runs start at the earliest stage whose
+    fingerprint (upload hash, stage code version, OCR backend version and
+    master-data and sigla corrector versions, chained through previous
+    stages) no longer matches the checkpoint manifest, or at ``from_stage``
+    if that is earlier. A plan with ``start=None`` means every stage is up
+    to date.
+    """
+
+    if from_stage is not None and from_stage not in STAGES:
+        raise ValueError(f"Unknown stage: {from_stage}")
+    file_path = _first_file(INCOMING_DIR / job_id)
+    backend = ocr.get_backend()
+    plan = StagePlan(
+        job_id=job_id,
+        file_path=file_path,
+        backend=backend,
+        fingerprints=stage_fingerprints(
+            file_digest(file_path),
+            f"{backend.name}:{backend.version}",
+            fuzzy.resolution_version(),
+        ),
+        store=CheckpointStore(PROCESSED_DIR / job_id),
+    )
+    if not resume:
+        return plan
+
+    plan.manifest = plan.store.load_manifest()
+    start = first_stale_stage(plan.manifest, plan.fingerprints)
+    if from_stage is not None and (start is None or STAGES.index(from_stage) < STAGES.index(start)):
+        start = from_stage
+    while start is not None and start != STAGES[0] and not _inputs_available(plan, start):
+        start = STAGES[STAGES.index(start) - 1]
+    plan.start = start
+    return plan
+
+
+def _run_stages(plan: StagePlan) -> float:
+    """Run every stage from ``plan.start`` onwards, checkpointing as it goes."""
+
+    assert plan.start is not None
+    job_id = plan.job_id
+    store = plan.store
+    manifest = plan.manifest
+    processed_dir = PROCESSED_DIR / job_id
+    first = STAGES.index(plan.start)
+    recorded: dict[str, Any] = manifest.setdefault("stages", {})
+    manifest["format"] = FORMAT_VERSION
+    for stage in STAGES[first:]:
+        recorded.pop(stage, None)
+
+    def _checkpoint(stage: str) -> None:
+        recorded[stage] = {"fingerprint": plan.fingerprints[stage]}
+        store.save_manifest(manifest)
+
+    def _runs(stage: str) -> bool:
+        return first <= STAGES.index(stage)
+
+    if _runs("ocr"):
+        totals = [0, 0.0]
+
+        def _ocr_lines() -> Iterator[list[Any]]:
+            for line in ocr.iter_ocr(plan.file_path, backend=plan.backend):
+                totals[0] += 1
+                totals[1] += line.confidence
+                yield [line.text, line.confidence]
+
+        store.write_stream("ocr", _ocr_lines())
+        manifest["ocr_conf_mean"] = totals[1] / totals[0] if totals[0] else 0.0
+        _checkpoint("ocr")
+    ocr_conf_mean = manifest.get("ocr_conf_mean", 0.0)
+
+    if _runs("segment"):
+        lines = (text for text, _ in store.iter_stream("ocr"))
+        store.write_stream("segment", segment.iter_segments(layout.iter_layout(lines)))
+        _checkpoint("segment")
+
+    if _runs("extract"):
+        manifest["extract_rows"] = store.write_stream("extract", extract.iter_records(store.iter_stream("segment")))
+        _checkpoint("extract")
+    if "extract_rows" not in manifest:
+        manifest["extract_rows"] = sum(1 for _ in store.iter_stream("extract"))
+    row_count = manifest["extract_rows"]
+
+    csv_path = processed_dir / "output.csv"
+    validations: Iterable[list[Any]]
+    if row_count <= spill.SPILL_ROWS and parallel.should_parallelize(row_count):
+        raw_records = list(store.iter_stream("extract"))
+        normalized = None if _runs("normalize") else list(_iter_normalized(csv_path))
+        normalized_records, validations = parallel.normalize_and_validate(raw_records, normalized)
+        if _runs("normalize"):
+            csv_writer.write_csv(job_id, normalized_records, PROCESSED_DIR)
+            _checkpoint("normalize")
+        rows: Iterable[dict[str, str]] = normalized_records
+    else:
+        # Raw records are streamed from the extract checkpoint and normalized
+        # records to the CSV and back, so no stage holds the whole document.
+        if _runs("normalize"):
+            csv_writer.write_csv(job_id, normalize.iter_normalize(store.iter_stream("extract")), PROCESSED_DIR)
+            _checkpoint("normalize")
+        context = {"raw_records": store.iter_stream("extract"), "ocr_conf_mean": ocr_conf_mean}
+        if row_count > spill.SPILL_ROWS:
+            validations = validate.iter_validate(_iter_normalized(csv_path), context=context)
+        else:
+            validations = validate.validate(_iter_normalized(csv_path), context=context)
+        rows = _iter_normalized(csv_path)
+    _write_preview(
+        processed_dir / "preview.json",
+        job_id,
+        ([record.get(column, "") for column in extract.EXPECTED_COLUMNS] for record in rows),
+        validations,
+        {"ocr_conf_mean": ocr_conf_mean},
+    )
+    _checkpoint("validate")
+    return ocr_conf_mean
+
+
+def _write_preview(
+    path: Path,
+    job_id: str,
+    rows: Iterable[list[str]],
+    validations: Iterable[list[Any]],
+    metadata: dict[str, Any],
+) -> int:
+    """Write ``preview.json`` one row at a time; returns the row count.
+
+    The bytes are those of the encoded :class:`PreviewResponse`, without
+    building it. Every value comes from the pipeline itself, so rows are
+    built without validation and encoded with the fast codec.
+    """
+
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    count = 0
+    with temp_path.open("wb", buffering=1 << 20) as handle:
+        handle.write(b'{"job_id":' + codec.dumps(job_id))
+        handle.write(b',"headers":' + codec.dumps(extract.EXPECTED_COLUMNS) + b',"rows":[')
+        for columns, row_badges in zip(rows, validations):
+            if count:
+                handle.write(b",")
+            handle.write(codec.dumps(PreviewRow.construct(columns=columns, validations=row_badges)))
+            count += 1
+        handle.write(b'],"total_rows":' + codec.dumps(count) + b',"metadata":' + codec.dumps(metadata) + b"}")
+    os.replace(temp_path, path)
+    return count
+
+
 def process_job(job_id: str) -> None:
     job_service = JobService()
     metrics = MetricsService.get_instance()
-    incoming_dir = INCOMING_DIR / job_id
-    processed_dir = PROCESSED_DIR / job_id
     try:
         job_service.set_processing(job_id)
-        file_path = _first_file(incoming_dir)
-        LOGGER.info("Processing job %s from %s", job_id, file_path)
-        ocr_lines = list(ocr.run_ocr(file_path))
-        confidences = [line.confidence for line in ocr_lines]
-        ocr_conf_mean = fmean(confidences) if confidences else 0.0
-        layout_info = layout.detect_layout([line.text for line in ocr_lines])
-        segments = segment.segment_lines(layout_info)
-        raw_records = extract.extract_records(segments)
-        normalized_records = normalize.normalize(raw_records)
-        validations = validate.validate(
-            normalized_records,
-            context={
-                "raw_records": raw_records,
-                "ocr_conf_mean": ocr_conf_mean,
-            },
-        )
-        csv_writer.write_csv(job_id, normalized_records, PROCESSED_DIR)
-        preview_rows = [
-            PreviewRow(
-                columns=[record.get(column, "") for column in extract.EXPECTED_COLUMNS],
-                validations=row_badges,
-            )
-            for record, row_badges in zip(normalized_records, validations)
-        ]
-        preview = PreviewResponse(
-            job_id=job_id,
-            headers=extract.EXPECTED_COLUMNS,
-            rows=preview_rows,
-            total_rows=len(preview_rows),
-            metadata={"ocr_conf_mean": ocr_conf_mean},
-        )
-        processed_dir.mkdir(parents=True, exist_ok=True)
-        preview_path = processed_dir / "preview.json"
-        preview_path.write_text(preview.json(indent=2, ensure_ascii=False), encoding="utf-8")
+        plan = plan_stages(job_id)
+        LOGGER.info("Processing job %s from %s", job_id, plan.file_path)
+        ocr_conf_mean = _run_stages(plan)
         LOGGER.info("Job %s processed successfully", job_id)
         job_service.set_completed(job_id)
         job_service.update_status(
@@ -74,3 +234,86 @@ def process_job(job_id: str) -> None:
         job_service.record_error(job_id, str(exc))
         metrics.increment("worker.jobs.failed")
         raise
+
+
+def reprocess_job(
+    job_id: str,
+    from_stage: str | None = None,
+    job_service: JobService | None = None,
+) -> str | None:
+    """Refresh a processed job from its earliest stale stage.
+
+    Returns the stage the run resumed from, or ``None`` when every stage was
+    already up to date. An approved job stays approved only if its
+    ``output.csv`` and ``preview.json`` come out unchanged; otherwise the
+    reviewed copies no longer describe its output, so it goes back to
+    ``COMPLETED`` and needs a new approval.
+    """
+
+    job_service = job_service or JobService()
+    metrics = MetricsService.get_instance()
+    approved = job_service.get(job_id).status == JobStatus.APPROVED
+    plan = plan_stages(job_id, resume=True, from_stage=from_stage)
+    if plan.start is None:
+        LOGGER.info("Job %s is up to date, nothing to reprocess", job_id)
+        metrics.increment("worker.jobs.reprocess_skipped")
+        return None
+    reviewed = _output_digests(job_id) if approved else None
+    try:
+        if not approved:
+            job_service.set_processing(job_id)
+        LOGGER.info("Reprocessing job %s from stage %s", job_id, plan.start)
+        ocr_conf_mean = _run_stages(plan)
+        metadata = {
+            "ocr_conf_mean": ocr_conf_mean,
+            "reprocessed_from": plan.start,
+            "reprocessed_at": datetime.utcnow().isoformat(),
+        }
+        if approved and _output_digests(job_id) == reviewed:
+            job_service.update_status(job_id, JobStatus.APPROVED, metadata=metadata)
+        elif approved:
+            LOGGER.warning("Job %s output changed after reprocessing; its approval is withdrawn", job_id)
+            metadata["approval_withdrawn_at"] = metadata["reprocessed_at"]
+            job_service.update_status(job_id, JobStatus.COMPLETED, approved_at=None, metadata=metadata)
+            metrics.increment("worker.jobs.approval_withdrawn")
+        else:
+            job_service.set_completed(job_id)
+            job_service.update_status(job_id, JobStatus.COMPLETED, metadata=metadata)
+        metrics.increment("worker.jobs.reprocessed")
+    except Exception as exc:
+        LOGGER.exception("Reprocessing job %s failed", job_id)
+        if not approved:
+            job_service.record_error(job_id, str(exc))
+        metrics.increment("worker.jobs.failed")
+        raise
+    return plan.start
+
+
+def _output_digests(job_id: str) -> tuple[str | None, ...]:
+    digests = []
+    for name in ("output.csv", "preview.json"):
+        path = PROCESSED_DIR / job_id / name
+        digests.append(file_digest(path) if path.exists() else None)
+    return tuple(digests)
+
+
+def reprocess_jobs(
+    job_ids: Iterable[str] | None = None,
+    from_stage: str | None = None,
+) -> dict[str, str | None]:
+    """Reprocess many jobs, by default every completed or approved one.
+
+    Failures are logged and reported as ``"failed"`` so one bad job does not
+    abort a bulk re-validation.
+    """
+
+    job_service = JobService()
+    if job_ids is None:
+        job_ids = job_service.reprocessable_jobs()
+    results: dict[str, str | None] = {}
+    for job_id in job_ids:
+        try:
+            results[job_id] = reprocess_job(job_id, from_stage=from_stage, job_service=job_service)
+        except Exception:
+            results[job_id] = "failed"
+    return results
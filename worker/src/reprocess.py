@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from typing import Sequence
+
+from api.app.services.metrics import start_publisher, stop_publisher
+
+from .checkpoints import STAGES
+from .pipeline import reprocess_jobs
+from .sigla_corrector import CorrectorLoader
+
+LOGGER = logging.getLogger(__name__)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Refresh processed jobs from their earliest stale pipeline stage.",
+    )
+    parser.add_argument("job_ids", nargs="*", help="Jobs to reprocess (default: every completed or approved job)")
+    parser.add_argument(
+        "--from-stage",
+        choices=STAGES,
+        default=None,
+        help="Force a re-run from this stage even if later checkpoints are current",
+    )
+    args = parser.parse_args(argv)
+
+    CorrectorLoader().refresh()
+    start_publisher("reprocess")
+    try:
+        results = reprocess_jobs(args.job_ids or None, from_stage=args.from_stage)
+    finally:
+        stop_publisher()
+    for job_id, stage in results.items():
+        print(f"{job_id}\t{stage or 'up-to-date'}")
+    return 1 if "failed" in results.values() else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(main())
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import tempfile
+from dataclasses import dataclass
+from itertools import groupby, islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .spill import SPILL_ROWS, ExternalSorter, SpillFile
+
+STATUS_PRIORITY = {"OK": 0, "AVISO": 1, "ERRO": 2}
+
+Outcome = Tuple[str, str, Optional[str]]
+"""A single badge update: ``(field, status, message)``."""
+
+FieldStates = Dict[str, Tuple[str, Optional[str]]]
+SourceFn = Callable[[Mapping[str, Any], Optional[Mapping[str, Any]]], str]
+GroupMember = Tuple[int, Tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class ColumnRule:
+    """Row-local rule whose result depends only on the values of ``columns``.
+
+    ``check`` receives one positional argument per column and returns the
+    outcomes to merge into the row. Because the result is a pure function of
+    the inputs it is evaluated once per distinct value tuple in a run.
+    """
+
+    name: str
+    columns: Tuple[str, ...]
+    check: Callable[..., Sequence[Outcome]]
+
+
+@dataclass(frozen=True)
+class GroupRule:
+    """Rule evaluated over every row sharing the same ``key`` values.
+
+    ``check`` receives the members of one group as ``(row_index, values)``
+    pairs, where ``values`` follows ``columns``, and yields
+    ``(row_index, outcome)`` pairs.
+    """
+
+    name: str
+    key: Tuple[str, ...]
+    columns: Tuple[str, ...]
+    check: Callable[[List[GroupMember]], Iterable[Tuple[int, Outcome]]]
+
+
+Rule = ColumnRule | GroupRule
+
+
+def merge_outcome(states: FieldStates, field: str, status: str, message: str | None) -> None:
+    """Merge a badge update keeping the most severe status per field."""
+
+    current = states.get(field)
+    if current is None or STATUS_PRIORITY[status] > STATUS_PRIORITY[current[0]]:
+        states[field] = (status, message)
+        return
+    if STATUS_PRIORITY[status] == STATUS_PRIORITY[current[0]] and message:
+        existing = current[1]
+        if existing:
+            if message not in existing:
+                states[field] = (current[0], f"{existing}; {message}")
+        else:
+            states[field] = (current[0], message)
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class ValidationPlan:
+    """Compiled execution plan for a set of validation rules.
+
+    Rows are processed column-wise in batches: each referenced source column
+    is extracted once per batch, column rules run over the extracted values
+    with a per-run memo, and group rules run after all batches once every
+    group is complete. Rules are applied in registration order, so the badge
+    order of a row does not depend on the batch size. :meth:`iter_run`
+    trades some speed for a memory budget on very large documents.
+    """
+
+    def __init__(
+        self,
+        sources: Mapping[str, SourceFn],
+        column_rules: Sequence[ColumnRule],
+        group_rules: Sequence[GroupRule],
+        batch_size: int,
+    ) -> None:
+        self.sources = dict(sources)
+        self.column_rules = tuple(column_rules)
+        self.group_rules = tuple(group_rules)
+        self.batch_size = batch_size
+
+    def _column_pass(
+        self,
+        batch: Sequence[Mapping[str, Any]],
+        raws: Sequence[Mapping[str, Any] | None],
+        memos: list[dict[Any, Sequence[Outcome]]],
+    ) -> tuple[List[FieldStates], dict[str, list[Any]]]:
+        columns = {
+            name: [source(record, raw) for record, raw in zip(batch, raws)]
+            for name, source in self.sources.items()
+        }
+        states: List[FieldStates] = [{} for _ in range(len(batch))]
+
+        for rule, memo in zip(self.column_rules, memos):
+            if len(rule.columns) == 1:
+                values: Iterable[Any] = columns[rule.columns[0]]
+                check = rule.check
+                for row_states, value in zip(states, values):
+                    outcomes = memo.get(value)
+                    if outcomes is None:
+                        outcomes = memo[value] = check(value)
+                    for field, status, message in outcomes:
+                        merge_outcome(row_states, field, status, message)
+            else:
+                values = zip(*(columns[column] for column in rule.columns))
+                for row_states, value in zip(states, values):
+                    outcomes = memo.get(value)
+                    if outcomes is None:
+                        outcomes = memo[value] = rule.check(*value)
+                    for field, status, message in outcomes:
+                        merge_outcome(row_states, field, status, message)
+        return states, columns
+
+    def _group_members(
+        self, columns: dict[str, list[Any]], offset: int
+    ) -> Iterator[tuple[int, tuple[str, ...], GroupMember]]:
+        for rule_index, rule in enumerate(self.group_rules):
+            keys = zip(*(columns[column] for column in rule.key))
+            members = zip(*(columns[column] for column in rule.columns))
+            for position, (key, member) in enumerate(zip(keys, members)):
+                yield rule_index, key, (offset + position, member)
+
+    def run(
+        self,
+        records: Iterable[Mapping[str, Any]],
+        raw_records: Iterable[Mapping[str, Any]] | None = None,
+    ) -> List[FieldStates]:
+        results: List[FieldStates] = []
+        memos: list[dict[Any, Sequence[Outcome]]] = [{} for _ in self.column_rules]
+        groups: list[dict[tuple[str, ...], list[GroupMember]]] = [{} for _ in self.group_rules]
+        raw_iter = iter(raw_records or ())
+
+        offset = 0
+        for batch in _batched(records, self.batch_size):
+            raws = [next(raw_iter, None) for _ in batch]
+            states, columns = self._column_pass(batch, raws, memos)
+            for rule_index, key, member in self._group_members(columns, offset):
+                groups[rule_index].setdefault(key, []).append(member)
+            results.extend(states)
+            offset += len(batch)
+
+        for rule, rule_groups in zip(self.group_rules, groups):
+            for members in rule_groups.values():
+                for index, (field, status, message) in rule.check(members):
+                    merge_outcome(results[index], field, status, message)
+
+        return results
+
+    def iter_run(
+        self,
+        records: Iterable[Mapping[str, Any]],
+        raw_records: Iterable[Mapping[str, Any]] | None = None,
+        spill_dir: Path | None = None,
+        max_rows: int | None = None,
+    ) -> Iterator[FieldStates]:
+        """Bounded-memory variant of :meth:`run` that yields row states in order.
+
+        Row states from the column pass are written to a spill file as they
+        are produced. Group members are externally sorted by ``(rule, key,
+        row)`` so each group is checked on its own, and the resulting
+        outcomes are externally sorted by row and merged back while the row
+        states are streamed out. At most ``max_rows`` items of each kind,
+        the column memos and the largest single group are held in memory.
+        The output is identical to :meth:`run`.
+        """
+
+        limit = max_rows or SPILL_ROWS
+        if spill_dir is not None:
+            spill_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="validate-", dir=spill_dir) as workdir:
+            directory = Path(workdir)
+            rows: SpillFile[FieldStates] = SpillFile(directory / "rows.spill")
+            members: ExternalSorter[tuple[int, tuple[str, ...], int, tuple[str, ...]]] = ExternalSorter(
+                directory, max_items=limit, name="members"
+            )
+            memos: list[dict[Any, Sequence[Outcome]]] = [{} for _ in self.column_rules]
+            raw_iter = iter(raw_records or ())
+
+            offset = 0
+            for batch in _batched(records, self.batch_size):
+                raws = [next(raw_iter, None) for _ in batch]
+                states, columns = self._column_pass(batch, raws, memos)
+                for rule_index, key, (index, values) in self._group_members(columns, offset):
+                    members.add((rule_index, key, index, values))
+                rows.extend(states)
+                offset += len(batch)
+                for memo in memos:
+                    if len(memo) > limit:
+                        memo.clear()
+
+            outcomes: ExternalSorter[tuple[int, int, int, Outcome]] = ExternalSorter(
+                directory, max_items=limit, name="outcomes"
+            )
+            for (rule_index, _), group in groupby(members, key=lambda item: (item[0], item[1])):
+                check = self.group_rules[rule_index].check
+                group_members = [(index, values) for _, _, index, values in group]
+                for sequence, (index, outcome) in enumerate(check(group_members)):
+                    outcomes.add((index, rule_index, sequence, outcome))
+
+            pending = iter(outcomes)
+            current = next(pending, None)
+            for index, states in enumerate(rows):
+                while current is not None and current[0] == index:
+                    field, status, message = current[3]
+                    merge_outcome(states, field, status, message)
+                    current = next(pending, None)
+                yield states
+
+
+def compile_rules(
+    rules: Iterable[Rule],
+    sources: Mapping[str, SourceFn],
+    batch_size: int = 2048,
+) -> ValidationPlan:
+    """Compile declarative rules into a :class:`ValidationPlan`.
+
+    Only the sources referenced by at least one rule are extracted at run
+    time; referencing an unknown source fails here rather than mid-run.
+    """
+
+    column_rules: list[ColumnRule] = []
+    group_rules: list[GroupRule] = []
+    for rule in rules:
+        if isinstance(rule, ColumnRule):
+            column_rules.append(rule)
+        elif isinstance(rule, GroupRule):
+            group_rules.append(rule)
+        else:
+            raise TypeError(f"Unsupported rule type: {type(rule).__name__}")
+
+    referenced: list[str] = []
+    for rule in column_rules:
+        referenced.extend(rule.columns)
+    for rule in group_rules:
+        referenced.extend(rule.key)
+        referenced.extend(rule.columns)
+    missing = sorted({name for name in referenced if name not in sources})
+    if missing:
+        raise KeyError(f"Unknown rule sources: {', '.join(missing)}")
+    used = {name: sources[name] for name in dict.fromkeys(referenced)}
+    return ValidationPlan(used, column_rules, group_rules, batch_size)
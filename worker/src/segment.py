@@ -1,20 +1,35 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from typing import Iterable
+from typing import Iterable, Iterator
 
+from .lexicon import LEXICON, SEGMENT_KEYS
 
-SEGMENT_KEYS = ["orgao", "lista", "tipo"]
+__all__ = ["SEGMENT_KEYS", "iter_segments", "segment_lines"]
 
 
 def segment_lines(layout: Iterable[dict[str, str]]) -> dict[str, list[dict[str, str]]]:
     segments: dict[str, list[dict[str, str]]] = defaultdict(list)
-    for entry in layout:
-        key = "body"
-        lowered = entry["content"].lower()
-        for segment in SEGMENT_KEYS:
-            if segment in lowered:
-                key = segment
-                break
-        segments[key].append(entry)
+    for entry in iter_segments(layout):
+        segments[entry["segment"]].append(entry)
     return dict(segments)
+
+
+def iter_segments(layout: Iterable[dict[str, str]]) -> Iterator[dict[str, str]]:
+    """Layout entries in their original order, each classified once.
+
+    Every entry is tagged with its ``segment`` and, for ``label: value``
+    lines, the normalized ``label``, its output ``column`` and the
+    ``value``, so extraction does not split the line again.
+    """
+
+    classify = LEXICON.segment
+    split = LEXICON.split
+    for entry in layout:
+        content = entry["content"]
+        parsed = split(content.strip())
+        if parsed is None:
+            yield {**entry, "segment": classify(content)}
+        else:
+            label, value = parsed
+            yield {**entry, "segment": classify(content), "label": label.key, "column": label.column, "value": value}
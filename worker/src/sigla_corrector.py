@@ -0,0 +1,167 @@
+"""Learned sigla corrector consulted before the ``difflib`` fallback.
+
+The model is trained by :mod:`ml.corrector` from approved jobs, pairing
+the raw sigla read by OCR with the sigla in the approved output. Reviewers
+cannot edit rows, so that sigla is the pipeline's own resolution that
+the reviewer accepted. It keeps two things:
+
+* ``memory``: raw sigla -> approved sigla for corrections that at least
+  ``MIN_SUPPORT`` rows, and a majority of the rows with that raw sigla,
+  agree on, answered with a dictionary lookup;
+* ``costs``: weights of single-character edits. An OCR confusion that
+  approved data shows often (``0`` read for ``O``, a dropped ``-``) costs
+  less than an arbitrary edit, which costs 1.
+
+A raw sigla missing from ``memory`` is rewritten with the learned
+substitutions and deletions, and the cheapest rewrite that is a
+master-data key wins if its cost is at most ``threshold`` per character
+of the raw sigla and no other key is as cheap. That is a handful of
+dictionary lookups instead of a scan of the master data. Anything else,
+including typos unlike the approved corrections, is left to the
+``difflib`` matcher.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from api.app.services import codec
+from ml.registry import ModelRegistry
+
+from . import fuzzy
+
+LOGGER = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MODEL_NAME = "sigla-corrector"
+MAX_VARIANTS = 256
+"""Cap on the variants expanded per lookup, so a long raw sigla stays cheap."""
+DEFAULT_THRESHOLD = 0.3
+
+Edit = Tuple[str, str]
+"""``(raw char, approved char)``; an empty side is an insertion or deletion."""
+
+
+def edit_key(edit: Edit) -> str:
+    return f"{edit[0]}\t{edit[1]}"
+
+
+class SiglaCorrector:
+    def __init__(
+        self,
+        memory: Mapping[str, str],
+        costs: Mapping[Edit, float],
+        threshold: float = DEFAULT_THRESHOLD,
+        version: str = "",
+    ) -> None:
+        self.memory = dict(memory)
+        self.costs = dict(costs)
+        self.threshold = threshold
+        self.version = version
+        # raw char -> learned replacements ("" deletes it), cheapest first
+        self._alternatives: Dict[str, List[Tuple[str, float]]] = {}
+        for (raw, approved), cost in sorted(self.costs.items(), key=lambda item: item[1]):
+            if raw and cost < 1.0:
+                self._alternatives.setdefault(raw, []).append((approved, cost))
+
+    def cost(self, raw: str, approved: str) -> float:
+        return self.costs.get((raw, approved), 1.0)
+
+    def correct(self, raw: str, master: Mapping[str, dict]) -> str | None:
+        """Master-data sigla for upper-cased ``raw``, or ``None`` to fall back to difflib."""
+
+        remembered = self.memory.get(raw)
+        if remembered is not None and remembered in master:
+            return remembered
+        budget = self.threshold * len(raw)
+        best: Tuple[float, str] | None = None
+        tied = False
+        expanded = 0
+        # Depth-first over learned substitutions and deletions, within budget.
+        stack: List[Tuple[int, str, float]] = [(0, "", 0.0)]
+        while stack and expanded < MAX_VARIANTS:
+            position, prefix, spent = stack.pop()
+            if position == len(raw):
+                if spent and prefix in master:
+                    if best is None or spent < best[0]:
+                        best, tied = (spent, prefix), False
+                    elif spent == best[0] and prefix != best[1]:
+                        tied = True
+                continue
+            expanded += 1
+            char = raw[position]
+            for replacement, cost in self._alternatives.get(char, ()):
+                if spent + cost <= budget:
+                    stack.append((position + 1, prefix + replacement, spent + cost))
+            stack.append((position + 1, prefix + char, spent))
+        # Equally cheap keys are left to the difflib matcher.
+        return best[1] if best is not None and not tied else None
+
+    def correct_many(self, raws: Iterable[str], master: Mapping[str, dict]) -> Dict[str, str | None]:
+        """:meth:`correct` for every distinct value of ``raws``."""
+
+        return {raw: self.correct(raw, master) for raw in dict.fromkeys(raws)}
+
+    def to_payload(self) -> Dict[str, object]:
+        return {
+            "format": FORMAT_VERSION,
+            "threshold": self.threshold,
+            "memory": dict(sorted(self.memory.items())),
+            "costs": {edit_key(edit): cost for edit, cost in sorted(self.costs.items())},
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Mapping[str, object], version: str = "") -> "SiglaCorrector":
+        if payload.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported sigla corrector format: {payload.get('format')}")
+        costs: Dict[Edit, float] = {}
+        for key, cost in payload["costs"].items():  # type: ignore[union-attr]
+            raw, approved = key.split("\t")
+            costs[(raw, approved)] = float(cost)
+        return cls(payload["memory"], costs, float(payload["threshold"]), version)  # type: ignore[arg-type]
+
+    def save(self, path: Path) -> None:
+        codec.write(path, self.to_payload())
+
+    @classmethod
+    def load(cls, path: Path, version: str = "") -> "SiglaCorrector":
+        return cls.from_payload(codec.read(path), version)
+
+
+class CorrectorLoader:
+    """Installs the registered sigla corrector in :mod:`worker.src.fuzzy`.
+
+    :meth:`refresh` costs one registry query when nothing changed, so the
+    worker calls it between jobs. Only a promoted (``production``)
+    corrector is installed: candidates are trained on the pipeline's own
+    output and must be reviewed first. Without one, none is used.
+    """
+
+    def __init__(self, registry: ModelRegistry | None = None) -> None:
+        self._registry = registry or ModelRegistry()
+        self._revision: int | None = None
+
+    def refresh(self) -> bool:
+        """Install the registered corrector if it changed; return whether one was installed."""
+
+        revision = self._registry.revision()
+        if revision == self._revision:
+            return False
+        self._revision = revision
+        record = self._registry.production(MODEL_NAME)
+        current = fuzzy.CORRECTOR
+        version = f"{record.version}:{record.metrics.get('sha256', '')}" if record is not None else ""
+        if (current.version if current is not None else "") == version:
+            return False
+        corrector = None
+        if record is not None:
+            try:
+                corrector = SiglaCorrector.load(Path(record.metrics["artifact"]), version)
+            except (OSError, KeyError, ValueError):
+                LOGGER.warning("Cannot load sigla corrector %s, keeping the current one", record.version, exc_info=True)
+                return False
+        fuzzy.install_corrector(corrector)
+        LOGGER.info("Sigla corrector %s is now active", record.version if record is not None else "(none)")
+        return True
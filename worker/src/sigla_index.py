@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_CUTOFF = 0.7
+
+Postings = Dict[str, Dict[int, Tuple[Sequence[int], Sequence[int]]]]
+
+
+class SiglaIndex:
+    """Approximate-match index over master-data siglas.
+
+    Reproduces ``difflib.get_close_matches(query, keys, n=1, cutoff)``
+    without scanning every key. Keys are indexed by character postings
+    bucketed by key length. For a query, only buckets whose length can reach
+    the cutoff are visited, and the accumulated multiset overlap of the
+    postings is exactly ``SequenceMatcher.quick_ratio``, the upper bound
+    ``get_close_matches`` itself filters on. Only the surviving candidates
+    pay for a full ``SequenceMatcher.ratio``.
+    """
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        sorted_keys = sorted(set(keys))
+        postings: Dict[str, Dict[int, Tuple[List[int], List[int]]]] = {}
+        for key_id, key in enumerate(sorted_keys):
+            for char, count in Counter(key).items():
+                ids, counts = postings.setdefault(char, {}).setdefault(len(key), ([], []))
+                ids.append(key_id)
+                counts.append(count)
+        self._use_tables(sorted_keys, [len(key) for key in sorted_keys], postings)  # type: ignore[arg-type]
+
+    @classmethod
+    def from_tables(cls, keys: Sequence[str], lengths: Sequence[int], postings: Postings) -> "SiglaIndex":
+        """Wrap prebuilt tables, e.g. arrays backed by a memory-mapped snapshot."""
+
+        index = cls.__new__(cls)
+        index._use_tables(keys, lengths, postings)
+        return index
+
+    def _use_tables(self, keys: Sequence[str], lengths: Sequence[int], postings: Postings) -> None:
+        self.keys = keys
+        self._lengths = lengths
+        # char -> key length -> (key ids, occurrences of char in each key)
+        self._postings = postings
+
+    def tables(self) -> Tuple[Sequence[str], Sequence[int], Postings]:
+        return self.keys, self._lengths, self._postings
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _length_bounds(self, length: int, cutoff: float) -> Tuple[int, int]:
+        # ratio <= 2 * min(la, lb) / (la + lb); solve for lb reaching cutoff.
+        lower = math.ceil(length * cutoff / (2.0 - cutoff) - 1e-9)
+        upper = math.floor(length * (2.0 - cutoff) / cutoff + 1e-9)
+        return lower, upper
+
+    def candidates(self, query: str, cutoff: float = DEFAULT_CUTOFF) -> List[int]:
+        """Return ids of keys whose ``quick_ratio`` against ``query`` reaches ``cutoff``."""
+
+        if cutoff <= 0.0:
+            return list(range(len(self.keys)))
+        if not query:
+            return [key_id for key_id, length in enumerate(self._lengths) if length == 0]
+        lower, upper = self._length_bounds(len(query), cutoff)
+        overlap: Dict[int, int] = {}
+        for char, query_count in Counter(query).items():
+            buckets = self._postings.get(char)
+            if not buckets:
+                continue
+            for length, (ids, counts) in buckets.items():
+                if length < lower or length > upper:
+                    continue
+                for key_id, count in zip(ids, counts):
+                    overlap[key_id] = overlap.get(key_id, 0) + (count if count < query_count else query_count)
+        query_length = len(query)
+        lengths = self._lengths
+        return [
+            key_id
+            for key_id, matches in overlap.items()
+            if 2.0 * matches / (query_length + lengths[key_id]) >= cutoff
+        ]
+
+    def best_match(self, query: str, cutoff: float = DEFAULT_CUTOFF) -> Tuple[str, float] | None:
+        """Best key and its similarity ratio, or ``None`` below ``cutoff``.
+
+        Ties on the ratio resolve to the greatest key, as in
+        ``get_close_matches``.
+        """
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        best: Tuple[float, str] | None = None
+        for key_id in self.candidates(query, cutoff):
+            key = self.keys[key_id]
+            matcher.set_seq1(key)
+            ratio = matcher.ratio()
+            if ratio >= cutoff and (best is None or (ratio, key) > best):
+                best = (ratio, key)
+        if best is None:
+            return None
+        return best[1], best[0]
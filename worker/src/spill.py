@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import heapq
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Generic, Iterable, Iterator, List, TypeVar
+
+from api.app.services.metrics import MetricsService
+
+SPILL_DIR = Path("data/cache/spill")
+SPILL_ROWS = int(os.environ.get("CNE_SPILL_ROWS", "200000"))
+"""Items a single buffer holds before it is written out; the memory budget knob."""
+
+CHUNK_SIZE = 1024
+MAX_FAN_IN = 64
+
+T = TypeVar("T")
+
+
+class SpillFile(Generic[T]):
+    """Append-only sequence of items stored on disk in pickled chunks.
+
+    Spill files only ever hold data produced by the same process moments
+    earlier, so pickle is safe here and much cheaper than JSON.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._handle = path.open("wb")
+        self._buffer: List[T] = []
+        self.count = 0
+
+    def append(self, item: T) -> None:
+        self._buffer.append(item)
+        self.count += 1
+        if len(self._buffer) >= CHUNK_SIZE:
+            self._flush()
+
+    def extend(self, items: Iterable[T]) -> None:
+        for item in items:
+            self.append(item)
+
+    def _flush(self) -> None:
+        if self._buffer:
+            pickle.dump(self._buffer, self._handle, protocol=pickle.HIGHEST_PROTOCOL)
+            self._buffer = []
+
+    def close(self) -> None:
+        if not self._handle.closed:
+            self._flush()
+            self._handle.close()
+
+    def __iter__(self) -> Iterator[T]:
+        self.close()
+        with self.path.open("rb") as handle:
+            while True:
+                try:
+                    chunk = pickle.load(handle)
+                except EOFError:
+                    return
+                yield from chunk
+
+
+class ExternalSorter(Generic[T]):
+    """Sort more items than fit in memory.
+
+    Items are buffered up to ``max_items``; each full buffer is sorted and
+    written to ``directory`` as a run, and iteration k-way merges the runs.
+    When nothing was spilled the buffer is simply sorted in memory. Runs are
+    merged in passes of at most ``MAX_FAN_IN`` so open file handles stay
+    bounded however large the input is. The sort is stable.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        key: Callable[[T], Any] | None = None,
+        max_items: int | None = None,
+        name: str = "run",
+    ) -> None:
+        self.directory = directory
+        self.key = key
+        self.max_items = max(1, max_items or SPILL_ROWS)
+        self.name = name
+        self._buffer: List[T] = []
+        self._runs: List[SpillFile[T]] = []
+        self._serial = 0
+        self._metrics = MetricsService.get_instance()
+
+    @property
+    def spilled(self) -> bool:
+        return bool(self._runs)
+
+    def add(self, item: T) -> None:
+        self._buffer.append(item)
+        if len(self._buffer) >= self.max_items:
+            self._spill()
+
+    def extend(self, items: Iterable[T]) -> None:
+        for item in items:
+            self.add(item)
+
+    def _new_run(self) -> SpillFile[T]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        run: SpillFile[T] = SpillFile(self.directory / f"{self.name}-{id(self)}-{self._serial}.spill")
+        self._serial += 1
+        self._runs.append(run)
+        return run
+
+    def _spill(self) -> None:
+        self._buffer.sort(key=self.key)
+        run = self._new_run()
+        run.extend(self._buffer)
+        run.close()
+        self._buffer = []
+        self._metrics.increment("worker.spill.runs")
+
+    def _merge(self, runs: List[SpillFile[T]]) -> Iterator[T]:
+        return heapq.merge(*runs, key=self.key)
+
+    def __iter__(self) -> Iterator[T]:
+        if not self._runs:
+            self._buffer.sort(key=self.key)
+            yield from self._buffer
+            return
+        if self._buffer:
+            self._spill()
+        runs, self._runs = self._runs, []
+        while len(runs) > MAX_FAN_IN:
+            merged: List[SpillFile[T]] = []
+            for start in range(0, len(runs), MAX_FAN_IN):
+                group = runs[start : start + MAX_FAN_IN]
+                target = self._new_run()
+                target.extend(self._merge(group))
+                target.close()
+                merged.append(target)
+                for run in group:
+                    run.path.unlink(missing_ok=True)
+            self._runs = []
+            runs = merged
+        try:
+            yield from self._merge(runs)
+        finally:
+            for run in runs:
+                run.path.unlink(missing_ok=True)
@@ -5,8 +5,11 @@ import logging
 import time
 
 from api.app.services.jobs import QUEUE_FILE
+from api.app.services.metrics import start_publisher
 
-from .pipeline import process_job
+from .master_cache import MasterDataManager
+from .pipeline import process_job, reprocess_job
+from .sigla_corrector import CorrectorLoader
 
 LOGGER = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -22,13 +25,25 @@ def _pop_queue() -> list[dict]:
 
 def run_forever(poll_interval: float = 2.0) -> None:
     LOGGER.info("Worker started")
+    start_publisher("worker")
+    master_data = MasterDataManager()
+    master_data.start()
+    corrector = CorrectorLoader()
     while True:
+        master_data.swap_if_ready()
+        corrector.refresh()
         jobs = _pop_queue()
         if not jobs:
             time.sleep(poll_interval)
             continue
         for job in jobs:
+            master_data.swap_if_ready()
+            corrector.refresh()
             job_id = job["job_id"]
+            if job.get("action") == "reprocess":
+                LOGGER.info("Worker picked reprocess request for job %s", job_id)
+                reprocess_job(job_id, from_stage=job.get("from_stage"))
+                continue
             LOGGER.info("Worker picked job %s", job_id)
             process_job(job_id)
 